@@ -0,0 +1,137 @@
+# Opt-in debug artifacts for extraction runs: images (table masks, detected cell boxes, table crops) and
+# text (the page text a parser read, the fields it extracted).
+# Off unless a request asks for it: the endpoint creates a DebugStore and hands it to the extraction
+# context, parsers call store.save_image(name, img) / store.save_text(name, text) (or ctx.debug_text) and the
+# encoding and writing happen on a background writer thread. Each run gets its own directory under DEBUG_ROOT, so concurrent requests
+# never overwrite each other, and old runs are pruned by age and count whenever a new one starts.
+# Failures to write (e.g. a read-only deployment) are logged and never fail the extraction.
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEBUG_ROOT = os.environ.get("TRENCH_DEBUG_DIR") or os.path.join(tempfile.gettempdir(), "trench_extractor_debug")
+DEBUG_MAX_AGE_SECONDS = int(os.environ.get("TRENCH_DEBUG_MAX_AGE_SECONDS", "3600"))
+DEBUG_MAX_RUNS = int(os.environ.get("TRENCH_DEBUG_MAX_RUNS", "20"))
+
+RUN_ID = re.compile(r"^[0-9a-f]{32}$")
+ARTIFACT_NAME = re.compile(r"^[\w.\-]+\.(?:png|txt)$")
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-artifacts")
+_prune_lock = threading.Lock()
+
+
+def _safe_part(value, limit=None):
+    return re.sub(r"[^\w.\-]+", "_", value or "")[:limit]
+
+
+class DebugStore:
+    """Debug images and text of one request, written asynchronously under DEBUG_ROOT/<run_id>."""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.directory = os.path.join(DEBUG_ROOT, self.run_id)
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def _name(self, name, source, extension):
+        if source:
+            name = f"{_safe_part(os.path.splitext(os.path.basename(source))[0], 60)}_{name}"
+        name = _safe_part(name)
+        return name if name.endswith(extension) else name + extension
+
+    def _submit(self, *args):
+        future = _writer.submit(*args)
+        with self._lock:
+            self._pending.append(future)
+
+    def save_image(self, name, img, source=None):
+        """Queue a grayscale / BGR image for PNG encoding; source (e.g. the PDF path) prefixes the name."""
+        self._submit(self._write, self._name(name, source, ".png"), img.copy())
+
+    def save_text(self, name, text, source=None):
+        """Queue text (a page dump, extracted fields) for writing as UTF-8; source prefixes the name."""
+        self._submit(self._write_text, self._name(name, source, ".txt"), str(text))
+
+    def _write_text(self, name, text):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+                f.write(text)
+        except Exception as e:
+            print(f"[ERROR] [debug] Could not write {name} for run {self.run_id}: {e}")
+
+    def _write(self, name, img):
+        import cv2
+        try:
+            ok, encoded = cv2.imencode(".png", img)
+            if not ok:
+                raise ValueError("PNG encoding failed")
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), "wb") as f:
+                f.write(encoded.tobytes())
+        except Exception as e:
+            print(f"[ERROR] [debug] Could not write {name} for run {self.run_id}: {e}")
+
+    def flush(self, timeout=None):
+        """Wait for queued writes (tests, or before listing artifacts of this run)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait(pending, timeout=timeout)
+        return self
+
+
+def new_store(enabled):
+    """A DebugStore for a request that asked for debug artifacts, None otherwise (the default)."""
+    if not enabled:
+        return None
+    prune()
+    return DebugStore()
+
+
+def prune(max_age_seconds=None, max_runs=None):
+    """Remove runs older than max_age_seconds, then the oldest runs beyond max_runs. Returns runs removed."""
+    max_age_seconds = DEBUG_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    max_runs = DEBUG_MAX_RUNS if max_runs is None else max_runs
+    if not os.path.isdir(DEBUG_ROOT):
+        return 0
+    with _prune_lock:
+        runs = []
+        for name in os.listdir(DEBUG_ROOT):
+            path = os.path.join(DEBUG_ROOT, name)
+            if RUN_ID.match(name) and os.path.isdir(path):
+                try:
+                    runs.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    continue
+        runs.sort(reverse=True)
+        now = time.time()
+        removed = 0
+        for index, (mtime, path) in enumerate(runs):
+            # Leave room for the run about to start
+            if now - mtime > max_age_seconds or index >= max_runs - 1:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def list_artifacts(run_id):
+    """Artifact names of a run, None when the run does not exist (or the id is malformed)."""
+    if not RUN_ID.match(run_id or ""):
+        return None
+    directory = os.path.join(DEBUG_ROOT, run_id)
+    if not os.path.isdir(directory):
+        return None
+    return sorted(name for name in os.listdir(directory) if ARTIFACT_NAME.match(name))
+
+
+def artifact_path(run_id, name):
+    """Path of one artifact, None unless both the run id and the name are well-formed and it exists."""
+    if not RUN_ID.match(run_id or "") or not ARTIFACT_NAME.match(name or ""):
+        return None
+    path = os.path.join(DEBUG_ROOT, run_id, name)
+    return path if os.path.isfile(path) else None
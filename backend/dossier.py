@@ -0,0 +1,219 @@
+# Site dossier: one dn_master row from a site's application PDF, its demand note PDF and its po_master row.
+# The three extractions run concurrently (the PO and budget lookups are network round trips, the two PDF
+# parsers are independent), then the row is assembled column by column from the same sources the
+# Validate Parsers screen used to merge client-side, and the derived budget / savings figures are computed.
+# RI budgets per site come from BudgetCache, which keeps the budget_master table in memory for
+# BUDGET_CACHE_SECONDS instead of querying Supabase per request.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from parsers.numbers import format_amount, parse_amount
+
+BUDGET_CACHE_SECONDS = int(os.environ.get("TRENCH_BUDGET_CACHE_SECONDS", "300"))
+
+# dn_master column -> (source, candidate keys in that source's output, first non-empty wins)
+FIELD_SOURCES = {
+    "route_type": ("PO", ["Category"]),
+    "route_id_site_id": ("PO", ["SiteID"]),
+    "uid": ("PO", ["UID"]),
+    "po_number": ("PO", ["PO No"]),
+    "po_length": ("PO", ["PO Length (Mtr)"]),
+    "parent_route": ("PO", ["Parent Route Name / HH"]),
+    "application_number": ("DN Application", ["Application Number"]),
+    "application_length_mtr": ("DN Application", ["Application Length (Mtr)"]),
+    "application_date": ("DN Application", ["Application Date"]),
+    "from_location": ("DN Application", ["From"]),
+    "to_location": ("DN Application", ["To"]),
+    "authority": ("DN Application", ["Authority"]),
+    "ward": ("DN Application", ["Ward"]),
+    "dn_number": ("DN", ["Demand Note Reference number"]),
+    "dn_length_mtr": ("DN", ["Section Length", "Section Length (Mtr.)"]),
+    "dn_received_date": ("DN", ["Demand Note Date"]),
+    "ot_length": ("DN", ["Section Length", "Section Length (Mtr.)"]),
+    "surface": ("DN", ["Road Types", "Road Types - CC/BT/TILES/ Normal Soil/kacha"]),
+    "surface_wise_ri_amount": ("DN", ["Surface-wise RI Amount"]),
+    "dn_ri_amount": ("DN", ["RI Amount"]),
+    "surface_wise_multiplication_factor": ("DN", ["Surface-wise Multiplication Factor"]),
+    "ground_rent": ("DN", ["Ground Rent"]),
+    "administrative_charge": ("DN", ["Administrative Charge"]),
+    "supervision_charges": ("DN", ["Supervision Charges"]),
+    "chamber_fee": ("DN", ["Chamber Fee"]),
+    "gst": ("DN", ["GST Amount", "GST"]),
+    "deposit": ("DN", ["SD Amount"]),
+}
+
+# Columns with the same value for every dossier of this project
+HARDCODED = {
+    "lmc_route": "LMC",
+    "ip1_co_built": "Co-Built",
+    "dn_recipient": "Airtel",
+    "project_name": "Mumbai Fiber Refresh Project",
+    "contract_type": "Co-Built",
+    "build_type": "New-build",
+    "category_type": "Non-Strategic",
+    "trench_type": "Open Trench",
+}
+
+
+def _supabase():
+    from supabase import create_client
+    return create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+
+
+class BudgetCache:
+    """budget_master RI budget per metre by site / route ID, reloaded at most every ttl seconds."""
+
+    def __init__(self, ttl=BUDGET_CACHE_SECONDS):
+        self.ttl = ttl
+        self._values = None
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        response = _supabase().table("budget_master").select("siteid_routeid, ri_cost_per_meter").execute()
+        return {
+            str(r["siteid_routeid"]).strip().lower(): r.get("ri_cost_per_meter")
+            for r in (response.data or []) if r.get("siteid_routeid") is not None
+        }
+
+    def get(self, site_id):
+        with self._lock:
+            if self._values is None or time.time() - self._loaded > self.ttl:
+                self._values = self._load()
+                self._loaded = time.time()
+                print(f"[LOG] [dossier] Loaded {len(self._values)} budget_master rows")
+            return self._values.get(str(site_id or "").strip().lower())
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+
+budget_cache = BudgetCache()
+
+
+def _clean(value):
+    if value is None or str(value).strip() in ("", "-", "nan", "None"):
+        return ""
+    return str(value).strip()
+
+
+def po_fields_from_row(row, site_id):
+    """PO fields (as /api/parse-po returns them) of a po_master row; the PO columns depend on the route type."""
+    route_type = _clean(row.get("route_type", ""))
+    route_type_norm = route_type.replace(" ", "").lower()
+    if route_type_norm in ["metrolm", "lmc(standalone)", "routelm"]:
+        po_no, po_length = _clean(row.get("po_no_cobuild", "")), _clean(row.get("po_length_cobuild", ""))
+    elif route_type_norm == "route":
+        po_no, po_length = _clean(row.get("po_no_ip1", "")), _clean(row.get("po_length_ip1", ""))
+    else:
+        po_no, po_length = "", ""
+    return {
+        "PO No": po_no,
+        "PO Length (Mtr)": po_length,
+        "Category": route_type,
+        "SiteID": _clean(row.get("route_id_site_id", site_id)),
+        "UID": _clean(row.get("uid", "")),
+        "Parent Route Name / HH": _clean(row.get("parent_route", "")),
+    }
+
+
+def po_fields(site_id):
+    """PO fields of a site from po_master, {"error": ...} when the site has no row."""
+    response = _supabase().table("po_master").select("*").eq("route_id_site_id", site_id).execute()
+    if not response.data:
+        return {"error": "No matching row found in po_master."}
+    return po_fields_from_row(response.data[0], site_id)
+
+
+def dn_fields(dn_path, authority, debug=None):
+    """
+    DN fields as /api/parse-dn returns them (the test dump where a parser has one, else the Non-Refundable row).
+    Detection and extraction share one context; debug is an optional debug_artifacts.DebugStore.
+    """
+    from parsers.context import ExtractionContext
+    from parsers.detection import resolve_authority
+    from parsers.registry import get_parser, parse_document
+    ctx = ExtractionContext(dn_path, debug=debug)
+    authority = resolve_authority(dn_path, authority, ctx=ctx)
+    parser = get_parser(authority)
+    if hasattr(parser, "extract_all_fields_for_testing"):
+        return parser.extract_all_fields_for_testing(dn_path, ctx=ctx)
+    headers, row, _, _ = parse_document(dn_path, authority, sd=False, ctx=ctx)
+    return dict(zip(headers, row))
+
+
+def _amount(value):
+    return parse_amount(value) if value not in (None, "") else None
+
+
+def derived_fields(row, ri_budget_per_meter):
+    """Budget, totals and savings columns computed from the extracted ones (None where an input is missing)."""
+    length = _amount(row.get("dn_length_mtr"))
+    budget = _amount(ri_budget_per_meter)
+    charges = [_amount(row.get(k)) for k in ("ground_rent", "administrative_charge", "dn_ri_amount", "supervision_charges")]
+    non_refundable = sum(v for v in charges if v) or None
+    dn_total = sum(
+        v for v in charges + [_amount(row.get(k)) for k in ("chamber_fee", "gst", "deposit")] if v
+    ) or None
+    per_meter = non_refundable / length if non_refundable is not None and length else None
+    savings_per_meter = budget - per_meter if budget is not None and per_meter is not None else None
+    derived = {
+        "ri_budget_amount_per_meter": budget,
+        "projected_budget_ri_amount_dn": budget * length if budget is not None and length is not None else None,
+        "actual_total_non_refundable": non_refundable,
+        "non_refundable_amount_per_mtr": per_meter,
+        "proj_non_refundable_savings_per_mtr": savings_per_meter,
+        "proj_savings_per_dn": savings_per_meter * length if savings_per_meter is not None and length is not None else None,
+        "total_dn_amount": dn_total,
+    }
+    return {k: format_amount(round(v, 2)) if v is not None else "" for k, v in derived.items()}
+
+
+def build_dossier(site_id, app_path, dn_path, authority="auto"):
+    """
+    {"fields": [{field, value, source}], "row": {dn_master column: value}, "errors": {source: message}}.
+    The application parse, the DN parse and the PO + budget lookups run concurrently; a failing source is
+    reported in errors and leaves its columns empty instead of failing the dossier.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = {
+            "PO": executor.submit(po_fields, site_id),
+            "DN Application": executor.submit(_application_fields, app_path),
+            "DN": executor.submit(dn_fields, dn_path, authority),
+            "Budget": executor.submit(budget_cache.get, site_id),
+        }
+        outputs, errors = {}, {}
+        for source, future in futures.items():
+            try:
+                outputs[source] = future.result()
+            except Exception as e:
+                print(f"[ERROR] [dossier] {source} failed for {site_id}: {e}")
+                outputs[source] = None
+                errors[source] = str(e)
+    for source in ("PO", "DN Application", "DN"):
+        value = outputs[source] or {}
+        if isinstance(value, dict) and "error" in value:
+            errors[source] = value["error"]
+            value = {}
+        outputs[source] = value
+    fields = [
+        {"field": k, "value": v, "source": source}
+        for source in ("PO", "DN Application", "DN") for k, v in outputs[source].items()
+    ]
+    row = dict(HARDCODED)
+    for column, (source, keys) in FIELD_SOURCES.items():
+        row[column] = next((_clean(outputs[source].get(k)) for k in keys if _clean(outputs[source].get(k))), "")
+    if not row["route_id_site_id"]:
+        row["route_id_site_id"] = site_id
+    row.update(derived_fields(row, outputs["Budget"]))
+    print(f"[LOG] [dossier] {site_id}: built in {time.perf_counter() - start:.2f}s, errors: {errors or 'none'}")
+    return {"fields": fields, "row": row, "errors": errors}
+
+
+def _application_fields(app_path):
+    from parsers.application_parser import application_parser
+    return application_parser(app_path)
@@ -0,0 +1,204 @@
+# Write-only Excel output for the Non-Refundable and SD sheets.
+# Templates (blue/manual columns, cell formats) are built once at import time;
+# workbooks are written with xlsxwriter straight into memory, so generating an
+# output never touches the disk.
+import io
+import xlsxwriter
+
+from parsers.registry import normalize_authority
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+COLUMN_WIDTH = 22
+
+# Cell styles (Calibri 11 is the xlsxwriter default font)
+_BASE_FORMAT = {
+    'font_name': 'Calibri',
+    'font_size': 11,
+    'align': 'center',
+    'valign': 'vcenter',
+    'text_wrap': True,
+    'border': 1,
+    'border_color': '#000000',
+}
+HEADER_FORMAT = dict(_BASE_FORMAT, bold=True, bg_color='#FFFF00', pattern=1)  # Yellow
+BLUE_HEADER_FORMAT = dict(_BASE_FORMAT, bold=True, bg_color='#B7E1FA', pattern=1)  # Light blue
+DATA_FORMAT = dict(_BASE_FORMAT)
+
+NON_REFUNDABLE = "non_refundable"
+SD = "sd"
+
+# Blue/manual headers, filled in by the user rather than the parser
+BLUE_HEADERS_NON_REFUNDABLE = [
+    "LM/BB/FTTH", "GO RATE", "Total Route (MTR)", "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)",
+    "REASON FOR DELAY (>2 DAYS)", "PO No.", "Route Name(As per CWIP)", "Section Name for ROW(As per CWIP)"
+]
+BLUE_HEADERS_SD = [
+    "Execution Partner GBPA PO No.", "Partner PO circle", "Unique route id", "NFA no."
+]
+
+
+class OutputTemplate:
+    """
+    Per-authority layout for one output sheet: which headers are highlighted blue.
+    The header style lookup is cached per header list, so repeated writes only pay for the row data.
+    """
+
+    def __init__(self, kind, blue_headers=None, sheet_name="Sheet1"):
+        self.kind = kind
+        self.blue_headers = frozenset(blue_headers or [])
+        self.sheet_name = sheet_name
+        self._header_styles = {}
+
+    def header_styles(self, headers):
+        key = tuple(headers)
+        styles = self._header_styles.get(key)
+        if styles is None:
+            styles = tuple(h in self.blue_headers for h in key)
+            self._header_styles[key] = styles
+        return styles
+
+
+# Every parser fills the MCGM Non-Refundable / SD layouts, so the MCGM blue columns are the default; keys are
+# registry authority names (normalize_authority), and a missing, "auto" or unknown authority gets the default
+DEFAULT_TEMPLATES = {
+    NON_REFUNDABLE: OutputTemplate(NON_REFUNDABLE, BLUE_HEADERS_NON_REFUNDABLE),
+    SD: OutputTemplate(SD, BLUE_HEADERS_SD),
+}
+AUTHORITY_TEMPLATES = {
+    "MCGM": DEFAULT_TEMPLATES,
+    "MBMC": {
+        NON_REFUNDABLE: OutputTemplate(NON_REFUNDABLE, BLUE_HEADERS_NON_REFUNDABLE),
+        SD: OutputTemplate(SD, BLUE_HEADERS_SD),
+    },
+}
+
+
+def get_template(authority, kind):
+    """Return the OutputTemplate for an authority and output kind ('non_refundable' or 'sd')."""
+    templates = AUTHORITY_TEMPLATES.get(normalize_authority(authority), DEFAULT_TEMPLATES)
+    return templates[kind]
+
+
+def register_template(authority, kind, blue_headers):
+    """Add or replace the template for an authority/output kind."""
+    key = normalize_authority(authority)
+    AUTHORITY_TEMPLATES.setdefault(key, dict(DEFAULT_TEMPLATES))[kind] = OutputTemplate(kind, blue_headers)
+
+
+def _add_formats(workbook):
+    return (
+        workbook.add_format(HEADER_FORMAT),
+        workbook.add_format(BLUE_HEADER_FORMAT),
+        workbook.add_format(DATA_FORMAT),
+    )
+
+
+def write_header(worksheet, headers, template, formats):
+    header_fmt, blue_fmt, _ = formats
+    for col, (header, is_blue) in enumerate(zip(headers, template.header_styles(headers))):
+        worksheet.write_string(0, col, header, blue_fmt if is_blue else header_fmt)
+    worksheet.set_column(0, len(headers) - 1, COLUMN_WIDTH)
+
+
+def write_data_row(worksheet, row_idx, row, width, data_fmt):
+    for col in range(width):
+        value = row[col] if col < len(row) else None
+        if value is None or value == "":
+            worksheet.write_blank(row_idx, col, None, data_fmt)
+        else:
+            worksheet.write(row_idx, col, value, data_fmt)
+
+
+def workbook_bytes(headers, rows, template=None):
+    """
+    Build an .xlsx with one header row and the given data rows and return it as bytes.
+    Nothing is written to disk.
+    """
+    template = template or DEFAULT_TEMPLATES[NON_REFUNDABLE]
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'in_memory': True, 'strings_to_numbers': False})
+    worksheet = workbook.add_worksheet(template.sheet_name)
+    formats = _add_formats(workbook)
+    write_header(worksheet, headers, template, formats)
+    for i, row in enumerate(rows, start=1):
+        write_data_row(worksheet, i, row, len(headers), formats[2])
+    workbook.close()
+    return buffer.getvalue()
+
+
+def output_filename(demand_note_number, kind):
+    label = "Non Refundable Output" if kind == NON_REFUNDABLE else "SD Output"
+    return f"{demand_note_number}_{label}.xlsx"
+
+
+class ConsolidatedWorkbook:
+    """
+    One workbook that accumulates a row per demand note (month-end batches).
+    Rows are flushed to the sheet as they are added (xlsxwriter constant_memory mode),
+    so memory use does not grow with the number of documents.
+    The header order is fixed by the first headers seen; later rows are mapped onto it by header name.
+    """
+
+    def __init__(self, output, template=None):
+        self.template = template or DEFAULT_TEMPLATES[NON_REFUNDABLE]
+        self.workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_numbers': False})
+        self.worksheet = self.workbook.add_worksheet(self.template.sheet_name)
+        self.formats = _add_formats(self.workbook)
+        self.headers = None
+        self.row_count = 0
+        self._closed = False
+
+    def add_row(self, headers, row, template=None):
+        """Write one row; template (the row's authority's) sets the header styles when this is the first row."""
+        if self.headers is None:
+            self.template = template or self.template
+            self.headers = list(headers)
+            write_header(self.worksheet, self.headers, self.template, self.formats)
+        elif list(headers) != self.headers:
+            by_name = dict(zip(headers, row))
+            row = [by_name.get(h, "") for h in self.headers]
+        self.row_count += 1
+        write_data_row(self.worksheet, self.row_count, row, len(self.headers), self.formats[2])
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.workbook.close()
+
+
+class BatchOutput:
+    """
+    Pair of consolidated Non-Refundable and SD workbooks for a batch of demand notes.
+    authority is the one the batch was submitted for ("auto" when detected per file); add() takes the authority
+    each document was actually parsed as, which picks the header styles and names the output (label).
+    """
+
+    def __init__(self, non_refundable_output, sd_output, authority=None):
+        self.authority = authority
+        self.authorities = []
+        self.non_refundable = ConsolidatedWorkbook(non_refundable_output, get_template(authority, NON_REFUNDABLE))
+        self.sd = ConsolidatedWorkbook(sd_output, get_template(authority, SD))
+
+    def add(self, headers, row, sd_headers=None, sd_row=None, authority=None):
+        authority = normalize_authority(authority or self.authority)
+        if authority and authority != "AUTO" and authority not in self.authorities:
+            self.authorities.append(authority)
+        self.non_refundable.add_row(headers, row, get_template(authority, NON_REFUNDABLE))
+        if sd_row is not None:
+            self.sd.add_row(sd_headers, sd_row, get_template(authority, SD))
+
+    @property
+    def label(self):
+        """File name prefix: the authorities of the rows written ("MCGM", "MCGM_NMMC"), "DN" before any row."""
+        return "_".join(self.authorities) or "DN"
+
+    def close(self):
+        self.non_refundable.close()
+        self.sd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
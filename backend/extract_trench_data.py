@@ -1,137 +1,86 @@
-# Only keep Excel writing and file handling logic here. All parser-specific logic is now in their respective files
-from parsers.mcgm import (
-    non_refundable_request_parser as mcgm_non_refundable_parser, 
-    sd_parser as mcgm_sd_parser, 
-    HEADERS, STATIC_VALUES
-)
-from parsers.mbmc import (
-    non_refundable_request_parser as mbmc_non_refundable_parser,
-    sd_parser as mbmc_sd_parser
-)
-import openpyxl
+# Only keep Excel writing and file handling logic here. All parser-specific logic is now in their respective files.
+# Parser modules (and camelot/OpenCV/Tesseract behind them) are loaded on first use through parsers.registry.
 import re
-from openpyxl.styles import Alignment
-from openpyxl.utils import get_column_letter
-import camelot
+from parsers.registry import parse_documents
+from parsers.detection import resolve_authority
+from excel_output import NON_REFUNDABLE, SD, BatchOutput, get_template, workbook_bytes, output_filename
 
 # --- Excel Writing Logic ---
 def append_row_to_excel(excel_path, row, headers, manual_fields=None, blue_headers=None):
+    """Legacy helper: write a single-row workbook to excel_path. Prefer excel_output.workbook_bytes."""
     import os
-    from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
+    from excel_output import OutputTemplate
     print(f"[DEBUG] Writing Excel file to: {os.path.abspath(excel_path)}")
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.append(headers)
-    ws.append(row)
-    # Style (generic, no MCGM-specific logic)
-    header_font = Font(name='Calibri', size=11, bold=True)  # Calibri 11, bold
-    data_font = Font(name='Calibri', size=11)  # Calibri 11
-    header_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow
-    blue_fill = PatternFill(start_color="B7E1FA", end_color="B7E1FA", fill_type="solid")  # Light blue
-    center_wrap = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin = Side(border_style="thin", color="000000")
-    border = Border(top=thin, left=thin, right=thin, bottom=thin)
-    blue_headers_set = set(blue_headers or [])
-    # Header row
-    for col in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=col)
-        cell.font = header_font
-        if headers[col-1] in blue_headers_set:
-            cell.fill = blue_fill
-        else:
-            cell.fill = header_fill
-        cell.alignment = center_wrap
-        cell.border = border
-    # Data row
-    for col in range(1, len(headers) + 1):
-        cell = ws.cell(row=2, column=col)
-        cell.font = data_font
-        cell.alignment = center_wrap
-        cell.border = border
-    # Adjust column widths and wrap text
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 22
-    wb.save(excel_path)
+    data = workbook_bytes(headers, [row], OutputTemplate(NON_REFUNDABLE, blue_headers))
+    with open(excel_path, "wb") as f:
+        f.write(data)
 
-def process_demand_note(uploaded_file_path, authority, manual_values=None, sd_manual_values=None, return_paths=False):
+def parse_demand_note_rows(pdf_path, authority, manual_values=None, sd_manual_values=None):
     """
-    Handles the uploaded PDF and returns paths to the generated Excel files for non-refundable and SD outputs.
-    Also returns a flag if the majority of dynamic fields are blank (for file validation in UI).
+    Run the authority's row builders on one PDF (one shared extraction context).
+    Returns (results, template_authority) where results has one (headers, row, sd_headers, sd_row) per demand
+    note in the file (several for combined NMMC PDFs); sd_row is None when there is no SD builder.
+    A missing, "auto" or unregistered authority is detected from the first page (ValueError if that fails).
+    """
+    authority = resolve_authority(pdf_path, authority)
+    return parse_documents(pdf_path, authority, manual_values, sd_manual_values), authority
+
+def process_demand_note_batch(pdf_paths, authority, non_ref_output, sd_output, manual_values=None, sd_manual_values=None, on_error=None):
+    """
+    Parse many demand notes into one consolidated Non-Refundable workbook and one SD workbook (a row per DN).
+    non_ref_output / sd_output are file paths or binary file objects. Each document is parsed and written
+    before the next one is opened, so only one document's rows are held in memory at a time.
+    pdf_paths may be any iterable (e.g. a generator that materialises each upload lazily).
+    Returns (demand note numbers written, output label naming the authorities the files were parsed as);
+    failures are passed to on_error(path, exc) if given.
+    """
+    written = []
+    with BatchOutput(non_ref_output, sd_output, authority) as batch:
+        for pdf_path in pdf_paths:
+            try:
+                results, file_authority = parse_demand_note_rows(pdf_path, authority, manual_values, sd_manual_values)
+            except Exception as e:
+                print(f"[ERROR] [batch] Failed to parse {pdf_path}: {e}")
+                if on_error:
+                    on_error(pdf_path, e)
+                continue
+            for headers, row, alt_headers, row_alt in results:
+                batch.add(headers, row, alt_headers, row_alt, file_authority)
+                written.append(row[headers.index("Demand Note Reference number")])
+    print(f"[DEBUG] [batch] Wrote {len(written)} demand notes")
+    return written, batch.label
+
+def process_demand_note(uploaded_file_path, authority, manual_values=None, sd_manual_values=None, return_paths=False, return_bytes=False):
+    """
+    Handles the uploaded PDF and builds the Non-Refundable and SD Excel outputs in memory.
+    A PDF carrying several demand notes gets one row per DN in each workbook.
+    return_bytes=True returns (non_ref_bytes, non_ref_filename, sd_bytes, sd_filename, demand_note_number).
+    return_paths=True additionally writes both workbooks next to the PDF (legacy) and returns their paths.
     Accepts manual_values dict for MCGM non-refundable blue-highlighted fields and sd_manual_values for SD output blue fields.
     """
     import os
-    import fitz
     print(f"[DEBUG] process_demand_note: uploaded_file_path={uploaded_file_path}, authority={authority}")
     tmp_pdf_path = uploaded_file_path  # Now just use the path directly
     base, _ = os.path.splitext(tmp_pdf_path)
 
-    # Define blue/manual headers for MCGM
-    blue_headers_non_ref = [
-        "LM/BB/FTTH", "GO RATE", "Total Route (MTR)", "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)",
-        "REASON FOR DELAY (>2 DAYS)", "PO No.", "Route Name(As per CWIP)", "Section Name for ROW(As per CWIP)"
-    ]
-    blue_headers_sd = [
-        "Execution Partner GBPA PO No.", "Partner PO circle", "Unique route id", "NFA no."
-    ]
-    # Define blue/manual headers for MBMC (fill this list as needed)
-    blue_headers_non_ref_mbmc = [
-        "LM/BB/FTTH", "GO RATE", "Total Route (MTR)", "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)",
-        "REASON FOR DELAY (>2 DAYS)", "PO No.", "Route Name(As per CWIP)", "Section Name for ROW(As per CWIP)"
-        # Add more MBMC manual headers here as needed
-    ]
-    blue_headers_sd_mbmc = [
-        "Execution Partner GBPA PO No.", "Partner PO circle", "Unique route id", "NFA no."
-        # Add more MBMC SD manual headers here as needed
-    ]
-    # Non-refundable output
-    if authority.upper() == "MCGM":
-        row = mcgm_non_refundable_parser(tmp_pdf_path, manual_values=manual_values)
-        print(f"[DEBUG] [excel] Writing row to Non-Refundable Excel: {row}")
-        # Re-extract demand note number after manual fields are applied
-        try:
-            demand_note_number = row[HEADERS.index("Demand Note Reference number")]
-        except Exception:
-            demand_note_number = "UnknownDemandNote"
-        if not demand_note_number:
-            demand_note_number = "UnknownDemandNote"
-        safe_demand_note_number = sanitize_filename(demand_note_number)
-        tmp_xlsx_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_Non Refundable Output.xlsx")
-        append_row_to_excel(tmp_xlsx_path, row, HEADERS, manual_fields=manual_values, blue_headers=blue_headers_non_ref)
-        # SD output for MCGM
-        alt_headers, row_alt = mcgm_sd_parser(tmp_pdf_path, manual_values=sd_manual_values)
-        tmp_xlsx_alt_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_SD Output.xlsx")
-        append_row_to_excel(tmp_xlsx_alt_path, row_alt, alt_headers, manual_fields=sd_manual_values, blue_headers=blue_headers_sd)
-        sd_xlsx_alt_path = tmp_xlsx_alt_path
-    elif authority.upper() == "MBMC":
-        row = mbmc_non_refundable_parser(tmp_pdf_path, manual_values=manual_values)
-        print(f"[DEBUG] [excel] Writing row to Non-Refundable Excel: {row}")
-        try:
-            demand_note_number = row[HEADERS.index("Demand Note Reference number")]
-        except Exception:
-            demand_note_number = "UnknownDemandNote"
-        if not demand_note_number:
-            demand_note_number = "UnknownDemandNote"
-        safe_demand_note_number = sanitize_filename(demand_note_number)
-        tmp_xlsx_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_Non Refundable Output.xlsx")
-        append_row_to_excel(tmp_xlsx_path, row, HEADERS, manual_fields=manual_values, blue_headers=blue_headers_non_ref_mbmc)
-        # SD output for MBMC
-        alt_headers, row_alt = mbmc_sd_parser(tmp_pdf_path, manual_values=sd_manual_values)
-        tmp_xlsx_alt_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_SD Output.xlsx")
-        append_row_to_excel(tmp_xlsx_alt_path, row_alt, alt_headers, manual_fields=sd_manual_values, blue_headers=blue_headers_sd_mbmc)
-        sd_xlsx_alt_path = tmp_xlsx_alt_path
-    else:
-        row = mcgm_non_refundable_parser(tmp_pdf_path)
-        print(f"[DEBUG] [excel] Writing row to Non-Refundable Excel: {row}")
-        try:
-            demand_note_number = row[HEADERS.index("Demand Note Reference number")]
-        except Exception:
-            demand_note_number = "UnknownDemandNote"
-        if not demand_note_number:
-            demand_note_number = "UnknownDemandNote"
-        safe_demand_note_number = sanitize_filename(demand_note_number)
-        tmp_xlsx_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_Non Refundable Output.xlsx")
-        append_row_to_excel(tmp_xlsx_path, row, HEADERS, manual_fields=manual_values, blue_headers=blue_headers_non_ref)
-        sd_xlsx_alt_path = None
+    sd_bytes = None
+    results, template_authority = parse_demand_note_rows(tmp_pdf_path, authority, manual_values, sd_manual_values)
+    HEADERS, row, alt_headers, _ = results[0]
+    rows = [r[1] for r in results]
+    sd_rows = [r[3] for r in results if r[3] is not None]
+    print(f"[DEBUG] [excel] Writing rows to Non-Refundable Excel: {rows}")
+    # Re-extract demand note number(s) after manual fields are applied
+    try:
+        demand_note_number = "_".join(str(r[HEADERS.index("Demand Note Reference number")]) for r in rows if r[HEADERS.index("Demand Note Reference number")])
+    except Exception:
+        demand_note_number = "UnknownDemandNote"
+    if not demand_note_number:
+        demand_note_number = "UnknownDemandNote"
+    non_ref_bytes = workbook_bytes(HEADERS, rows, get_template(template_authority, NON_REFUNDABLE))
+    if sd_rows:
+        sd_bytes = workbook_bytes(alt_headers, sd_rows, get_template(template_authority, SD))
+    non_ref_filename = output_filename(demand_note_number, NON_REFUNDABLE)
+    sd_filename = output_filename(demand_note_number, SD)
     # Check if majority of dynamic fields are blank (only those present in HEADERS)
     dynamic_fields = [
         "Demand Note Reference number",
@@ -152,14 +101,23 @@ def process_demand_note(uploaded_file_path, authority, manual_values=None, sd_ma
     present_fields = [f for f in dynamic_fields if f in HEADERS]
     blank_count = sum(1 for f in present_fields if row[HEADERS.index(f)] == "" or row[HEADERS.index(f)] is None)
     majority_blank = blank_count >= (len(present_fields) // 2 + 1)
+    if return_bytes:
+        return non_ref_bytes, non_ref_filename, sd_bytes, sd_filename, demand_note_number
     if return_paths:
+        safe_demand_note_number = sanitize_filename(demand_note_number)
+        tmp_xlsx_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_Non Refundable Output.xlsx")
+        with open(tmp_xlsx_path, "wb") as f:
+            f.write(non_ref_bytes)
+        sd_xlsx_alt_path = None
+        if sd_bytes is not None:
+            sd_xlsx_alt_path = os.path.join(os.path.dirname(base), f"{safe_demand_note_number}_SD Output.xlsx")
+            with open(sd_xlsx_alt_path, "wb") as f:
+                f.write(sd_bytes)
         print(f"[DEBUG] Returning paths: Non-Refundable: {tmp_xlsx_path}, SD: {sd_xlsx_alt_path}")
         return tmp_xlsx_path, sd_xlsx_alt_path, demand_note_number
     # Default: return the Non-Refundable Excel file as bytes (for FastAPI StreamingResponse)
-    with open(tmp_xlsx_path, "rb") as f:
-        excel_bytes = f.read()
     # Return both the bytes and the filename for FastAPI to use in Content-Disposition
-    return excel_bytes, f"{demand_note_number}_Non Refundable Output.xlsx"
+    return non_ref_bytes, non_ref_filename
 
 def sanitize_filename(name):
     # Replace all non-alphanumeric and non-underscore/dash with underscore
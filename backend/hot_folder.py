@@ -0,0 +1,332 @@
+# Hot-folder ingestion for the site-wise document trees ("Site-wise DN and other details/<site>/...",
+# "ROUTES/<route>/..."). Each scan walks the roots, compares every file with a manifest of
+# (path, size, mtime, sha256) kept in a local SQLite database, and only files that are new or whose content
+# changed are classified and parsed. Unchanged files are recognised by size and mtime without being read;
+# a touched file whose hash is unchanged is not parsed again, and neither is a copy of an already parsed
+# file (the "For Bank" folders repeat the DNs), which reuses the stored result.
+# Classification is by file name first (Application / Demand Note / Permit / PO / KMZ ...) and by the first
+# page's text for PDFs whose name says nothing. Parsing runs in a process pool (the parsers are CPU bound
+# and hold the GIL); results are stored per file and merged per site into the {"data": [{field, value}]}
+# payload /api/send-to-master-dn takes (see site_payload).
+#
+#   python hot_folder.py                      # watch the default roots, rescanning every HOT_FOLDER_INTERVAL s
+#   python hot_folder.py --once ROUTES        # one incremental scan of the given roots
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOTS = [
+    os.path.join(REPO_ROOT, "Site-wise DN and other details"),
+    os.path.join(REPO_ROOT, "ROUTES"),
+]
+HOT_FOLDER_ROOTS = [p for p in os.environ.get("TRENCH_HOT_FOLDERS", "").split(os.pathsep) if p] or DEFAULT_ROOTS
+HOT_FOLDER_DIR = os.environ.get("TRENCH_HOT_FOLDER_DIR") or os.path.join(tempfile.gettempdir(), "trench_extractor_hot_folder")
+HOT_FOLDER_DB = os.path.join(HOT_FOLDER_DIR, "manifest.sqlite3")
+HOT_FOLDER_WORKERS = int(os.environ.get("TRENCH_HOT_FOLDER_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+HOT_FOLDER_INTERVAL = float(os.environ.get("TRENCH_HOT_FOLDER_INTERVAL", "60"))
+
+# Document types
+APPLICATION = "application"
+DEMAND_NOTE = "demand_note"
+PERMIT = "permit"
+PURCHASE_ORDER = "purchase_order"
+ROUTE_KML = "route_kml"
+DRAWING = "drawing"
+DN_TEMPLATE = "dn_template"
+DN_DRAFT = "dn_draft"
+UNKNOWN = "unknown"
+
+# File-name rules, first match wins (case-insensitive, on the base name)
+NAME_RULES = (
+    (r"\.km[lz]$", ROUTE_KML),
+    (r"\.pptx?$", DRAWING),
+    (r"\.xls[xbm]?$", DN_TEMPLATE),
+    (r"\.docx?$", DN_DRAFT),
+    (r"application", APPLICATION),
+    (r"demand\s*note|(^|[\s_\-])DN([\s_\-.]|$)", DEMAND_NOTE),
+    (r"permi(t|ssion)", PERMIT),
+    (r"(^|[\s_\-])P\.?O([\s_\-.]|$)|purchase\s*order", PURCHASE_ORDER),
+    (r"drawing|\bdwg\b", DRAWING),
+)
+# First-page text rules for PDFs the name does not classify
+TEXT_RULES = (
+    (r"purchase\s+order", PURCHASE_ORDER),
+    (r"application\s+(no|for)", APPLICATION),
+    (r"demand\s+note", DEMAND_NOTE),
+    (r"permission\s+(is\s+)?(hereby\s+)?granted|\bpermit\b", PERMIT),
+)
+WATCHED_EXTENSIONS = (".pdf", ".kmz", ".kml", ".pptx", ".ppt", ".xlsb", ".xlsx", ".xls", ".docx", ".doc")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    path TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    parsed REAL
+);
+CREATE INDEX IF NOT EXISTS manifest_sha256 ON manifest(sha256);
+CREATE INDEX IF NOT EXISTS manifest_site ON manifest(site);
+"""
+
+
+def _db():
+    os.makedirs(HOT_FOLDER_DIR, exist_ok=True)
+    conn = sqlite3.connect(HOT_FOLDER_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def site_of(path, roots):
+    """The site / route folder a file belongs to: the first directory below its root (roots hold site folders)."""
+    for root in roots:
+        rel = os.path.relpath(path, root)
+        if not rel.startswith(".."):
+            parts = rel.split(os.sep)
+            return parts[0] if len(parts) > 1 else ""
+    return ""
+
+
+def classify_name(path):
+    name = os.path.basename(path)
+    for pattern, doc_type in NAME_RULES:
+        if re.search(pattern, name, re.IGNORECASE):
+            return doc_type
+    return UNKNOWN
+
+
+def classify_text(text):
+    for pattern, doc_type in TEXT_RULES:
+        if re.search(pattern, text or "", re.IGNORECASE):
+            return doc_type
+    return UNKNOWN
+
+
+# --- Parsing (runs in worker processes) ---
+
+def _parse_application(path):
+    from parsers.application_parser import application_parser
+    return application_parser(path)
+
+
+def _parse_demand_note(path):
+    from extract_trench_data import parse_demand_note_rows
+    results, authority = parse_demand_note_rows(path, "auto")
+    return [
+        {"authority": authority, "fields": dict(zip(headers, row)), "sd_fields": dict(zip(sd_headers, sd_row)) if sd_row else None}
+        for headers, row, sd_headers, sd_row in results
+    ]
+
+
+def _parse_purchase_order(path):
+    from parsers.po_document import po_document_parser
+    return po_document_parser(path)
+
+
+def _parse_route_kml(path):
+    from route_geometry import line_lengths, read_lines
+    lines = read_lines(path)
+    lengths = line_lengths([line.coords for line in lines])
+    return {
+        "lines": [{"placemark": line.placemark, "length_m": round(float(v), 2)} for line, v in zip(lines, lengths)],
+        "length_m": round(float(lengths.sum()), 2),
+    }
+
+
+# Document types with a parser; the others are tracked in the manifest only
+PARSERS = {
+    APPLICATION: _parse_application,
+    DEMAND_NOTE: _parse_demand_note,
+    PURCHASE_ORDER: _parse_purchase_order,
+    ROUTE_KML: _parse_route_kml,
+}
+
+
+def process_file(path, doc_type):
+    """(doc_type, result) of one file: PDFs the name did not classify are classified by their first page."""
+    if doc_type == UNKNOWN and path.lower().endswith(".pdf"):
+        import fitz
+        with fitz.open(path) as doc:
+            doc_type = classify_text(doc[0].get_text() if len(doc) else "")
+    parser = PARSERS.get(doc_type)
+    return doc_type, (parser(path) if parser else None)
+
+
+# --- Scanning ---
+
+def scan(roots=None, max_workers=None, retry_failed=False):
+    """
+    One incremental pass over roots. Returns counts: seen, unchanged, parsed, reused, skipped, failed, removed.
+    Files that failed before are only parsed again when they change, or with retry_failed.
+    """
+    roots = [os.path.abspath(r) for r in (roots or HOT_FOLDER_ROOTS) if os.path.isdir(r)]
+    stats = dict.fromkeys(("seen", "unchanged", "parsed", "reused", "skipped", "failed", "removed"), 0)
+    start = time.perf_counter()
+    seen = set()
+    todo = []
+    with closing(_db()) as conn:
+        known = {r["path"]: r for r in conn.execute("SELECT path, size, mtime, sha256, state FROM manifest")}
+        for root in roots:
+            for dirpath, _dirs, names in os.walk(root):
+                for name in names:
+                    if not name.lower().endswith(WATCHED_EXTENSIONS) or name.startswith("~$"):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    stats["seen"] += 1
+                    entry = known.get(path)
+                    retry = retry_failed and entry is not None and entry["state"] == "failed"
+                    if entry is not None and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime and not retry:
+                        stats["unchanged"] += 1
+                        continue
+                    sha256 = file_sha256(path)
+                    if entry is not None and entry["sha256"] == sha256 and not retry:
+                        conn.execute("UPDATE manifest SET size = ?, mtime = ? WHERE path = ?", (st.st_size, st.st_mtime, path))
+                        stats["unchanged"] += 1
+                        continue
+                    todo.append((path, site_of(path, roots), st.st_size, st.st_mtime, sha256, classify_name(path)))
+        # Files that disappeared from the watched roots
+        for path in known:
+            if path not in seen and any(not os.path.relpath(path, r).startswith("..") for r in roots):
+                conn.execute("DELETE FROM manifest WHERE path = ?", (path,))
+                stats["removed"] += 1
+        conn.commit()
+
+        # Copies of files already parsed (or about to be, in this scan) reuse the stored result
+        to_parse = []
+        copies = {}
+        for item in todo:
+            path, site, size, mtime, sha256, doc_type = item
+            if sha256 in copies:
+                copies[sha256].append(item)
+                continue
+            copy = conn.execute(
+                "SELECT doc_type, state, result FROM manifest WHERE sha256 = ? AND state IN ('done', 'skipped') LIMIT 1",
+                (sha256,),
+            ).fetchone()
+            if copy is not None:
+                _store(conn, item, copy["doc_type"], copy["state"], copy["result"], None)
+                stats["reused"] += 1
+            elif doc_type in PARSERS or doc_type == UNKNOWN:
+                to_parse.append(item)
+                copies[sha256] = []
+            else:
+                _store(conn, item, doc_type, "skipped", None, None)
+                stats["skipped"] += 1
+        conn.commit()
+
+        if to_parse:
+            workers = min(max_workers or HOT_FOLDER_WORKERS, len(to_parse))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(process_file, item[0], item[5]): item for item in to_parse}
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        doc_type, result = future.result()
+                    except Exception as e:
+                        print(f"[ERROR] [hot-folder] {item[0]}: {e}")
+                        for target in [item] + copies[item[4]]:
+                            _store(conn, target, item[5], "failed", None, str(e))
+                        stats["failed"] += 1 + len(copies[item[4]])
+                    else:
+                        state = "done" if doc_type in PARSERS else "skipped"
+                        encoded = json.dumps(result, default=str) if result is not None else None
+                        for target in [item] + copies[item[4]]:
+                            _store(conn, target, doc_type, state, encoded, None)
+                        stats["parsed" if state == "done" else "skipped"] += 1
+                        stats["reused"] += len(copies[item[4]])
+                    conn.commit()
+    print(f"[LOG] [hot-folder] Scan of {len(roots)} roots in {time.perf_counter() - start:.1f}s: {stats}")
+    return stats
+
+
+def _store(conn, item, doc_type, state, result, error):
+    path, site, size, mtime, sha256, _ = item
+    conn.execute(
+        "INSERT OR REPLACE INTO manifest (path, site, size, mtime, sha256, doc_type, state, result, error, parsed)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (path, site, size, mtime, sha256, doc_type, state, result, error, time.time()),
+    )
+
+
+# --- Results ---
+
+def site_files(site):
+    """Manifest entries of one site / route folder, with parsed results decoded."""
+    with closing(_db()) as conn:
+        rows = conn.execute("SELECT * FROM manifest WHERE site = ? ORDER BY path", (site,)).fetchall()
+    return [{**dict(r), "result": json.loads(r["result"]) if r["result"] else None} for r in rows]
+
+
+def site_payload(site):
+    """
+    /api/send-to-master-dn bodies for a site: one {"data": [{field, value}]} per demand note, with the site ID
+    and the fields of the site's application for that DN (same number, or the only application) filled in.
+    """
+    files = site_files(site)
+    applications = [f["result"] for f in files if f["doc_type"] == APPLICATION and f["result"]]
+    payloads, seen = [], set()
+    for f in files:
+        if f["doc_type"] != DEMAND_NOTE or not f["result"]:
+            continue
+        for doc in f["result"]:
+            dn_number = str(doc["fields"].get("Demand Note Reference number") or "")
+            matching = [a for a in applications if a.get("Application Number") and a["Application Number"] in dn_number]
+            application = matching[0] if matching else (applications[0] if len(applications) == 1 else {})
+            fields = {"SiteID": site, **application, **doc["fields"]}
+            key = fields.get("Demand Note Reference number") or f["sha256"]
+            if key in seen:
+                continue
+            seen.add(key)
+            payloads.append({"source": f["path"], "data": [{"field": k, "value": v} for k, v in fields.items()]})
+    return payloads
+
+
+def watch(roots=None, interval=None, retry_failed=False):
+    """Rescan forever; a failing scan is logged and retried on the next round."""
+    interval = HOT_FOLDER_INTERVAL if interval is None else interval
+    while True:
+        try:
+            scan(roots, retry_failed=retry_failed)
+        except Exception as e:
+            print(f"[ERROR] [hot-folder] Scan failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="Incrementally parse the site-wise document folders.")
+    arg_parser.add_argument("roots", nargs="*", help="folders to watch (default: TRENCH_HOT_FOLDERS or the repo trees)")
+    arg_parser.add_argument("--once", action="store_true", help="scan once and exit")
+    arg_parser.add_argument("--interval", type=float, default=None, help="seconds between scans")
+    arg_parser.add_argument("--retry-failed", action="store_true", help="parse files that failed before again")
+    args = arg_parser.parse_args()
+    if args.once:
+        print(json.dumps(scan(args.roots or None, retry_failed=args.retry_failed), indent=2))
+    else:
+        watch(args.roots or None, args.interval, args.retry_failed)
@@ -0,0 +1,393 @@
+# Persistent ingestion jobs, so long parses (MBMC OCR, month-end batches, actual-cost runs) do not live
+# inside an HTTP request. A job is a list of uploaded files plus a kind ("dn": Non-Refundable + SD rows,
+# "cost": the actual-cost fields); the uploads are moved into JOBS_DIR and every file becomes one item row
+# in a local SQLite database. Worker threads claim pending items one at a time, store each item's result
+# (JSON) or error, and the job finishes when no item is pending or running.
+# Everything lives in the database, so a restarted server picks up where it stopped: finished items are never
+# parsed again, and a claimed item carries its owner (host:pid of the worker process) and a heartbeat that the
+# owner renews while it runs. An item whose heartbeat is older than JOB_LEASE_SECONDS belonged to a process
+# that died; it goes back to pending (recover) or is claimed again directly. Items held by another live
+# process (a second server or a CLI run on the same database) are left alone.
+# Failed items keep their upload and can be put back in the queue with retry().
+# JOBS_DIR must survive restarts for that; point TRENCH_JOBS_DIR at persistent storage in deployments.
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import socket
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+
+JOBS_DIR = os.environ.get("TRENCH_JOBS_DIR") or os.path.join(tempfile.gettempdir(), "trench_extractor_jobs")
+JOBS_DB = os.path.join(JOBS_DIR, "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("TRENCH_JOB_WORKERS", "2"))
+# A worker with nothing to do re-checks the queue at least this often (other processes may add items)
+POLL_SECONDS = 5.0
+# A running item whose owner has not renewed its heartbeat for this long is considered abandoned
+JOB_LEASE_SECONDS = float(os.environ.get("TRENCH_JOB_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 4
+# This process, as recorded on the items it claims
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    authority TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    idx INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    started REAL,
+    finished REAL,
+    owner TEXT,
+    heartbeat REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items(state);
+"""
+
+_wakeup = threading.Condition()
+_workers = []
+_stop = threading.Event()
+_initialised = False
+_init_lock = threading.Lock()
+
+
+@contextmanager
+def _db():
+    """A connection in autocommit mode; callers open their own transactions where they need one."""
+    init()
+    with closing(sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)) as conn:
+        conn.row_factory = sqlite3.Row
+        yield conn
+
+
+def init():
+    """Create the jobs directory and database (idempotent)."""
+    global _initialised
+    if _initialised:
+        return
+    with _init_lock:
+        if _initialised:
+            return
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        with closing(sqlite3.connect(JOBS_DB, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Databases created before items had an owner and heartbeat
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(items)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE items ADD COLUMN {column} {kind}")
+            conn.commit()
+        _initialised = True
+
+
+# --- Item handlers, by job kind ---
+
+def _parse_dn(path, authority):
+    """Non-Refundable and SD rows of every demand note in the file."""
+    from extract_trench_data import parse_demand_note_rows
+    results, file_authority = parse_demand_note_rows(path, authority)
+    return [
+        {"authority": file_authority, "headers": headers, "row": row, "sd_headers": sd_headers, "sd_row": sd_row}
+        for headers, row, sd_headers, sd_row in results
+    ]
+
+
+def _parse_cost(path, authority):
+    """The actual-cost fields of every demand note in the file."""
+    from parsers.actual_cost_extraction import COST_FIELDS
+    from parsers.detection import resolve_authority
+    from parsers.registry import extract_fields_documents
+    file_authority = resolve_authority(path, authority)
+    return [{"authority": file_authority, **values} for values in extract_fields_documents(path, file_authority, COST_FIELDS)]
+
+
+JOB_KINDS = {
+    "dn": _parse_dn,
+    "cost": _parse_cost,
+}
+
+
+# --- Queue ---
+
+def submit(kind, authority, uploads):
+    """
+    Queue a job over uploads, a list of (filename, path) of files in the managed temp dir; the files are
+    moved into the job's directory. Returns the job id.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'. Available: {', '.join(sorted(JOB_KINDS))}")
+    if not uploads:
+        raise ValueError("A job needs at least one file.")
+    init()
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(JOBS_DIR, "files", job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    items = []
+    for idx, (filename, path) in enumerate(uploads):
+        stored = os.path.join(job_dir, f"{idx}_{os.path.basename(filename or 'upload.pdf')}")
+        shutil.move(path, stored)
+        items.append((job_id, idx, filename or os.path.basename(path), stored, PENDING))
+    now = time.time()
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT INTO jobs (id, kind, authority, state, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, authority or "auto", PENDING, now, now),
+        )
+        conn.executemany("INSERT INTO items (job_id, idx, filename, path, state) VALUES (?, ?, ?, ?, ?)", items)
+        conn.execute("COMMIT")
+    print(f"[LOG] [jobs] Queued {kind} job {job_id} with {len(items)} files")
+    _notify()
+    return job_id
+
+
+def retry(job_id):
+    """Put the failed items of a job back in the queue. Returns how many were re-queued (None: no such job)."""
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+            conn.execute("ROLLBACK")
+            return None
+        count = conn.execute(
+            "UPDATE items SET state = ?, error = NULL WHERE job_id = ? AND state = ?", (PENDING, job_id, FAILED)
+        ).rowcount
+        if count:
+            conn.execute("UPDATE jobs SET state = ?, updated = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+        conn.execute("COMMIT")
+    if count:
+        print(f"[LOG] [jobs] Re-queued {count} failed items of job {job_id}")
+        _notify()
+    return count
+
+
+def _claim(owner=OWNER):
+    """
+    Mark the oldest pending (or abandoned running) item running under owner and return it (with its job's
+    kind and authority), or None.
+    """
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        item = conn.execute(
+            "SELECT items.job_id, items.idx, items.filename, items.path, jobs.kind, jobs.authority"
+            " FROM items JOIN jobs ON jobs.id = items.job_id"
+            " WHERE items.state = ? OR (items.state = ? AND COALESCE(items.heartbeat, 0) < ?)"
+            " ORDER BY jobs.created, items.idx LIMIT 1",
+            (PENDING, RUNNING, now - JOB_LEASE_SECONDS),
+        ).fetchone()
+        if item is not None:
+            conn.execute(
+                "UPDATE items SET state = ?, attempts = attempts + 1, started = ?, owner = ?, heartbeat = ?"
+                " WHERE job_id = ? AND idx = ?",
+                (RUNNING, now, owner, now, item["job_id"], item["idx"]),
+            )
+            conn.execute("UPDATE jobs SET state = ?, updated = ? WHERE id = ?", (RUNNING, now, item["job_id"]))
+        conn.execute("COMMIT")
+    return item
+
+
+def _finish(item, result=None, error=None, owner=OWNER):
+    """Store an item's outcome and close the job when nothing is left to do."""
+    now = time.time()
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        stored = conn.execute(
+            "UPDATE items SET state = ?, result = ?, error = ?, finished = ?"
+            " WHERE job_id = ? AND idx = ? AND state = ? AND owner = ?",
+            (
+                FAILED if error else DONE,
+                None if error else json.dumps(result, default=str),
+                error, now, item["job_id"], item["idx"], RUNNING, owner,
+            ),
+        ).rowcount
+        if not stored:
+            # The lease ran out and another worker has the item now; its outcome is the one that counts
+            conn.execute("ROLLBACK")
+            print(f"[LOG] [jobs] {item['job_id']} {item['filename']}: lease lost, result dropped")
+            return
+        counts = _counts(conn, item["job_id"])
+        finished = counts[PENDING] == 0 and counts[RUNNING] == 0
+        if finished:
+            state = FAILED if counts[FAILED] else DONE
+            conn.execute("UPDATE jobs SET state = ?, updated = ? WHERE id = ?", (state, now, item["job_id"]))
+        else:
+            conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (now, item["job_id"]))
+        conn.execute("COMMIT")
+    if not error:
+        # The upload is only kept while the item may still need it (pending, running or failed)
+        try:
+            os.remove(item["path"])
+        except OSError:
+            pass
+    if finished and not counts[FAILED]:
+        shutil.rmtree(os.path.join(JOBS_DIR, "files", item["job_id"]), ignore_errors=True)
+
+
+def _run(item):
+    handler = JOB_KINDS.get(item["kind"])
+    start = time.perf_counter()
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind '{item['kind']}'")
+        if not os.path.exists(item["path"]):
+            raise FileNotFoundError(f"Upload of {item['filename']} is gone")
+        result = handler(item["path"], item["authority"])
+    except Exception as e:
+        print(f"[ERROR] [jobs] {item['job_id']} {item['filename']}: {e}")
+        _finish(item, error=str(e))
+        return
+    print(f"[LOG] [jobs] {item['job_id']} {item['filename']}: done in {time.perf_counter() - start:.2f}s")
+    _finish(item, result=result)
+
+
+def _notify():
+    with _wakeup:
+        _wakeup.notify_all()
+
+
+def _worker_loop():
+    while not _stop.is_set():
+        try:
+            item = _claim()
+        except Exception as e:
+            print(f"[ERROR] [jobs] Could not claim an item: {e}")
+            item = None
+        if item is None:
+            with _wakeup:
+                _wakeup.wait(POLL_SECONDS)
+            continue
+        _run(item)
+
+
+def _heartbeat_loop():
+    """Renew the heartbeat of every item this process is running."""
+    while not _stop.wait(HEARTBEAT_SECONDS):
+        try:
+            with _db() as conn:
+                conn.execute(
+                    "UPDATE items SET heartbeat = ? WHERE state = ? AND owner = ?", (time.time(), RUNNING, OWNER)
+                )
+        except Exception as e:
+            print(f"[ERROR] [jobs] Heartbeat failed: {e}")
+
+
+def recover(lease_seconds=None):
+    """
+    Running items whose owner stopped renewing their heartbeat (a process that died) go back to pending;
+    items of live processes are kept. Returns how many were reset.
+    """
+    stale = time.time() - (JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds)
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        count = conn.execute(
+            "UPDATE items SET state = ?, owner = NULL WHERE state = ? AND COALESCE(heartbeat, 0) < ?",
+            (PENDING, RUNNING, stale),
+        ).rowcount
+        conn.execute(
+            "UPDATE jobs SET state = ? WHERE id IN (SELECT job_id FROM items WHERE state = ?)", (RUNNING, PENDING)
+        )
+        conn.execute("COMMIT")
+    if count:
+        print(f"[LOG] [jobs] Resuming {count} items abandoned by a stopped process")
+    return count
+
+
+def start_workers(count=None):
+    """Recover abandoned items and start the worker threads and their heartbeat (once per process)."""
+    if _workers:
+        return
+    recover()
+    for i in range(JOB_WORKERS if count is None else count):
+        thread = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+        thread.start()
+        _workers.append(thread)
+    heartbeat = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+    heartbeat.start()
+    _workers.append(heartbeat)
+
+
+def stop_workers():
+    _stop.set()
+    _notify()
+
+
+# --- Status ---
+
+def _counts(conn, job_id):
+    counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+    for state, count in conn.execute("SELECT state, COUNT(*) FROM items WHERE job_id = ? GROUP BY state", (job_id,)):
+        counts[state] = count
+    return counts
+
+
+def status(job_id):
+    """Progress of a job for the UI (None when there is no such job)."""
+    with _db() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        items = conn.execute(
+            "SELECT idx, filename, state, attempts, error FROM items WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+        counts = _counts(conn, job_id)
+    total = len(items)
+    finished = counts[DONE] + counts[FAILED]
+    running = [i["filename"] for i in items if i["state"] == RUNNING]
+    if job["state"] in (DONE, FAILED):
+        message = f"Finished: {counts[DONE]} parsed, {counts[FAILED]} failed"
+    elif running:
+        message = f"Parsing {', '.join(running)} ({finished}/{total} done)"
+    else:
+        message = f"Queued ({finished}/{total} done)"
+    return {
+        "job_id": job_id,
+        "kind": job["kind"],
+        "authority": job["authority"],
+        "state": job["state"],
+        "total": total,
+        "counts": counts,
+        "progress": round(100.0 * finished / total, 1) if total else 100.0,
+        "status": message,
+        "items": [dict(i) for i in items],
+        "updated": job["updated"],
+    }
+
+
+def results(job_id):
+    """Per-item results of a job: [{filename, state, result | error}] (None when there is no such job)."""
+    with _db() as conn:
+        if conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+            return None
+        rows = conn.execute(
+            "SELECT idx, filename, state, result, error FROM items WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+    return [
+        {
+            "index": r["idx"], "filename": r["filename"], "state": r["state"],
+            **({"result": json.loads(r["result"])} if r["result"] else {}),
+            **({"error": r["error"]} if r["error"] else {}),
+        }
+        for r in rows
+    ]
+
+
+def is_finished(state):
+    return state in (DONE, FAILED)
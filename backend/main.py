@@ -1,6 +1,6 @@
-from fastapi import FastAPI, File, UploadFile, Form, APIRouter, HTTPException, Request
+from fastapi import FastAPI, File, UploadFile, Form, APIRouter, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response
 from typing import List, Optional
 import io
 import os
@@ -13,7 +13,11 @@ import threading
 import pandas as pd
 from datetime import datetime
 from supabase import create_client, Client
-from extract_trench_data import process_demand_note, append_row_to_excel
+from extract_trench_data import process_demand_note, process_demand_note_batch, append_row_to_excel
+from excel_output import NON_REFUNDABLE, SD, XLSX_MEDIA_TYPE, get_template, workbook_bytes, output_filename
+from temp_janitor import save_upload, remove_file, start_janitor
+from debug_artifacts import new_store, list_artifacts, artifact_path
+from utils import iter_zip, content_disposition
 import re
 import time
 
@@ -23,6 +27,13 @@ from parsers.actual_cost_extraction import router as actual_cost_extraction_rout
 from dotenv import load_dotenv
 from parsers.application_parser import application_parser
 from parsers.po_parser import po_parser
+from parsers.registry import parse_documents, extract_fields_documents
+from parsers.fields import parse_field_list
+from parsers.detection import detect_authority, resolve_authority
+import warmup
+import jobs
+import dossier
+import po_sync
 
 load_dotenv()
 
@@ -56,6 +67,21 @@ CACHE_EXPIRY_SECONDS = 3600  # 1 hour (optional, not enforced in this snippet)
 app.include_router(actual_cost_extraction_router)
 # app.include_router(dn_master_upload_router)
 
+@app.on_event("startup")
+def start_temp_janitor():
+    # Sweep leftovers from previous runs and keep the temp dir under quota
+    start_janitor()
+
+@app.on_event("startup")
+def start_parser_warmup():
+    # Optional parser warm-up (TRENCH_WARMUP=1); /ready stays 503 until it finishes
+    warmup.start_warmup()
+
+@app.on_event("startup")
+def start_job_workers():
+    # Ingestion job workers; items interrupted by the last shutdown are resumed
+    jobs.start_workers()
+
 DN_MASTER_COLUMNS = [
     "sr_no", "route_type", "lmc_route", "ip1_co_built", "dn_recipient", "project_name", "site_id", "uid",
     "contract_type", "build_type", "category_type", "survey_id", "po_number", "po_length", "route_id_lmc_id",
@@ -217,259 +243,336 @@ def normalize_date(val):
             pass
     return None  # Return None if not a recognized date string
 
-def fetch_ri_cost_per_meter_from_supabase(site_id):
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    response = supabase.table("master_budget").select("ri_budget_amount_per_meter").eq("SiteID", site_id).execute()
-    if response.data and len(response.data) > 0:
-        return response.data[0].get("ri_budget_amount_per_meter", "")
-    return ""
-
 @app.post("/process")
 async def process_pdf(
-    authority: str = Form(...),
+    background_tasks: BackgroundTasks,
+    authority: str = Form("auto"),  # "auto" (or omitted): detected from the first page
     manual_fields: Optional[str] = Form(None),  # JSON string of manual fields (Non-Refundable)
     sd_manual_fields: Optional[str] = Form(None),  # JSON string of manual fields (SD Output)
     file: UploadFile = File(...)
 ):
-    # Save uploaded file to a temp location (cross-platform, ensure unique name)
-    temp_dir = tempfile.gettempdir()
-    unique_filename = f"{uuid.uuid4()}_{file.filename}"
-    temp_path = os.path.join(temp_dir, unique_filename)
-    file_bytes = await file.read()
-    with open(temp_path, "wb") as f:
-        f.write(file_bytes)
-    print(f"[DEBUG] Saved file: {temp_path}, size: {os.path.getsize(temp_path)} bytes, first 8 bytes: {file_bytes[:8]}")
+    # Save uploaded file into the managed temp dir; it is removed after the response is sent
+    temp_path = save_upload(file)
+    background_tasks.add_task(remove_file, temp_path)
+    print(f"[DEBUG] Saved file: {temp_path}, size: {os.path.getsize(temp_path)} bytes")
 
     # Parse manual fields if provided
     manual_fields_dict = json.loads(manual_fields) if manual_fields else {}
     sd_manual_fields_dict = json.loads(sd_manual_fields) if sd_manual_fields else {}
-    # Call extraction logic, get both file paths
+    # Call extraction logic, get both workbooks as in-memory buffers
+    try:
+        non_ref_bytes, non_ref_name, sd_bytes, sd_name, _ = process_demand_note(
+            temp_path, authority, manual_fields_dict, sd_manual_fields_dict, return_bytes=True
+        )
+        # Stream a zip with both files straight from memory
+        return StreamingResponse(
+            iter_zip([(non_ref_name, non_ref_bytes), (sd_name, sd_bytes)]),
+            media_type="application/zip",
+            headers={"Content-Disposition": content_disposition("outputs.zip")}
+        )
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.post("/process/batch")
+async def process_batch(
+    authority: str = Form("auto"),  # "auto" (or omitted): detected from the first page
+    files: List[UploadFile] = File(...)
+):
+    """
+    Month-end batch: one consolidated Non-Refundable workbook and one SD workbook with a row per DN, zipped.
+    Uploads are materialised and parsed one at a time; rows stream into the two workbooks as they are parsed.
+    """
+    errors = []
+
+    def upload_paths():
+        for upload in files:
+            temp_path = save_upload(upload)
+            try:
+                yield temp_path
+            finally:
+                remove_file(temp_path)
+
+    def on_error(path, exc):
+        errors.append({"filename": os.path.basename(path).split("_", 1)[-1], "error": str(exc)})
+
+    non_ref_buffer = io.BytesIO()
+    sd_buffer = io.BytesIO()
     try:
-        non_ref_xlsx_path, sd_xlsx_path = process_demand_note(temp_path, authority, manual_fields_dict, sd_manual_fields_dict, return_paths=True)
-        # Create a zip with both files
-        zip_path = os.path.join(temp_dir, f"{uuid.uuid4()}_outputs.zip")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            zipf.write(non_ref_xlsx_path, arcname=os.path.basename(non_ref_xlsx_path))
-            zipf.write(sd_xlsx_path, arcname=os.path.basename(sd_xlsx_path))
-        os.remove(temp_path)
-        return FileResponse(zip_path, filename="outputs.zip", media_type="application/zip")
+        written, label = process_demand_note_batch(upload_paths(), authority, non_ref_buffer, sd_buffer, on_error=on_error)
     except Exception as e:
         traceback.print_exc()
-        os.remove(temp_path)
         return JSONResponse(status_code=500, content={"error": str(e)})
+    if not written:
+        return JSONResponse(status_code=422, content={"error": "No demand notes could be parsed.", "errors": errors})
+    stamp = datetime.now().strftime("%Y%m%d")
+    entries = [
+        (f"{label}_{stamp}_Non Refundable Output.xlsx", non_ref_buffer.getvalue()),
+        (f"{label}_{stamp}_SD Output.xlsx", sd_buffer.getvalue()),
+    ]
+    if errors:
+        entries.append(("errors.json", json.dumps(errors, indent=2).encode("utf-8")))
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"batch_outputs_{stamp}.zip")}
+    )
+
+@app.post("/api/jobs")
+async def submit_job(
+    kind: str = Form("dn"),  # "dn": Non-Refundable + SD rows, "cost": actual-cost fields (see jobs.JOB_KINDS)
+    authority: str = Form("auto"),  # "auto" (or omitted): detected per file from its first page
+    files: List[UploadFile] = File(...)
+):
+    """Queue files for parsing in the background; progress is at /api/jobs/{job_id}/events."""
+    uploads = [(upload.filename, save_upload(upload)) for upload in files]
+    try:
+        job_id = jobs.submit(kind, authority, uploads)
+    except ValueError as e:
+        remove_file(*[path for _, path in uploads])
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return {"job_id": job_id, "status": jobs.status(job_id)}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.status(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: the job status whenever it changes, until the job has finished."""
+    import asyncio
+    if jobs.status(job_id) is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+
+    async def stream():
+        last = None
+        idle = 0.0
+        while True:
+            job = await asyncio.to_thread(jobs.status, job_id)
+            if job is None:
+                return
+            snapshot = (job["state"], job["updated"], tuple(job["counts"].values()))
+            if snapshot != last:
+                last = snapshot
+                idle = 0.0
+                yield f"event: progress\ndata: {json.dumps(job)}\n\n"
+                if jobs.is_finished(job["state"]):
+                    yield f"event: done\ndata: {json.dumps(job)}\n\n"
+                    return
+            elif idle >= 15:
+                # Keep proxies from closing an idle stream
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.5)
+            idle += 0.5
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/jobs/{job_id}/results")
+def get_job_results(job_id: str):
+    items = jobs.results(job_id)
+    if items is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    return {"job_id": job_id, "items": items}
+
+@app.post("/api/jobs/{job_id}/retry")
+def retry_job(job_id: str):
+    """Re-queue the failed files of a job; files already parsed are not parsed again."""
+    count = jobs.retry(job_id)
+    if count is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    return {"job_id": job_id, "requeued": count}
+
+@app.get("/api/jobs/{job_id}/output")
+def job_output(job_id: str):
+    """Consolidated Non-Refundable and SD workbooks of a finished "dn" job (rows parsed so far), zipped."""
+    from excel_output import BatchOutput
+    job = jobs.status(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    if job["kind"] != "dn":
+        return JSONResponse(status_code=400, content={"error": "Only dn jobs produce workbooks"})
+    items = jobs.results(job_id)
+    non_ref_buffer = io.BytesIO()
+    sd_buffer = io.BytesIO()
+    with BatchOutput(non_ref_buffer, sd_buffer, job["authority"]) as batch:
+        for item in items:
+            for doc in item.get("result", []):
+                batch.add(doc["headers"], doc["row"], doc["sd_headers"], doc["sd_row"], doc.get("authority"))
+    errors = [{"filename": i["filename"], "error": i["error"]} for i in items if i.get("error")]
+    stamp = datetime.now().strftime("%Y%m%d")
+    entries = [
+        (f"{batch.label}_{stamp}_Non Refundable Output.xlsx", non_ref_buffer.getvalue()),
+        (f"{batch.label}_{stamp}_SD Output.xlsx", sd_buffer.getvalue()),
+    ]
+    if errors:
+        entries.append(("errors.json", json.dumps(errors, indent=2).encode("utf-8")))
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"job_outputs_{stamp}.zip")}
+    )
+
+def _cached_preview_rows(preview_id, manual_fields_dict):
+    """Return (rows, headers, demand_note_number) for a cached preview, with the latest manual fields applied."""
+    cached = preview_cache[preview_id]
+    rows = cached['rows']
+    headers = cached['headers']
+    # Update cached rows with latest manual fields before writing Excel
+    if manual_fields_dict:
+        for row in rows:
+            for field, value in manual_fields_dict.items():
+                if field in headers:
+                    idx = headers.index(field)
+                    row[idx] = value
+    return rows, headers, cached.get('demand_note_number', 'Output'), cached.get('authority')
+
+def _xlsx_response(excel_bytes, download_filename):
+    return Response(
+        content=excel_bytes,
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": content_disposition(download_filename)}
+    )
 
 @app.post("/process/non_refundable")
 async def process_non_refundable(
-    authority: str = Form(...),
+    background_tasks: BackgroundTasks,
+    authority: str = Form("auto"),  # "auto" (or omitted): detected from the first page
     manual_fields: Optional[str] = Form(None),
     file: UploadFile = File(None),
     preview_id: Optional[str] = Form(None)
 ):
-    import tempfile, os, uuid, json, traceback
-    temp_dir = tempfile.gettempdir()
     manual_fields_dict = json.loads(manual_fields) if manual_fields else {}
     try:
         # If preview_id is provided and in cache, use cached data
         if preview_id and preview_id in preview_cache:
-            cached = preview_cache[preview_id]
-            row = cached['row']
-            headers = cached['headers']
-            demand_note_number = cached.get('demand_note_number', 'Output')
-            # Update cached row with latest manual fields before writing Excel
-            if manual_fields_dict:
-                for field, value in manual_fields_dict.items():
-                    if field in headers:
-                        idx = headers.index(field)
-                        row[idx] = value
-            from extract_trench_data import append_row_to_excel
-            temp_excel_path = os.path.join(temp_dir, f"{uuid.uuid4()}_Non_Refundable_Output.xlsx")
-            # Determine blue_headers for authority
-            if authority.upper() == "MCGM":
-                blue_headers = [
-                    "LM/BB/FTTH", "GO RATE", "Total Route (MTR)", "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)",
-                    "REASON FOR DELAY (>2 DAYS)", "PO No.", "Route Name(As per CWIP)", "Section Name for ROW(As per CWIP)"
-                ]
-            elif authority.upper() == "MBMC":
-                blue_headers = [
-                    "LM/BB/FTTH", "GO RATE", "Total Route (MTR)", "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)",
-                    "REASON FOR DELAY (>2 DAYS)", "PO No.", "Route Name(As per CWIP)", "Section Name for ROW(As per CWIP)"
-                ]
-            else:
-                blue_headers = []
-            append_row_to_excel(temp_excel_path, row, headers, manual_fields=manual_fields_dict, blue_headers=blue_headers)
-            download_filename = f"{demand_note_number}_Non Refundable Output.xlsx"
-            from fastapi.responses import FileResponse
-            return FileResponse(
-                temp_excel_path,
-                filename=download_filename,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            rows, headers, demand_note_number, cached_authority = _cached_preview_rows(preview_id, manual_fields_dict)
+            excel_bytes = workbook_bytes(headers, rows, get_template(cached_authority or authority, NON_REFUNDABLE))
+            return _xlsx_response(excel_bytes, output_filename(demand_note_number, NON_REFUNDABLE))
         # Fallback: legacy path (reparse)
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
-        temp_path = os.path.join(temp_dir, unique_filename)
-        file_bytes = await file.read()
-        with open(temp_path, "wb") as f:
-            f.write(file_bytes)
-        manual_fields_dict = json.loads(manual_fields) if manual_fields else {}
-        excel_path, _, demand_note_number = process_demand_note(temp_path, authority, manual_fields_dict, None, return_paths=True)
-        os.remove(temp_path)
-        download_filename = f"{demand_note_number}_Non Refundable Output.xlsx"
-        from fastapi.responses import FileResponse
-        return FileResponse(
-            excel_path,
-            filename=download_filename,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        temp_path = save_upload(file)
+        background_tasks.add_task(remove_file, temp_path)
+        excel_bytes, download_filename = process_demand_note(temp_path, authority, manual_fields_dict, None)
+        return _xlsx_response(excel_bytes, download_filename)
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.post("/process/sd")
 async def process_sd(
-    authority: str = Form(...),
+    background_tasks: BackgroundTasks,
+    authority: str = Form("auto"),  # "auto" (or omitted): detected from the first page
     sd_manual_fields: Optional[str] = Form(None),
     file: UploadFile = File(None),
     preview_id: Optional[str] = Form(None)
 ):
-    import tempfile, os, uuid, json, traceback
-    temp_dir = tempfile.gettempdir()
     sd_manual_fields_dict = json.loads(sd_manual_fields) if sd_manual_fields else {}
     try:
         # If preview_id is provided and in cache, use cached data
         if preview_id and preview_id in preview_cache:
-            cached = preview_cache[preview_id]
-            row = cached['row']
-            headers = cached['headers']
-            demand_note_number = cached.get('demand_note_number', 'Output')
-            # Update cached row with latest manual fields before writing Excel
-            if sd_manual_fields_dict:
-                for field, value in sd_manual_fields_dict.items():
-                    if field in headers:
-                        idx = headers.index(field)
-                        row[idx] = value
-            temp_excel_path = os.path.join(temp_dir, f"{uuid.uuid4()}_SD_Output.xlsx")
-            # Determine blue_headers for authority
-            if authority.upper() == "MCGM":
-                blue_headers = [
-                    "Execution Partner GBPA PO No.", "Partner PO circle", "Unique route id", "NFA no."
-                ]
-            elif authority.upper() == "MBMC":
-                blue_headers = [
-                    "Execution Partner GBPA PO No.", "Partner PO circle", "Unique route id", "NFA no."
-                ]
-            else:
-                blue_headers = []
-            append_row_to_excel(temp_excel_path, row, headers, manual_fields=sd_manual_fields_dict, blue_headers=blue_headers)
-            download_filename = f"{demand_note_number}_SD Output.xlsx"
-            from fastapi.responses import FileResponse
-            return FileResponse(
-                temp_excel_path,
-                filename=download_filename,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            rows, headers, demand_note_number, cached_authority = _cached_preview_rows(preview_id, sd_manual_fields_dict)
+            excel_bytes = workbook_bytes(headers, rows, get_template(cached_authority or authority, SD))
+            return _xlsx_response(excel_bytes, output_filename(demand_note_number, SD))
         # Fallback: legacy path (reparse)
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
-        temp_path = os.path.join(temp_dir, unique_filename)
-        file_bytes = await file.read()
-        with open(temp_path, "wb") as f:
-            f.write(file_bytes)
-        _, sd_excel_path, demand_note_number = process_demand_note(temp_path, authority, None, sd_manual_fields_dict, return_paths=True)
-        os.remove(temp_path)
-        download_filename = f"{demand_note_number}_SD Output.xlsx"
-        from fastapi.responses import FileResponse
-        return FileResponse(
-            sd_excel_path,
-            filename=download_filename,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        temp_path = save_upload(file)
+        background_tasks.add_task(remove_file, temp_path)
+        _, _, sd_bytes, sd_filename, _ = process_demand_note(temp_path, authority, None, sd_manual_fields_dict, return_bytes=True)
+        if sd_bytes is None:
+            return JSONResponse(status_code=400, content={"error": f"SD output not available for authority: {authority}"})
+        return _xlsx_response(sd_bytes, sd_filename)
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+def _with_debug_run(payload, debug_store):
+    """Add the debug run id to a response when the request asked for debug artifacts."""
+    if debug_store is not None:
+        payload["debug_run"] = debug_store.run_id
+    return payload
+
 @app.post("/preview/non_refundable")
 async def preview_non_refundable(
-    authority: str = Form(...),
+    authority: str = Form("auto"),  # "auto" (or omitted): detected from the first page
     manualFields: Optional[str] = Form(None),
+    debug: bool = Form(False),  # keep debug images of this run (see /api/debug-artifacts)
     file: UploadFile = File(...)
 ):
-    import tempfile, os, json, traceback, uuid
+    import json, traceback, uuid
     manual_fields_dict = json.loads(manualFields) if manualFields else {}
+    debug_store = new_store(debug)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(await file.read())
-            tmp_path = tmp.name
+        tmp_path = save_upload(file)
         try:
-            row = None
-            headers = None
-            demand_note_number = None
-            if authority.upper() == "MCGM":
-                from parsers.mcgm import non_refundable_request_parser, HEADERS
-                row = non_refundable_request_parser(tmp_path, manual_values=manual_fields_dict)
-                headers = HEADERS
-            elif authority.upper() == "MBMC":
-                from parsers.mbmc import non_refundable_request_parser, HEADERS
-                row = non_refundable_request_parser(tmp_path, manual_values=manual_fields_dict)
-                headers = HEADERS
-            else:
-                return JSONResponse(status_code=400, content={"error": "Preview not implemented for this authority"})
-            preview_data = {h: row[i] for i, h in enumerate(headers)}
+            try:
+                authority = resolve_authority(tmp_path, authority)
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
+            # One row per demand note (combined PDFs carry several)
+            results = parse_documents(tmp_path, authority, manual_fields_dict, sd=False, debug=debug_store)
+            headers = results[0][0]
+            rows = [r[1] for r in results]
+            preview_data = [{h: row[i] for i, h in enumerate(headers)} for row in rows]
             # Try to get demand note number for filename
-            demand_note_number = preview_data.get("Demand Note Reference number", "Output")
+            demand_note_number = "_".join(d.get("Demand Note Reference number") or "Output" for d in preview_data)
             # Store in cache and return preview_id
             preview_id = str(uuid.uuid4())
             with preview_cache_lock:
                 preview_cache[preview_id] = {
-                    'row': row,
+                    'rows': rows,
                     'headers': headers,
-                    'demand_note_number': demand_note_number
+                    'demand_note_number': demand_note_number,
+                    'authority': authority
                 }
             print("[DEBUG] Returning preview data (non_refundable):", preview_data)
-            return {"rows": [preview_data], "preview_id": preview_id}
+            return _with_debug_run({"rows": preview_data, "preview_id": preview_id, "authority": authority}, debug_store)
         finally:
-            os.remove(tmp_path)
+            remove_file(tmp_path)
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.post("/preview/sd")
 async def preview_sd(
-    authority: str = Form(...),
+    authority: str = Form("auto"),  # "auto" (or omitted): detected from the first page
     manualFields: Optional[str] = Form(None),
+    debug: bool = Form(False),  # keep debug images of this run (see /api/debug-artifacts)
     file: UploadFile = File(...)
 ):
-    import tempfile, os, json, traceback, uuid
+    import json, traceback, uuid
     manual_fields_dict = json.loads(manualFields) if manualFields else {}
+    debug_store = new_store(debug)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(await file.read())
-            tmp_path = tmp.name
+        tmp_path = save_upload(file)
         try:
-            alt_headers = None
-            row_alt = None
-            demand_note_number = None
-            if authority.upper() == "MCGM":
-                from parsers.mcgm import sd_parser
-                alt_headers, row_alt = sd_parser(tmp_path, manual_values=manual_fields_dict)
-            elif authority.upper() == "MBMC":
-                from parsers.mbmc import sd_parser
-                alt_headers, row_alt = sd_parser(tmp_path, manual_values=manual_fields_dict)
-            else:
+            try:
+                authority = resolve_authority(tmp_path, authority)
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
+            results = parse_documents(tmp_path, authority, sd_manual_values=manual_fields_dict, debug=debug_store)
+            results = [r for r in results if r[3] is not None]
+            if not results:
                 return JSONResponse(status_code=400, content={"error": "Preview not implemented for this authority"})
-            preview_data = {h: row_alt[i] for i, h in enumerate(alt_headers)}
+            alt_headers = results[0][2]
+            rows_alt = [r[3] for r in results]
+            preview_data = [{h: row_alt[i] for i, h in enumerate(alt_headers)} for row_alt in rows_alt]
             # Try to get demand note number for filename
-            demand_note_number = preview_data.get("DN No", "Output")
+            demand_note_number = "_".join(d.get("DN No") or "Output" for d in preview_data)
             # Store in cache and return preview_id
             preview_id = str(uuid.uuid4())
             with preview_cache_lock:
                 preview_cache[preview_id] = {
-                    'row': row_alt,
+                    'rows': rows_alt,
                     'headers': alt_headers,
-                    'demand_note_number': demand_note_number
+                    'demand_note_number': demand_note_number,
+                    'authority': authority
                 }
             print("[DEBUG] Returning preview data (sd):", preview_data)
-            return {"rows": [preview_data], "preview_id": preview_id}
+            return _with_debug_run({"rows": preview_data, "preview_id": preview_id, "authority": authority}, debug_store)
         finally:
-            os.remove(tmp_path)
+            remove_file(tmp_path)
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -502,114 +605,104 @@ def debug_headers():
 def root():
     return {"status": "FastAPI backend running"}
 
+@app.get("/ready")
+def ready():
+    status = warmup.status()
+    return JSONResponse(status_code=200 if warmup.is_ready() else 503, content=status)
+
 @app.post("/api/parse-application")
-async def parse_application_file(dn_application_file: UploadFile = File(...)):
-    import tempfile, os
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, f"dn_app_{dn_application_file.filename}")
-    file_bytes = await dn_application_file.read()
-    with open(temp_path, "wb") as f:
-        f.write(file_bytes)
+async def parse_application_file(background_tasks: BackgroundTasks, dn_application_file: UploadFile = File(...)):
+    temp_path = save_upload(dn_application_file)
+    background_tasks.add_task(remove_file, temp_path)
     try:
-        result = application_parser(temp_path)
-        os.remove(temp_path)
-        return result
+        return application_parser(temp_path)
     except Exception as e:
-        os.remove(temp_path)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.post("/api/parse-po")
 async def parse_po_db(site_id: str = Form(...)):
-    from supabase import create_client
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    # Query po_master for the matching row
-    response = supabase.table("po_master").select("*").eq("route_id_site_id", site_id).execute()
-    if not response.data or len(response.data) == 0:
-        return {"error": "No matching row found in po_master."}
-    row = response.data[0]
-    def clean_value(val):
-        if val is None or str(val).strip() in ('', '-', 'nan', 'None'):
-            return ""
-        return str(val).strip()
-    # Determine route_type and normalize
-    route_type_val = clean_value(row.get('route_type', ""))
-    route_type_val_norm = route_type_val.replace(" ", "").lower()
-    # PO No logic
-    if route_type_val_norm in ["metrolm", "lmc(standalone)", "routelm"]:
-        po_no = clean_value(row.get('po_no_cobuild', ""))
-        po_length = clean_value(row.get('po_length_cobuild', ""))
-    elif route_type_val_norm == "route":
-        po_no = clean_value(row.get('po_no_ip1', ""))
-        po_length = clean_value(row.get('po_length_ip1', ""))
-    else:
-        po_no = ""
-        po_length = ""
-    # Category: always from 'route_type'
-    category_val = route_type_val
-    # UID: always from 'uid'
-    uid_val = clean_value(row.get('uid', ""))
-    # Parent Route Name / HH: always from 'parent_route'
-    parent_route_val = clean_value(row.get('parent_route', ""))
-    return {
-        'PO No': po_no,
-        'PO Length (Mtr)': po_length,
-        'Category': category_val,
-        'SiteID': clean_value(row.get('route_id_site_id', site_id)),
-        'UID': uid_val,
-        'Parent Route Name / HH': parent_route_val
-    }
+    # po_master row of the site, with the PO columns picked by route type (see dossier.po_fields_from_row)
+    return dossier.po_fields(site_id)
 
 @app.post("/api/parse-dn")
-async def parse_dn_file(authority: str = Form(...), dn_file: UploadFile = File(...)):
-    import tempfile, os
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, f"dn_{dn_file.filename}")
-    file_bytes = await dn_file.read()
-    with open(temp_path, "wb") as f:
-        f.write(file_bytes)
+async def parse_dn_file(
+    background_tasks: BackgroundTasks,
+    authority: str = Form("auto"),
+    fields: Optional[str] = Form(None),  # e.g. "dn_number,section_length,ri_cost" or a JSON list; omitted = all
+    debug: bool = Form(False),  # keep debug images of this run (see /api/debug-artifacts)
+    dn_file: UploadFile = File(...)
+):
+    temp_path = save_upload(dn_file)
+    debug_store = new_store(debug)
+    background_tasks.add_task(remove_file, temp_path)
     try:
-        if authority.upper() == "MBMC":
-            from parsers.mbmc import non_refundable_request_parser, HEADERS
-            row = non_refundable_request_parser(temp_path)
-            headers = HEADERS
-            if isinstance(row, dict):
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                return row
-            result = {h: row[i] for i, h in enumerate(headers)}
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            return result
-        elif authority.upper() == "MCGM":
-            from parsers.mcgm import extract_all_fields_for_testing
-            result = extract_all_fields_for_testing(temp_path)
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            return result
-        else:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            return JSONResponse(status_code=400, content={"error": f"Unsupported authority: {authority}"})
+        try:
+            authority = resolve_authority(temp_path, authority)
+            requested = parse_field_list(fields)
+            if requested:
+                # Only these fields (and the artifacts they read) are extracted, one result per DN
+                results = extract_fields_documents(temp_path, authority, requested, debug=debug_store)
+                return _with_debug_run(dict(results[0]) if len(results) == 1 else {"documents": results}, debug_store)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        # Authorities with a field-level test dump return that; the rest return their Non-Refundable row
+        return _with_debug_run(dossier.dn_fields(temp_path, authority, debug=debug_store), debug_store)
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.post("/api/detect-authority")
+async def detect_authority_endpoint(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Which authority issued this demand note, with a confidence score (first page only)."""
+    temp_path = save_upload(file)
+    background_tasks.add_task(remove_file, temp_path)
+    try:
+        return detect_authority(temp_path)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.get("/api/debug-artifacts/{run_id}")
+def list_debug_artifacts(run_id: str):
+    """Names of the debug images and text kept for a run started with debug=true."""
+    names = list_artifacts(run_id)
+    if names is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired debug run"})
+    return {"run_id": run_id, "artifacts": names}
+
+@app.get("/api/debug-artifacts/{run_id}/{name}")
+def get_debug_artifact(run_id: str, name: str):
+    path = artifact_path(run_id, name)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "Debug artifact not found"})
+    media_type = "text/plain; charset=utf-8" if name.endswith(".txt") else "image/png"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+@app.post("/api/dossier")
 @app.post("/api/validate-parsers")
-async def validate_parsers(po_file: UploadFile, dn_file: UploadFile, app_file: UploadFile):
-    # ...existing parsing logic...
-    po_fields = {}  # Replace with actual extraction logic if needed
-    dn_fields = {}  # Replace with actual extraction logic if needed
-    app_fields = {}  # Replace with actual extraction logic if needed
-    site_id = po_fields.get("SiteID")
-    ri_cost_per_meter = fetch_ri_cost_per_meter_from_supabase(site_id)
-    # ...other extractions...
-    return {
-        "po": po_fields,
-        "dn": dn_fields,
-        "application": app_fields,
-        "ri_cost_per_meter_master_budget": ri_cost_per_meter,
-    }
+async def site_dossier(
+    background_tasks: BackgroundTasks,
+    site_id: str = Form(...),
+    authority: str = Form("auto"),  # authority of the DN; "auto" (or omitted): detected from its first page
+    app_file: UploadFile = File(...),
+    dn_file: UploadFile = File(...)
+):
+    """
+    One dn_master row for a site from its application PDF, its DN PDF and its po_master row, extracted
+    concurrently, with the RI budget and the derived totals filled in and the values normalised the way
+    /api/send-to-master-dn stores them. fields holds the raw extractions ({field, value, source}).
+    """
+    import asyncio
+    app_path = save_upload(app_file)
+    dn_path = save_upload(dn_file)
+    background_tasks.add_task(remove_file, app_path, dn_path)
+    try:
+        result = await asyncio.to_thread(dossier.build_dossier, site_id, app_path, dn_path, authority)
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    row, invalid = normalize_dn_master_row(result["row"])
+    result["dn_master"] = row
+    result["invalid"] = invalid
+    return result
 
 NUMERIC_FIELDS = {
     'po_length', 'application_length_mtr', 'dn_length_mtr', 'ot_length', 'dn_ri_amount',
@@ -637,6 +730,119 @@ def normalize_integer(val):
     except Exception:
         return None
 
+def normalize_dn_master_row(fields):
+    """
+    ({column: value} ready for dn_master, [columns whose value could not be converted]) from {field: value};
+    field names go through FIELD_MAP, unknown columns are dropped and "" becomes None.
+    """
+    row, invalid = {}, []
+    for field, value in fields.items():
+        db_field = FIELD_MAP.get(field, field)
+        if db_field not in VALIDATE_PARSER_FIELDS:
+            continue
+        if db_field in DATE_FIELDS:
+            converted = normalize_date(value)
+        elif db_field in INTEGER_FIELDS:
+            converted = normalize_integer(value)
+        elif db_field in NUMERIC_FIELDS:
+            converted = normalize_numeric(value)
+        else:
+            converted = value
+        if converted is None and value not in (None, ""):
+            invalid.append(db_field)
+        row[db_field] = None if converted == "" else converted
+    return row, invalid
+
+@app.get("/api/hot-folder/sites/{site}")
+def hot_folder_site(site: str):
+    """Files the hot-folder scanner (hot_folder.py) has seen for a site, and send-to-master-dn bodies built from them."""
+    import hot_folder
+    files = hot_folder.site_files(site)
+    if not files:
+        return JSONResponse(status_code=404, content={"error": "Site not found in the hot-folder manifest"})
+    return {
+        "site": site,
+        "files": [{k: f[k] for k in ("path", "doc_type", "state", "error", "parsed")} for f in files],
+        "payloads": hot_folder.site_payload(site),
+    }
+
+@app.get("/api/route-lengths")
+def route_lengths(tolerance: float = None):
+    """Surveyed length of every KMZ / KML route in the hot-folder trees against dn_master (see route_geometry)."""
+    import route_geometry
+    return route_geometry.length_report(
+        tolerance_pct=route_geometry.LENGTH_TOLERANCE_PCT if tolerance is None else tolerance
+    )
+
+@app.post("/api/route-length")
+def route_length(file: UploadFile = File(...)):
+    """Surveyed length of one uploaded KMZ / KML, per LineString and in total (metres)."""
+    import route_geometry
+    path = save_upload(file)
+    try:
+        lines = route_geometry.read_lines(path)
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"Could not read {file.filename}: {e}"})
+    finally:
+        remove_file(path)
+    lengths = route_geometry.line_lengths([line.coords for line in lines])
+    return {
+        "filename": file.filename,
+        "stated_length_m": route_geometry.stated_length(file.filename),
+        "surveyed_length_m": round(float(lengths.sum()), 2),
+        "lines": [
+            {"placemark": line.placemark, "points": len(line.coords), "length_m": round(float(length), 2)}
+            for line, length in zip(lines, lengths)
+        ],
+    }
+
+@app.post("/api/route-overlaps")
+def route_overlaps(
+    file: UploadFile = File(...),
+    buffer_m: float = Form(None),  # metres between two routes counted as the same trench (default TRENCH_OVERLAP_BUFFER_M)
+    min_length_m: float = Form(None),  # shortest overlap reported (default TRENCH_OVERLAP_MIN_M)
+    route_id: str = Form(None),  # id of the route when re-checking one that is already indexed
+):
+    """
+    Stretches of an uploaded KMZ / KML route that overlap already surveyed routes (see route_overlap).
+    A re-upload of an indexed route is recognised by file hash or coordinates and not reported against itself.
+    """
+    import route_geometry
+    import route_overlap
+    from hot_folder import file_sha256
+    path = save_upload(file)
+    try:
+        lines = route_geometry.read_lines(path)
+        sha256 = file_sha256(path)
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"Could not read {file.filename}: {e}"})
+    finally:
+        remove_file(path)
+    errors = {}
+    try:
+        rows = route_geometry.dn_master_rows()
+    except Exception as e:
+        errors["dn_master"] = str(e)
+        rows = []
+    result = route_overlap.overlaps_for_lines(
+        lines,
+        rows=rows,
+        buffer_m=route_overlap.OVERLAP_BUFFER_M if buffer_m is None else buffer_m,
+        min_length_m=route_overlap.OVERLAP_MIN_M if min_length_m is None else min_length_m,
+        route_id=route_id,
+        sha256=sha256,
+    )
+    return {"filename": file.filename, **result, "errors": errors}
+
+@app.get("/api/route-overlaps/report")
+def route_overlaps_report(buffer_m: float = None, min_length_m: float = None):
+    """Every pair of surveyed routes that overlap, with the dn_master rows billing each; double billing first."""
+    import route_overlap
+    return route_overlap.overlap_report(
+        buffer_m=route_overlap.OVERLAP_BUFFER_M if buffer_m is None else buffer_m,
+        min_length_m=route_overlap.OVERLAP_MIN_M if min_length_m is None else min_length_m,
+    )
+
 @app.post("/api/send-to-master-dn")
 async def send_to_master_dn(request: Request):
     print("[LOG] Received request to /api/send-to-master-dn")
@@ -644,26 +850,9 @@ async def send_to_master_dn(request: Request):
     print(f"[LOG] Raw body: {body}")
     data = body.get("data", [])
     print(f"[LOG] Parsed data array: {data}")
-    # Build the insert dict using FIELD_MAP to map frontend fields to DB columns
-    insert_dict = {}
-    for item in data:
-        field = item.get("field")
-        value = item.get("value")
-        db_field = FIELD_MAP.get(field, field)  # Map to DB column name
-        if db_field not in VALIDATE_PARSER_FIELDS:
-            continue
-        if db_field in DATE_FIELDS:
-            value = normalize_date(value)
-        elif db_field in INTEGER_FIELDS:
-            value = normalize_integer(value)
-        elif db_field in NUMERIC_FIELDS:
-            value = normalize_numeric(value)
-        insert_dict[db_field] = value
+    # Build the insert dict using FIELD_MAP to map frontend fields to DB columns ('' becomes None)
+    insert_dict, _ = normalize_dn_master_row({item.get("field"): item.get("value") for item in data})
     print(f"[LOG] Final insert_dict (before insert): {insert_dict}")
-    # Universal sweep: for any field in insert_dict, if value is '', set to None
-    for k, v in insert_dict.items():
-        if v == "":
-            insert_dict[k] = None
     # Remove sr_no if present, so DB can auto-generate or ignore it
     if 'sr_no' in insert_dict:
         del insert_dict['sr_no']
@@ -702,11 +891,10 @@ def download_master_dn():
     # Clean DataFrame: replace inf/-inf with NA, then fill all NA/NaN with ''
     df = df.replace([float('inf'), float('-inf')], pd.NA)
     df = df.fillna("")
-    # Write to a temp Excel file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        excel_path = tmp.name
+    # Write the Excel file into memory
+    excel_buffer = io.BytesIO()
     # Use ExcelWriter for formatting
-    with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
+    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
         # Write data without header, start at row 1
         df.to_excel(writer, index=False, sheet_name='MasterDN', header=False, startrow=1)
         workbook = writer.book
@@ -748,7 +936,8 @@ def download_master_dn():
 
         worksheet.freeze_panes(1, 0)
     # Return as file download
-    return FileResponse(excel_path, filename="Master_DN_Database.xlsx", media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    excel_buffer.seek(0)
+    return StreamingResponse(excel_buffer, media_type=XLSX_MEDIA_TYPE, headers={"Content-Disposition": content_disposition("Master_DN_Database.xlsx")})
 
 @app.post("/api/upload-dn-master")
 async def upload_dn_master(file: UploadFile = File(...)):
@@ -943,6 +1132,8 @@ async def fullroute_upload_master(file: UploadFile = File(...)):
             errors.append(str(response.error))
     except Exception as e:
         errors.append(str(e))
+    # Dossiers read RI budgets through the cache
+    dossier.budget_cache.invalidate()
     print(f"[TIMING] Upsert to Supabase: {time.time() - start_upsert:.3f} seconds")
     print(f"[TIMING] Total /api/fullroute-upload-master: {time.time() - start_total:.3f} seconds")
     return {
@@ -982,10 +1173,9 @@ def download_master_budget():
     df = df.reindex(columns=supabase_headers)
     df = df.replace([float('inf'), float('-inf')], pd.NA)
     df = df.fillna("")
-    # Write to a temp Excel file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        excel_path = tmp.name
-    with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
+    # Write the Excel file into memory
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='MasterBudget', header=False, startrow=1)
         workbook = writer.book
         worksheet = writer.sheets['MasterBudget']
@@ -1014,7 +1204,8 @@ def download_master_budget():
             max_len = max(df[col].astype(str).map(len).max(), len(col))
             worksheet.set_column(i, i, min(max_len + 2, 40))
         worksheet.freeze_panes(1, 0)
-    return FileResponse(excel_path, filename="Master_Budget_Database.xlsx", media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    excel_buffer.seek(0)
+    return StreamingResponse(excel_buffer, media_type=XLSX_MEDIA_TYPE, headers={"Content-Disposition": content_disposition("Master_Budget_Database.xlsx")})
 
 @app.post("/api/upload-po-master")
 async def upload_po_master(file: UploadFile = File(...)):
@@ -1096,6 +1287,31 @@ async def upload_po_master(file: UploadFile = File(...)):
         "message": "All rows upserted successfully." if len(errors) == 0 else "Some rows failed."
     }
 
+@app.post("/api/upload-po-pdfs")
+def upload_po_pdfs(
+    files: List[UploadFile] = File(...),
+    upsert: bool = Form(True),  # False: only return the rows that would be upserted
+):
+    """po_master rows from purchase order PDFs (see po_sync), parsed in parallel and upserted in bulk."""
+    paths = [save_upload(upload) for upload in files]
+    try:
+        result = po_sync.parse_po_files(paths)
+    finally:
+        remove_file(*paths)
+    names = {path: upload.filename for path, upload in zip(paths, files)}
+    errors = {names.get(path, path): message for path, message in result["errors"].items()}
+    upsert_errors = po_sync.upsert_po_master(result["rows"]) if upsert and result["rows"] else []
+    return {
+        "success": not upsert_errors,
+        "errors": upsert_errors,
+        "file_errors": errors,
+        "warnings": result["warnings"],
+        "rows": result["rows"],
+        "purchase_orders": [
+            {k: v for k, v in doc.items() if k != "source"} for doc in result["documents"]
+        ],
+    }
+
 @app.get("/api/download-master-po")
 def download_master_po():
     supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
@@ -1120,10 +1336,9 @@ def download_master_po():
     df = df.reindex(columns=po_headers)
     df = df.replace([float('inf'), float('-inf')], pd.NA)
     df = df.fillna("")
-    # Write to a temp Excel file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        excel_path = tmp.name
-    with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
+    # Write the Excel file into memory
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='MasterPO', header=False, startrow=1)
         workbook = writer.book
         worksheet = writer.sheets['MasterPO']
@@ -1152,4 +1367,5 @@ def download_master_po():
             max_len = max(df[col].astype(str).map(len).max(), len(col))
             worksheet.set_column(i, i, min(max_len + 2, 40))
         worksheet.freeze_panes(1, 0)
-    return FileResponse(excel_path, filename="Master_PO_Database.xlsx", media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    excel_buffer.seek(0)
+    return StreamingResponse(excel_buffer, media_type=XLSX_MEDIA_TYPE, headers={"Content-Disposition": content_disposition("Master_PO_Database.xlsx")})
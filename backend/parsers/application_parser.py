@@ -1,6 +1,7 @@
-import fitz  # PyMuPDF
 import re
-import camelot
+
+from parsers.context import ExtractionContext
+from parsers.fields import Field
 
 APPLICATION_HEADERS = [
     "Application Number",
@@ -12,41 +13,66 @@ APPLICATION_HEADERS = [
     "Ward"
 ]
 
+# Every field reads the text layer only. A field that needs tables declares e.g. "stream:1" and calls
+# ctx.stream_tables("1") in its extractor, so Camelot runs only when that field is extracted.
+ARTIFACTS = ("text",)
+
+# Numbered section headings of the application form ("7.   Length of trench on carriageway")
+SECTION_HEADING = re.compile(r"^[ \t]*(\d{1,2})\.[ \t]+", re.MULTILINE)
+LENGTH_SECTIONS = (7, 8, 9)
+
+
+def section_index(text):
+    """
+    {section number: text of that section}, from one pass over the text. A section runs from its
+    heading to the next one; when a number repeats, the first section with it wins.
+    """
+    headings = list(SECTION_HEADING.finditer(text))
+    sections = {}
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        sections.setdefault(int(match.group(1)), text[match.start():end])
+    return sections
+
+
+def application_sections(ctx):
+    return ctx.memo("application_sections", lambda: section_index(ctx.text))
+
+
 def extract_application_number(text):
     match = re.search(r"Application\s*No\.?\s*[:\-]?\s*([A-Za-z0-9\-\/]+)", text, re.IGNORECASE)
     return match.group(1).strip() if match else ""
 
-def extract_application_length(text):
+def extract_application_length(sections):
     total = 0.0
-    for section in [7, 8, 9]:
-        # Match the section, colon, optional whitespace/newlines, number (optional), then mtrs
-        pattern = rf"{section}\.\s+Length of trench[^\n\r]*?\n:\n\s*([0-9]+(?:\.[0-9]+)?)?\s*\nmtrs?\.?"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            print(f"[DEBUG] Section {section} match: {match.group(0)} | value: {match.group(1)}")
-            val = match.group(1)
-            if val:
-                try:
-                    total += float(val)
-                except Exception:
-                    pass
+    for section in LENGTH_SECTIONS:
+        # Heading, colon, optional whitespace/newlines, number (optional), then mtrs
+        match = re.match(
+            r"\s*\d+\.\s+Length of trench[^\n\r]*?\n:\n\s*([0-9]+(?:\.[0-9]+)?)?\s*\nmtrs?\.?",
+            sections.get(section, ""), re.IGNORECASE
+        )
+        if match and match.group(1):
+            try:
+                total += float(match.group(1))
+            except Exception:
+                pass
     return str(int(total)) if total else ""
 
 def extract_application_date(text):
     match = re.search(r"Date\s*[:\-]?\s*([0-9]{2}[./-][0-9]{2}[./-][0-9]{4})", text)
     return match.group(1).replace('.', '/').replace('-', '/') if match else ""
 
-def extract_from(text):
-    # Look for "2.   Exact location of starting point", then colon, then value on next line
-    match = re.search(
-        r"2\.\s+Exact location of starting point\s*\n:\n([^\n\r]+)", text, re.IGNORECASE
+def extract_from(sections):
+    # Section 2 "Exact location of starting point", then colon, then value on next line
+    match = re.match(
+        r"\s*2\.\s+Exact location of starting point\s*\n:\n([^\n\r]+)", sections.get(2, ""), re.IGNORECASE
     )
     return match.group(1).strip() if match else ""
 
-def extract_to(text):
-    # Look for "3.   Exact location of end point", then colon, then value on next line
-    match = re.search(
-        r"3\.\s+Exact location of end point\s*\n:\n([^\n\r]+)", text, re.IGNORECASE
+def extract_to(sections):
+    # Section 3 "Exact location of end point", then colon, then value on next line
+    match = re.match(
+        r"\s*3\.\s+Exact location of end point\s*\n:\n([^\n\r]+)", sections.get(3, ""), re.IGNORECASE
     )
     return match.group(1).strip() if match else ""
 
@@ -58,38 +84,23 @@ def extract_ward(text):
     match = re.search(r"Commissioner\s+([A-Za-z ]+?)\s+Ward", text)
     return match.group(1).strip() if match else ""
 
-def application_parser(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text() for page in doc)
-    doc.close()
-    print("=== PDF TEXT START ===")
-    print(text)
-    print("=== PDF TEXT END ===")
-
-    # Try extracting tables with Camelot
-    try:
-        tables = camelot.read_pdf(pdf_path, pages='all', flavor='stream')
-        print(f"[DEBUG] Camelot found {len(tables)} tables.")
-        for idx, table in enumerate(tables):
-            print(f"[DEBUG] Table {idx}:")
-            print(table.df)
-    except Exception as e:
-        print(f"[DEBUG] Camelot extraction failed: {e}")
-
-    # TODO: Use table data for extraction if needed
-
-    row = [
-        extract_application_number(text),
-        extract_application_length(text),
-        extract_application_date(text),
-        extract_from(text),
-        extract_to(text),
-        extract_authority(text),
-        extract_ward(text)
-    ]
-    return dict(zip(APPLICATION_HEADERS, row))
+# Per-field extractors on the shared context (see parsers/fields.py)
+FIELDS = {
+    "Application Number": Field(("text",), lambda ctx: extract_application_number(ctx.text)),
+    "Application Length (Mtr)": Field(("text",), lambda ctx: extract_application_length(application_sections(ctx))),
+    "Application Date": Field(("text",), lambda ctx: extract_application_date(ctx.text)),
+    "From": Field(("text",), lambda ctx: extract_from(application_sections(ctx))),
+    "To": Field(("text",), lambda ctx: extract_to(application_sections(ctx))),
+    "Authority": Field(("text",), lambda ctx: extract_authority(ctx.text)),
+    "Ward": Field(("text",), lambda ctx: extract_ward(ctx.text)),
+}
+
+def application_parser(pdf_path, ctx=None):
+    """{header: value} for an application PDF; pass ctx to share the text layer with other parsers."""
+    ctx = ctx or ExtractionContext(pdf_path)
+    return {header: FIELDS[header].extract(ctx) for header in APPLICATION_HEADERS}
 
 if __name__ == "__main__":
     import sys
     pdf_path = sys.argv[1]
-    print(application_parser(pdf_path)) 
\ No newline at end of file
+    print(application_parser(pdf_path))
@@ -0,0 +1,345 @@
+# Shared extraction context for one PDF.
+# Every expensive artifact (text layer, Camelot tables, OCR'd table grids) is computed at most once
+# per document and shared by all field extractors and by both the Non-Refundable and SD row builders.
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Artifact specs authorities can declare in their ARTIFACTS tuple:
+#   "text"            full text layer (all pages)
+#   "ocr_text[:<lang>[:<pages>]]"  per-page text, OCR'd (pages in parallel) only where the text layer is empty,
+#                     e.g. "ocr_text:eng:1,2" to OCR only the pages that carry the fields
+#   "lattice:<pages>" Camelot lattice tables, e.g. "lattice:1" or "lattice:1,2"
+#   "stream:<pages>"  Camelot stream tables
+#   "ocr_table:<n>"   OpenCV + Tesseract table grid of page n, as a DataFrame
+# Page numbers are 1-based and relative to the context, so they also work on a page range.
+# Instead of numbers, pages can be selected by page-classifier tag (see parsers/page_classifier.py):
+#   "lattice:@charges_table"        only the pages tagged as charges tables (plus unclassifiable ones)
+#   "lattice:@charges_table|1,2"    the same, falling back to pages 1,2 when no page carries the tag
+# Two base artifacts other specs depend on: "page_texts" (PyMuPDF text layer) and "page_tags" (classifier).
+#
+# prepare() runs the declared specs as a dependency graph: text, Camelot and the OCR grid do not depend
+# on each other, so they run concurrently and a document costs roughly its slowest artifact.
+TEXT = "text"
+PAGE_TEXTS = "page_texts"
+PAGE_TAGS = "page_tags"
+
+OCR_DPI = int(os.environ.get("TRENCH_OCR_DPI", "300"))
+OCR_WORKERS = int(os.environ.get("TRENCH_OCR_WORKERS", "4"))
+# Artifacts of one document computed concurrently by prepare()
+ARTIFACT_WORKERS = int(os.environ.get("TRENCH_ARTIFACT_WORKERS", "3"))
+# Pages with less text than this are treated as scanned
+MIN_TEXT_LAYER_CHARS = 20
+
+_ocr_languages = None
+
+
+def artifact_dependencies(spec):
+    """Specs that must be computed before spec (its direct inputs in the artifact graph)."""
+    kind, _, arg = spec.partition(":")
+    if kind == PAGE_TEXTS:
+        return []
+    if kind == PAGE_TAGS:
+        return [PAGE_TEXTS]
+    deps = [PAGE_TEXTS] if kind in (TEXT, "ocr_text") else []
+    pages = arg.partition(":")[2] if kind == "ocr_text" else arg
+    if pages.startswith("@"):
+        deps.append(PAGE_TAGS)
+    return deps
+
+
+def available_ocr_lang(lang):
+    """Drop languages Tesseract has no traineddata for ('eng+mar' -> 'eng' without Marathi)."""
+    global _ocr_languages
+    if _ocr_languages is None:
+        try:
+            import pytesseract
+            _ocr_languages = set(pytesseract.get_languages(config=""))
+        except Exception:
+            _ocr_languages = set()
+    parts = [p for p in lang.split("+") if p in _ocr_languages]
+    return "+".join(parts) or "eng"
+
+
+class ExtractionContext:
+    """
+    Lazily computed, cached artifacts for one PDF, or for a page range of it (see subrange).
+    Safe to share between threads: each artifact is computed once, concurrent callers wait for it.
+    """
+
+    def __init__(self, pdf_path, page_range=None, parent=None, debug=None):
+        self.pdf_path = pdf_path
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        # Debug artifact store of the request (debug_artifacts.DebugStore), None unless debugging was asked for
+        self.debug = parent.debug if parent is not None else debug
+        # (start, stop) zero-based page indices into the root document; None means all pages
+        self.page_range = page_range
+        self._cache = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def memo(self, key, compute):
+        """
+        Return the cached value for key, computing it with compute() on first use.
+        A failure is cached too and re-raised to later callers, so a broken artifact is not retried per field.
+        """
+        if key not in self._cache:
+            with self._lock_for(key):
+                if key not in self._cache:
+                    try:
+                        self._cache[key] = (True, compute())
+                    except Exception as e:
+                        self._cache[key] = (False, e)
+        ok, value = self._cache[key]
+        if not ok:
+            raise value
+        return value
+
+    def has(self, key):
+        return key in self._cache
+
+    def debug_text(self, name, text):
+        """
+        Keep text a parser worked from (page text, extracted fields) in the request's debug store; nothing
+        happens without one. Sub-ranges add their pages to the name, so split documents do not overwrite each other.
+        """
+        if self.debug is None:
+            return
+        if self.page_range:
+            name = f"{name}_p{self.page_range[0] + 1}-{self.page_range[1]}"
+        self.debug.save_text(name, text, source=self.pdf_path)
+
+    # --- Page ranges ---
+
+    def subrange(self, start, stop):
+        """
+        A context over pages [start, stop) of this one (zero-based). Nothing is copied: the child reads the
+        same file and shares page-level artifacts (text layer, OCR text) with the whole document.
+        """
+        offset = self.page_range[0] if self.page_range else 0
+        return ExtractionContext(self.pdf_path, (offset + start, offset + stop), parent=self)
+
+    def _page_indices(self):
+        start, stop = self.page_range or (0, self.root.document_page_count)
+        return range(start, stop)
+
+    def _absolute_pages(self, pages):
+        """Translate a context-relative Camelot page spec ('1', '1,2', '1-3', 'all') to document pages."""
+        if self.page_range is None:
+            return pages
+        start, stop = self.page_range
+        if pages == "all":
+            return f"{start + 1}-{stop}"
+        parts = []
+        for part in str(pages).split(","):
+            lo, _, hi = part.strip().partition("-")
+            lo = start + int(lo)
+            hi = start + int(hi) if hi else lo
+            parts.append(str(lo) if lo == hi else f"{lo}-{hi}")
+        return ",".join(parts)
+
+    # --- Artifacts ---
+
+    @property
+    def document_page_texts(self):
+        """Text layer of every page of the root document."""
+        def compute():
+            import fitz
+            with fitz.open(self.pdf_path) as doc:
+                return [page.get_text() for page in doc]
+        return self.root.memo("page_texts", compute)
+
+    @property
+    def document_page_count(self):
+        return len(self.root.document_page_texts)
+
+    @property
+    def page_texts(self):
+        texts = self.document_page_texts
+        return [texts[i] for i in self._page_indices()]
+
+    @property
+    def text(self):
+        return self.memo(TEXT, lambda: "\n".join(self.page_texts))
+
+    @property
+    def page_count(self):
+        return len(self._page_indices())
+
+    def _ocr_page(self, index, lang):
+        """OCR one page (absolute index) rendered with PyMuPDF; cached on the root context."""
+        def compute():
+            import fitz
+            import numpy as np
+            import pytesseract
+            with fitz.open(self.pdf_path) as doc:
+                pix = doc[index].get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY)
+            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+            return pytesseract.image_to_string(img, lang=available_ocr_lang(lang), config="--psm 6")
+        return self.root.memo(f"ocr_page:{index}:{lang}", compute)
+
+    def _select_pages(self, pages):
+        """Absolute page indices for context-relative 1-based page numbers (None = every page)."""
+        indices = list(self._page_indices())
+        if pages is None:
+            return indices
+        return [indices[p - 1] for p in pages if 0 < p <= len(indices)]
+
+    def has_text_layer(self, pages=None):
+        texts = self.document_page_texts
+        return any(len(texts[i].strip()) >= MIN_TEXT_LAYER_CHARS for i in self._select_pages(pages))
+
+    def ocr_page_texts(self, lang="eng", pages=None):
+        """
+        Per-page text: the text layer where there is one, otherwise Tesseract OCR.
+        pages (1-based, relative to this context) limits which pages are read, so OCR can be targeted.
+        Scanned pages are OCR'd in parallel (Tesseract runs out of process, so threads scale).
+        """
+        pages = tuple(pages) if pages is not None else None
+        def compute():
+            texts = self.document_page_texts
+            indices = self._select_pages(pages)
+            scanned = [i for i in indices if len(texts[i].strip()) < MIN_TEXT_LAYER_CHARS]
+            ocr = {}
+            if scanned:
+                with ThreadPoolExecutor(max_workers=min(OCR_WORKERS, len(scanned))) as executor:
+                    for i, page_text in zip(scanned, executor.map(lambda i: self._ocr_page(i, lang), scanned)):
+                        ocr[i] = page_text
+            return [ocr.get(i, texts[i]) for i in indices]
+        return self.memo(f"ocr_text:{lang}:{pages}", compute)
+
+    @property
+    def page_tags(self):
+        """Page-classifier tags of each page in this context, computed once per document from the text layer."""
+        def compute():
+            from .page_classifier import classify_document
+            return classify_document(self.pdf_path, self.document_page_texts)
+        tags = self.root.memo("page_tags", compute)
+        return [tags[i] for i in self._page_indices()]
+
+    def pages_tagged(self, *tags):
+        """1-based pages (relative to this context) carrying any of tags; unclassifiable pages are kept."""
+        from .page_classifier import UNKNOWN
+        wanted = set(tags) | {UNKNOWN}
+        return [n for n, page_tags in enumerate(self.page_tags, start=1) if wanted & set(page_tags)]
+
+    def resolve_pages(self, pages):
+        """
+        Turn a page spec that may use tags ("@charges_table", "@cover_letter+charges_table|1,2") into a
+        plain one ("2"). Returns "" when no page qualifies and there is no fallback.
+        """
+        pages = str(pages)
+        if not pages.startswith("@"):
+            return pages
+        tags, _, fallback = pages[1:].partition("|")
+        selected = self.pages_tagged(*tags.split("+"))
+        if not selected:
+            return fallback
+        if len(selected) != self.page_count:
+            print(f"[LOG] [context] {pages} -> pages {selected} of {self.page_count}")
+        return ",".join(str(n) for n in selected)
+
+    def lattice_tables(self, pages="1"):
+        pages = self.resolve_pages(pages)
+        if not pages:
+            return []
+        pages = self._absolute_pages(pages)
+        def compute():
+            import camelot
+            return camelot.read_pdf(self.pdf_path, pages=pages, flavor="lattice")
+        return self.root.memo(f"lattice:{pages}", compute)
+
+    def stream_tables(self, pages="all"):
+        pages = self.resolve_pages(pages)
+        if not pages:
+            return []
+        pages = self._absolute_pages(pages)
+        def compute():
+            import camelot
+            return camelot.read_pdf(self.pdf_path, pages=pages, flavor="stream")
+        return self.root.memo(f"stream:{pages}", compute)
+
+    def ocr_table(self, page_num=2):
+        """Table grid of one page; a tag spec picks the first page carrying the tag."""
+        pages = self.resolve_pages(page_num)
+        if not pages:
+            raise ValueError(f"No page matches {page_num}")
+        page_num = int(self._absolute_pages(pages.split(",")[0]))
+        def compute():
+            from parsers.mbmc import opencv_pdf_table_to_df
+            return opencv_pdf_table_to_df(self.pdf_path, page_num=page_num, debug=self.debug)
+        return self.root.memo(f"ocr_table:{page_num}", compute)
+
+    def artifact(self, spec):
+        """Compute (or fetch) an artifact from its spec string, see the list at the top of this module."""
+        kind, _, arg = spec.partition(":")
+        if kind == PAGE_TEXTS:
+            return self.document_page_texts
+        if kind == PAGE_TAGS:
+            return self.page_tags
+        if kind == TEXT:
+            return self.text
+        if kind == "ocr_text":
+            lang, _, pages = arg.partition(":")
+            pages = self.resolve_pages(pages) if pages else None
+            return self.ocr_page_texts(lang or "eng", [int(p) for p in pages.split(",") if p] if pages is not None else None)
+        if kind == "lattice":
+            return self.lattice_tables(arg or "1")
+        if kind == "stream":
+            return self.stream_tables(arg or "all")
+        if kind == "ocr_table":
+            return self.ocr_table(arg or 2)
+        raise ValueError(f"Unknown artifact: {spec}")
+
+    def _prepare_one(self, spec):
+        start = time.perf_counter()
+        try:
+            self.artifact(spec)
+        except Exception as e:
+            print(f"[ERROR] [context] Artifact {spec} failed for {self.pdf_path}: {e}")
+        return time.perf_counter() - start
+
+    def prepare(self, specs, max_workers=None):
+        """
+        Compute every declared artifact up front (each at most once), independent ones in parallel.
+        Specs and their inputs (artifact_dependencies) form a DAG; a spec is submitted to the worker pool
+        as soon as its inputs are done. Failures are logged and left for the field extractors to handle
+        with their own fallbacks (a failed input does not block its dependents, which fail or fall back).
+        """
+        graph = {}
+        stack = list(specs)
+        while stack:
+            spec = stack.pop()
+            if spec not in graph:
+                graph[spec] = artifact_dependencies(spec)
+                stack.extend(graph[spec])
+        if not graph:
+            return self
+        workers = max(1, min(max_workers or ARTIFACT_WORKERS, len(graph)))
+        start = time.perf_counter()
+        timings = {}
+        pending = dict(graph)
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while pending or running:
+                for spec in [s for s, deps in pending.items() if all(d in timings for d in deps)]:
+                    running[executor.submit(self._prepare_one, spec)] = spec
+                    del pending[spec]
+                if not running:
+                    raise ValueError(f"Artifact dependency cycle: {sorted(pending)}")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    timings[running.pop(future)] = future.result()
+        wall = time.perf_counter() - start
+        print(
+            f"[LOG] [context] Prepared {len(timings)} artifacts in {wall:.2f}s "
+            f"(sequential would be {sum(timings.values()):.2f}s): "
+            + ", ".join(f"{spec}={seconds:.2f}s" for spec, seconds in timings.items())
+        )
+        return self
@@ -0,0 +1,164 @@
+# Authority auto-detection from the first page of a demand note.
+# Reads only page 1: its text layer when there is one, otherwise a low-DPI OCR of the letterhead
+# (then the whole page if the letterhead alone is not conclusive). Signatures are weighted strings;
+# an authority's score is the noisy-OR of its matched weights, and the confidence is that score
+# discounted by the runner-up, so documents mentioning two authorities come back less certain.
+import os
+import re
+import time
+
+from .context import MIN_TEXT_LAYER_CHARS, available_ocr_lang
+from .registry import is_supported, normalize_authority
+
+DETECT_DPI = int(os.environ.get("TRENCH_DETECT_DPI", "100"))
+DETECT_LANG = os.environ.get("TRENCH_DETECT_LANG", "eng+mar")
+# Below this confidence a document is reported as undetected
+MIN_CONFIDENCE = float(os.environ.get("TRENCH_DETECT_MIN_CONFIDENCE", "0.5"))
+# Fraction of the page (from the top) holding the letterhead, OCR'd first
+LETTERHEAD_FRACTION = 0.35
+
+# Division II (Mahape) permission letter
+MIDC_LETTER = [
+    (r"MAHARASHTRA INDUSTRIAL DEVELOPMENT CORPORATION", 0.8),
+    (r"MIDCINDIA", 0.6),
+    (r"/\s*MHP\s*/", 0.5),
+    (r"TOTAL\s*\(\s*1\s*TO\s*3\s*\)", 0.5),
+    (r"\bMIDC\b", 0.3),
+]
+
+# (pattern, weight) per registry authority; patterns run on upper-cased text with whitespace collapsed
+SIGNATURES = {
+    "MCGM": [
+        (r"MUNICIPAL CORPORATION OF GREATER MUMBAI", 0.95),
+        (r"बृहन्मुंबई महानगरपालिका", 0.9),
+        (r"\bMCGM\b", 0.5),
+        (r"ONLINE TRENCHES", 0.4),
+    ],
+    "MBMC": [
+        (r"MIRA[ -]?BHAYANDAR MUN[I]?CIPAL", 0.95),
+        (r"मिरा[ -]?भाईंदर महानगरपालिका", 0.9),
+        (r"\bMBMC\b", 0.7),
+        (r"MIRA[ -]?BHAYANDAR", 0.4),
+    ],
+    "NMMC": [
+        (r"NAVI MUMBAI MUNICIPAL CORPORATION", 0.95),
+        (r"नवी मुंबई महानगरपालिका", 0.9),
+        (r"नमुंमपा", 0.7),
+        (r"\bNMMC\b", 0.7),
+    ],
+    "KDMC": [
+        (r"KALYAN[ -]?DOMBIVLI MUNICIPAL", 0.95),
+        (r"कल्याण डोंबिवली महानगरपालिका", 0.9),
+        (r"कडोंमपा", 0.7),
+        (r"\bKDMC\b", 0.7),
+    ],
+    # Both MIDC types are the same Division II letter, so they share its signatures and differ only in the
+    # permission fee's length: under a kilometre for a last-mile site (Type 1), a kilometre or more for a route
+    "MIDCTYPE1": MIDC_LETTER + [
+        (r"(?<![\d.])0\.\d+\s*KM\s*X\s*RS", 0.5),
+    ],
+    "MIDCTYPE2": MIDC_LETTER + [
+        (r"(?<![\d.])[1-9]\d*(?:\.\d+)?\s*KM\s*X\s*RS", 0.5),
+    ],
+}
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text or "").upper()
+
+
+def score_text(text):
+    """{authority: score} for every authority with at least one matching signature."""
+    text = _normalize(text)
+    scores = {}
+    for authority, signatures in SIGNATURES.items():
+        miss = 1.0
+        for pattern, weight in signatures:
+            if re.search(pattern, text):
+                miss *= 1.0 - weight
+        if miss < 1.0:
+            scores[authority] = round(1.0 - miss, 4)
+    return scores
+
+
+def _decide(scores):
+    if not scores:
+        return None, 0.0
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    best, best_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    # Type 1 / Type 2 share the MIDC name, so only a different corporation counts against the winner
+    if best.startswith("MIDC") and len(ranked) > 1 and ranked[1][0].startswith("MIDC"):
+        runner_up = ranked[2][1] if len(ranked) > 2 else 0.0
+    return best, round(best_score * (1.0 - runner_up), 4)
+
+
+def _ocr_first_page(pdf_path, fraction=1.0):
+    import fitz
+    import numpy as np
+    import pytesseract
+    with fitz.open(pdf_path) as doc:
+        page = doc[0]
+        clip = fitz.Rect(0, 0, page.rect.width, page.rect.height * fraction)
+        pix = page.get_pixmap(dpi=DETECT_DPI, colorspace=fitz.csGRAY, clip=clip)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    return pytesseract.image_to_string(img, lang=available_ocr_lang(DETECT_LANG), config="--psm 6")
+
+
+def _first_page_text(pdf_path, ctx=None):
+    if ctx is not None and ctx.root.has("page_texts"):
+        texts = ctx.root.document_page_texts
+        return texts[0] if texts else ""
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return doc[0].get_text() if len(doc) else ""
+
+
+def detect_authority(pdf_path, ctx=None):
+    """
+    Guess the issuing authority of a demand note from its first page.
+    Returns {"authority", "confidence", "source", "scores", "ms"}; authority is None when nothing
+    reaches MIN_CONFIDENCE. source is "text", "ocr-letterhead" or "ocr-page".
+    """
+    start = time.perf_counter()
+    text = _first_page_text(pdf_path, ctx)
+    source = "text"
+    scores = score_text(text) if len(text.strip()) >= MIN_TEXT_LAYER_CHARS else {}
+    authority, confidence = _decide(scores)
+    if len(text.strip()) < MIN_TEXT_LAYER_CHARS:
+        for source, fraction in (("ocr-letterhead", LETTERHEAD_FRACTION), ("ocr-page", 1.0)):
+            try:
+                scores = score_text(_ocr_first_page(pdf_path, fraction))
+            except Exception as e:
+                print(f"[ERROR] [detect] OCR failed for {pdf_path}: {e}")
+                break
+            authority, confidence = _decide(scores)
+            if confidence >= MIN_CONFIDENCE:
+                break
+    if confidence < MIN_CONFIDENCE:
+        authority = None
+    result = {
+        "authority": authority,
+        "confidence": confidence,
+        "source": source,
+        "scores": scores,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    print(f"[LOG] [detect] {os.path.basename(pdf_path)}: {result}")
+    return result
+
+
+def resolve_authority(pdf_path, authority=None, ctx=None):
+    """
+    The authority to parse a document with: the given one when it is registered, otherwise
+    (missing, "auto" or unknown) the detected one. Raises ValueError when detection is not confident.
+    """
+    if authority and normalize_authority(authority) != "AUTO" and is_supported(authority):
+        return normalize_authority(authority)
+    detected = detect_authority(pdf_path, ctx)
+    if detected["authority"] is None:
+        raise ValueError(
+            f"Could not detect the authority of {os.path.basename(pdf_path)} "
+            f"(given: {authority or 'none'}, scores: {detected['scores']})"
+        )
+    return detected["authority"]
@@ -0,0 +1,89 @@
+# Field-level extraction: lets callers ask for a few fields of the Non-Refundable row and pay only
+# for the artifacts those fields read.
+#
+# A parser module may declare FIELDS = {header: Field(artifacts, extract)}, where extract(ctx) returns
+# the value of that one column and artifacts lists the context artifacts it reads. Requested fields
+# that are static come from STATIC_VALUES; anything the parser does not declare falls back to the
+# full row (computed once per context), so every parser supports every field.
+from collections import namedtuple
+
+Field = namedtuple("Field", ["artifacts", "extract"])
+
+NON_REFUNDABLE_COST = "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )"
+
+# Short names accepted anywhere a field name is; full header names work too
+FIELD_ALIASES = {
+    "dn_number": "Demand Note Reference number",
+    "demand_note_reference": "Demand Note Reference number",
+    "dn_date": "Demand Note Date",
+    "dn_received_date": "DN RECEIVED FROM PARTNER/AUTHORITY- DATE",
+    "row_application_date": "ROW APPLICATION  DATE",
+    "section_length": "Section Length (Mtr.)",
+    "total_route": "Total Route (MTR)",
+    "ri_cost": NON_REFUNDABLE_COST,
+    "non_refundable_cost": NON_REFUNDABLE_COST,
+    "covered_under_capping": "Covered under capping (Restoration Charges, admin, registration etc.)",
+    "not_part_of_capping": "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)",
+    "gst_amount": "GST Amount",
+    "sd_amount": "SD Amount",
+    "total_dn_amount": "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team",
+    "road_types": "Road Types - CC/BT/TILES/ Normal Soil/kacha",
+    "rate": "Rate/mtr- Current DN (UG/OH)",
+    "ug_type": "UG TYPE( HDD/ OT/ MICROTRENCHING)",
+    "authority": "Authority",
+}
+
+
+def resolve_field(name):
+    """Header name for a field alias (names that are already headers pass through)."""
+    return FIELD_ALIASES.get(name, name)
+
+
+def parse_field_list(value):
+    """Fields from a form value: a JSON list or a comma-separated string. Empty -> None (all fields)."""
+    import json
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith("["):
+        return [str(f) for f in json.loads(value)]
+    return [f.strip() for f in value.split(",") if f.strip()]
+
+
+def artifacts_for(parser, fields):
+    """Union of the artifacts the parser's declared extractors need for these fields (in first-use order)."""
+    declared = getattr(parser, "FIELDS", {})
+    specs = []
+    for name in fields:
+        field = declared.get(resolve_field(name))
+        for spec in (field.artifacts if field else ()):
+            if spec not in specs:
+                specs.append(spec)
+    return specs
+
+
+def extract_fields(parser, ctx, fields, manual_values=None):
+    """
+    {requested name: value} for the requested fields of one document (or DN range).
+    Raises ValueError for names that are neither an alias nor one of the parser's headers.
+    """
+    declared = getattr(parser, "FIELDS", {})
+    static = getattr(parser, "STATIC_VALUES", {})
+    unknown = [name for name in fields if resolve_field(name) not in parser.HEADERS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    ctx.prepare(artifacts_for(parser, fields))
+    result = {}
+    for name in fields:
+        header = resolve_field(name)
+        if manual_values and header in manual_values:
+            value = manual_values[header]
+        elif header in static:
+            value = static[header]
+        elif header in declared:
+            value = ctx.memo(f"field:{header}", lambda field=declared[header]: field.extract(ctx))
+        else:
+            print(f"[LOG] [fields] {name} has no field extractor, building the full row")
+            value = parser.build_non_refundable_row(ctx)[parser.HEADERS.index(header)]
+        result[name] = value
+    return result
@@ -0,0 +1,256 @@
+# KDMC (Kalyan Dombivli Municipal Corporation) demand note parser.
+# KDMC DNs are a Marathi "मागणीपत्र" (scanned or photographed): outward no. "जा.क्र.कडोंमपा/काअ/बांध/कवि/24",
+# a road-length table and the charges table "तक्ता क्र.:- अ" (restoration, ground rent, supervision 15%,
+# security deposit 10%, total). Page 2 is terms & conditions only.
+#
+# Every KDMC DN uses the same layout, so the charges table is read through a layout template
+# (see parsers/templates.py): the first DN of a layout goes through grid detection and records where
+# each field's cell is; matching DNs then read just those cells.
+import os
+import re
+from datetime import datetime
+from .context import ExtractionContext, available_ocr_lang
+from .mcgm import HEADERS
+from .numbers import amount_text, ascii_digits, difference_days, sum_amounts
+from .rows import apply_manual_values, debug_fields, row_from_values, sd_row
+from .templates import TemplateStore, detect_grid, fingerprint, page_words, read_cells, words_to_text
+
+OCR_LANG = os.environ.get("KDMC_OCR_LANG", "eng+mar")
+
+# Page words and table cells are read through parsers.templates (one OCR pass for the page text)
+ARTIFACTS = ()
+
+# Words that fix the position of the charges table on the page. The letter has no reliable Latin text (even its
+# figures are in Devanagari digits), so templates are only used when Marathi traineddata is installed
+ANCHORS = ("मागणीपत्र", "तक्ता", "अधिभार")
+ANCHOR_LANG = "mar"
+
+STATIC_VALUES = {
+    "Intercity/Intracity- Deployment Intercity/intracity- O&M FTTH- Deployment FTTH-O&M": "Intercity/Intracity - Deployment",
+    "BUSINESS UNIT": "TNL-FF-Maharashtra",
+    "Circle": "MUM",
+    "City": "MUM",
+    "Capping/Non Capping": "Non capping",
+    "Cost type with Cost Breakup EG.. - PROCESING FEES/ SUPERVISOIN CHARGE/ ADMIN FEES/ LICENSE FEES etc etc.": "Restoration Charges / Supervision Charges / Ground Rent",
+    "Authority": "KALYAN DOMBIVLI MUNICIPAL CORPORATION",
+    "BENEFICIERY NAME": "KALYAN DOMBIVLI MUNICIPAL CORPORATION",
+    # Also the SD request's payment type (see rows.sd_row)
+    "Mode of payment(DD/ONLINE-URL/ONLINE-NEFT/BHARATKOSH": "DD",
+    "EXECUTION PARTNER NAME": "Excel Telesonic India Private Limited",
+    "Payable (Authority) Location": "Kalyan",
+    "Printing Location": "Mumbai",
+    "Cost type(restoration/ supervison/ agency changes/ admin etc)": "Restoration Charges",
+    "Cost type (way leave charges/ rent/ license etc)": "Ground Rent",
+    "Permission Type (Primary/ Secondary)": "Primary",
+    "Type (UG/OH)": "UG",
+    "Locator Code (material)": "61027-IP01-2948564-CONT1210"
+}
+
+# Surface names as they appear in the Marathi road table
+ROAD_TYPES = {
+    "पेव्हरब्लॉक": "TILES",
+    "पेव्हर": "TILES",
+    "paver": "TILES",
+    "डांबरी": "BT",
+    "डांबर": "BT",
+    "काँक्रीट": "CC",
+    "कॉक्रीट": "CC",
+    "सिमेंट": "CC",
+    "कच्चा": "Normal Soil/kacha",
+}
+
+# Charges-table rows, by the words in their description cell (checked in this order)
+ROW_LABELS = (
+    ("ground_rent", ("भुईभाडे", "ground rent")),
+    ("supervision", ("सुपरविजन", "सुपरव्हिजन", "पर्यवेक्षण", "supervision")),
+    ("security_deposit", ("सिक्युरिटी", "डिपॉझिट", "डिपॉझीट", "अनामत", "security deposit")),
+    ("restoration", ("टाकणे", "खोदाई", "restoration", "cable")),
+)
+TOTAL_LABELS = ("एकूण", "total")
+
+NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+DATE = r"(\d{1,2})\s*[/.\-]\s*(\d{1,2})\s*[/.\-]\s*(20\d{2})"
+
+_store = None
+
+
+def template_store():
+    global _store
+    if _store is None:
+        _store = TemplateStore("kdmc")
+    return _store
+
+
+def _date(match):
+    if not match:
+        return ""
+    day, month, year = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%d/%m/%Y")
+    except ValueError:
+        return ""
+
+
+def extract_demand_note_reference(text):
+    """'जा.क्र.कडोंमपा/काअ/बांध/कवि/ 24' -> 'कडोंमपा/काअ/बांध/कवि/24'; English letters give 'KDMC/...'."""
+    match = re.search(r"((?:कडोंमपा|KDMC)(?:\s*/\s*[\w.\-ऀ-ॿ]+)+)", ascii_digits(text))
+    return re.sub(r"\s+", "", match.group(1)) if match else ""
+
+
+def extract_demand_note_date(text):
+    return _date(re.search(r"(?:दिनांक|Date)\s*[:\-]*\s*" + DATE, ascii_digits(text), re.IGNORECASE))
+
+
+def extract_row_application_date(text):
+    """'... यांचा दि. २५/०४/२०२५ रोजीचा अर्ज' is the ROW application."""
+    return _date(re.search(r"दि\.?\s*" + DATE + r"\s*रोजीचा\s*अर्ज", ascii_digits(text)))
+
+
+def extract_section_length(text):
+    """'एकूण पेव्हरब्लॉक रस्ता लांबी – १३० मीटर'."""
+    match = re.search(r"लांबी\s*[–—\-:]*\s*" + NUMBER + r"\s*मी", ascii_digits(text))
+    return amount_text(match.group(1)) if match else ""
+
+
+def extract_road_types(text):
+    found = []
+    lowered = text.lower()
+    for word, road_type in ROAD_TYPES.items():
+        if word in lowered and road_type not in found:
+            found.append(road_type)
+    return " / ".join(found)
+
+
+def extract_ug_type(text):
+    return "HDD" if re.search(r"\bHDD\b|एचडीडी", text) else "OT"
+
+
+def extract_say_amount(text):
+    """'Say रु. १५,३२,२५६/-' (the rounded total)."""
+    match = re.search(r"Say\s*(?:रु|Rs)\.?\s*" + NUMBER, ascii_digits(text), re.IGNORECASE)
+    return amount_text(match.group(1)) if match else ""
+
+
+def locate_charge_cells(grid, texts):
+    """
+    Find the charges-table cells in a detected grid.
+    grid is the explicit grid of templates.detect_grid (fixed column indices, None for positions a merged
+    cell covers), texts the OCR'd text of each cell ({(r, c): text}).
+    Returns {field: (r, c)}: the amount cell (the row's last cell) of each charge row, the length and rate
+    cells of the restoration row and the amount cell of the total row that follows the charges.
+    """
+    cells = {}
+    for r, row in enumerate(grid):
+        anchored = [c for c, rect in enumerate(row) if rect is not None]
+        if len(anchored) < 2:
+            continue
+        last = anchored[-1]
+        label = " ".join(texts.get((r, c), "") for c in anchored).lower()
+        field = None
+        for name, words in ROW_LABELS:
+            if name not in cells and any(w in label for w in words):
+                field = name
+                break
+        if field is None and "security_deposit" in cells and "total" not in cells and any(w in label for w in TOTAL_LABELS):
+            field = "total"
+        if field is None or not amount_text(texts.get((r, last), "")):
+            continue
+        cells[field] = (r, last)
+        if field == "restoration" and last >= 3 and row[last - 2] is not None and row[last - 1] is not None:
+            cells["section_length"] = (r, last - 2)
+            cells["rate"] = (r, last - 1)
+    return cells
+
+
+def _discover_charges(ctx, fp):
+    """Generic path: detect the grid, read every cell, locate the fields and record the template (fp None: don't)."""
+    grid = detect_grid(ctx, 1)
+    rects = {(r, c): rect for r, row in enumerate(grid) for c, rect in enumerate(row) if rect is not None}
+    texts = read_cells(ctx, 1, rects, OCR_LANG) if rects else {}
+    cells = locate_charge_cells(grid, texts)
+    if fp is not None and {"restoration", "total"} <= set(cells) and len(fp["anchors"]) == len(ANCHORS):
+        template = template_store().record(fp, grid, {field: rects[pos] for field, pos in cells.items()})
+        print(f"[LOG] [kdmc] Recorded layout template {template['id']}")
+    return {field: texts[pos] for field, pos in cells.items()}
+
+
+def extract_charges(ctx):
+    """
+    Charge amounts from the table, through a recorded template when the page matches one.
+    A template read that does not yield the restoration and total amounts falls back to discovery.
+    """
+    fp, template, values = None, None, None
+    if ANCHOR_LANG in available_ocr_lang(OCR_LANG).split("+"):
+        fp = fingerprint(ctx, 1, ANCHORS, OCR_LANG)
+        template, offset = template_store().match(fp)
+    else:
+        print(f"[LOG] [kdmc] No '{ANCHOR_LANG}' traineddata for the layout anchors, reading the table without a template")
+    if template is not None:
+        print(f"[LOG] [kdmc] Layout template {template['id']} matched, reading {len(template['cells'])} cells")
+        values = read_cells(ctx, 1, template["cells"], OCR_LANG, offset)
+        if not (amount_text(values.get("restoration")) and amount_text(values.get("total"))):
+            print(f"[LOG] [kdmc] Template {template['id']} read failed, rediscovering the table")
+            values = None
+    if values is None:
+        try:
+            values = _discover_charges(ctx, fp)
+        except Exception as e:
+            print(f"[ERROR] [kdmc] Table detection failed: {e}")
+            values = {}
+    return {field: amount_text(value) for field, value in values.items()}
+
+
+def _extract_non_refundable_row(ctx):
+    text = words_to_text(page_words(ctx, 1, OCR_LANG))
+    ctx.debug_text("kdmc_page1_text", text)
+    charges = extract_charges(ctx)
+    covered_under_capping = sum_amounts(charges.get("restoration"), charges.get("supervision")) if (charges.get("restoration") or charges.get("supervision")) else ""
+    not_part_of_capping = charges.get("ground_rent", "")
+    non_refundable_cost = sum_amounts(covered_under_capping, not_part_of_capping) if (covered_under_capping or not_part_of_capping) else ""
+    security_deposit = charges.get("security_deposit", "")
+    demand_note_date = extract_demand_note_date(text)
+    section_length = charges.get("section_length") or extract_section_length(text)
+    values = {
+        "Demand Note Reference number": extract_demand_note_reference(text),
+        "UG TYPE( HDD/ OT/ MICROTRENCHING)": extract_ug_type(text),
+        "Road Types - CC/BT/TILES/ Normal Soil/kacha": extract_road_types(text),
+        "Rate/mtr- Current DN (UG/OH)": charges.get("rate", ""),
+        "GO RATE": charges.get("rate", ""),
+        "Section Length (Mtr.)": section_length,
+        "Total Route (MTR)": section_length,
+        "Annual Lease/ rent amount": not_part_of_capping,
+        "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)": not_part_of_capping,
+        "Covered under capping (Restoration Charges, admin, registration etc.)": covered_under_capping,
+        "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": non_refundable_cost,
+        "GST Amount": "0",
+        "SD Amount": security_deposit,
+        "ROW APPLICATION  DATE": extract_row_application_date(text),
+        "Demand Note Date": demand_note_date,
+        "DN RECEIVED FROM PARTNER/AUTHORITY- DATE": demand_note_date,
+        "Difference from, DN date  - DN Sent to Central team (ARTL)": difference_days(demand_note_date),
+        "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team": extract_say_amount(text) or charges.get("total") or sum_amounts(non_refundable_cost, security_deposit),
+        "Total Amount as per capping MB(Partner Scope)": covered_under_capping,
+        "Total Amount as per capping MB(Not in Partner Scope)": not_part_of_capping,
+    }
+    row = row_from_values(values, STATIC_VALUES)
+    debug_fields(ctx, "kdmc_fields", row)
+    return row
+
+
+def build_non_refundable_row(ctx, manual_values=None):
+    """Non-Refundable row; extraction runs once per context, manual values are applied to a copy."""
+    row = list(ctx.memo("kdmc:non_refundable_row", lambda: _extract_non_refundable_row(ctx)))
+    return apply_manual_values(row, HEADERS, manual_values)
+
+
+def build_sd_row(ctx, manual_values=None):
+    """SD row in the MCGM SD layout."""
+    return sd_row(build_non_refundable_row(ctx), "Mumbai", manual_values)
+
+
+def non_refundable_request_parser(pdf_path, manual_values=None):
+    return build_non_refundable_row(ExtractionContext(pdf_path), manual_values)
+
+
+def sd_parser(pdf_path, manual_values=None):
+    return build_sd_row(ExtractionContext(pdf_path), manual_values)
@@ -1,12 +1,35 @@
-import fitz  # PyMuPDF
-import camelot
 import re
 from datetime import datetime
+from types import SimpleNamespace
 import cv2
 import numpy as np
 import pytesseract
 from pdf2image import convert_from_path
 import pandas as pd
+from .context import ExtractionContext
+from .fields import Field
+from .numbers import format_amount, parse_amount
+from .table_cells import CELL_OCR_DPI, GRID_DPI, NUMERIC, TableProfile, text_column
+
+# Pages the table extractors read: the page classifier's charges-table page(s), page 2 if none is tagged
+TABLE_PAGES = "@charges_table|1,2"
+OCR_TABLE_PAGE = "@charges_table|2"
+# Charges-table columns holding figures (length, rate, factor, charges, deposit, GST, totals)
+NUMERIC_COLUMNS = tuple(range(3, 15))
+# Values seen in the Type Of Surface column; OCR of that column is snapped to the closest one
+ROAD_SURFACES = (
+    "Asphalt Road", "Concrete Road", "CC Road", "BT Road", "WBM Road", "Paver Block", "Tiles",
+    "Kacha Road", "Normal Soil", "Footpath",
+)
+# OCR profile of the charges table: one header row, road surface text in column 2, figures in 3-14
+TABLE_PROFILE = TableProfile(
+    columns={2: text_column(ROAD_SURFACES), **{c: NUMERIC for c in NUMERIC_COLUMNS}},
+    header_rows=1,
+)
+
+# Artifacts the row builders read from the shared ExtractionContext (Camelot lattice only as a fallback
+# when the cell grid fails, see _capping_tables)
+ARTIFACTS = ("text", f"ocr_table:{OCR_TABLE_PAGE}")
 
 # Using the same headers as MCGM parser
 HEADERS = [
@@ -112,11 +135,12 @@ def extract_section_length(text):
     return str(sum(valid_numbers)) if valid_numbers else ""
 
 
-def extract_sd_amount_opencv(text, pdf_path=None):
+def extract_sd_amount_opencv(text, pdf_path=None, df=None):
     """Extract security deposit amount from MBMC PDF using OpenCV+OCR (10th column, last/total row), fallback to regex."""
-    if pdf_path is not None:
+    if pdf_path is not None or df is not None:
         try:
-            df = opencv_pdf_table_to_df(pdf_path, page_num=2)
+            if df is None:
+                df = opencv_pdf_table_to_df(pdf_path, page_num=2)
             if df.shape[1] >= 10:
                 # Try to find the 'Total' row first
                 total_row = None
@@ -126,9 +150,9 @@ def extract_sd_amount_opencv(text, pdf_path=None):
                         break
                 if total_row is None:
                     total_row = df.shape[0] - 1  # fallback: last row
-                val_str = str(df.iloc[total_row, 9]).replace(",", "").strip()
-                if re.match(r"^\d+(?:\.\d+)?$", val_str):
-                    return str(int(float(val_str))) if float(val_str).is_integer() else str(float(val_str))
+                value = parse_amount(df.iloc[total_row, 9])
+                if value is not None:
+                    return format_amount(value)
         except Exception as e:
             print(f"[ERROR] [mbmc] OpenCV+OCR SD amount extraction failed: {e}")
     # Fallback to regex extraction
@@ -181,105 +205,65 @@ def extract_road_types_from_tables(tables, pdf_path=None):
         return extract_road_types_opencv_ocr(pdf_path)
     return ""
 
-def opencv_pdf_table_to_df(pdf_path, page_num=2, dpi=300, downscale_factor=0.7, debug_save_path=None):
+def opencv_pdf_table_to_df(pdf_path, page_num=2, dpi=CELL_OCR_DPI, grid_dpi=GRID_DPI, debug=None):
     """
-    Convert a PDF page to an image and extract the largest table as a DataFrame using OpenCV + pytesseract OCR.
-    Uses more aggressive downscaling for speed, and limits ThreadPoolExecutor to 4 workers.
-    Saves the processed table mask, the original grayscale table region, and a debug image with cell boxes for inspection.
+    Convert a PDF page to an image and extract the largest table as a DataFrame, one column per grid column.
+    The grid (with merged-cell spans, see parsers/table_structure.py) is detected on a cheap grid_dpi render;
+    cells are filled from the PDF text layer first and only cells with no usable text (scanned or garbled)
+    are re-rendered at dpi and OCR'd with pytesseract (see parsers/table_cells.py), so born-digital DNs need
+    no OCR at all. Doubtful OCR in the numeric columns gets a digits-only second pass; per-cell confidences
+    are in df.attrs["confidence"] and spans in df.attrs["spans"]. Merged cells hold their text at their
+    top-left position and "" elsewhere.
+    With a debug store (debug_artifacts.DebugStore, opt-in per request) the ruling mask, the detected cell
+    boxes and the table region are saved to it for inspection; nothing is written otherwise.
     """
-    from concurrent.futures import ThreadPoolExecutor
-    from PIL import Image
-    import os
     import cv2
+    import fitz
     import numpy as np
-    # Convert PDF page to image (in-memory)
-    pages = convert_from_path(pdf_path, dpi=dpi)
-    if page_num-1 >= len(pages):
-        raise ValueError(f"Page {page_num} not found in PDF.")
-    pil_img = pages[page_num-1]
-    if downscale_factor != 1.0:
-        new_size = (int(pil_img.width * downscale_factor), int(pil_img.height * downscale_factor))
-        pil_img = pil_img.resize(new_size, Image.LANCZOS)
-    img = np.array(pil_img.convert('L'))  # grayscale
-    color_img = np.array(pil_img.convert('RGB'))  # for drawing boxes
-    # Binarize
-    _, img_bin = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
-    kernel_len = np.array(img).shape[1] // 100
-    vert_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, kernel_len))
-    hori_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_len, 1))
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-    img_temp1 = cv2.erode(img_bin, vert_kernel, iterations=3)
-    vert_lines = cv2.dilate(img_temp1, vert_kernel, iterations=3)
-    img_temp2 = cv2.erode(img_bin, hori_kernel, iterations=3)
-    hori_lines = cv2.dilate(img_temp2, hori_kernel, iterations=3)
-    table_mask = cv2.addWeighted(vert_lines, 0.5, hori_lines, 0.5, 0.0)
-    table_mask = cv2.erode(~table_mask, kernel, iterations=2)
-    _, table_mask = cv2.threshold(table_mask, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-    # Save the processed table mask for debugging
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    mask_path = os.path.join(script_dir, 'mbmc_table_mask_debug.png')
-    cv2.imwrite(mask_path, table_mask)
-    # Find contours and bounding boxes
-    contours, _ = cv2.findContours(table_mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) > 1000]
-    boxes = sorted(boxes, key=lambda b: (b[1], b[0]))
-    # Draw boxes on color image for debug
-    for (x, y, w, h) in boxes:
-        cv2.rectangle(color_img, (x, y), (x+w, y+h), (0, 0, 255), 2)
-    boxes_path = os.path.join(script_dir, 'mbmc_table_boxes_debug.png')
-    cv2.imwrite(boxes_path, color_img)
-    # Save the full grayscale table region for debug (bounding all boxes)
-    if boxes:
-        x0 = min([x for (x, y, w, h) in boxes])
-        y0 = min([y for (x, y, w, h) in boxes])
-        x1 = max([x+w for (x, y, w, h) in boxes])
-        y1 = max([y+h for (x, y, w, h) in boxes])
-        table_crop = img[y0:y1, x0:x1]
-        crop_path = os.path.join(script_dir, 'mbmc_table_crop_debug.png')
-        cv2.imwrite(crop_path, table_crop)
-    # Group boxes into rows
-    rows = []
-    current_row = []
-    last_y = -1
-    for box in boxes:
-        x, y, w, h = box
-        if last_y == -1 or abs(y - last_y) < 10:
-            current_row.append(box)
-            last_y = y
-        else:
-            rows.append(sorted(current_row, key=lambda b: b[0]))
-            current_row = [box]
-            last_y = y
-    if current_row:
-        rows.append(sorted(current_row, key=lambda b: b[0]))
-    # OCR each cell in parallel, with padding
-    def ocr_cell(args):
-        img, box = args
-        x, y, w, h = box
-        pad = 2  # pixels
-        x1 = max(x - pad, 0)
-        y1 = max(y - pad, 0)
-        x2 = min(x + w + pad, img.shape[1])
-        y2 = min(y + h + pad, img.shape[0])
-        cell_img = img[y1:y2, x1:x2]
-        return pytesseract.image_to_string(cell_img, config='--psm 6').strip()
-    table_data = []
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        for row in rows:
-            cell_imgs = [(img, box) for box in row]
-            row_data = list(executor.map(ocr_cell, cell_imgs))
-            table_data.append(row_data)
+    from .table_cells import fill_cells
+    from .table_structure import detect_table
+    with fitz.open(pdf_path) as doc:
+        if not 1 <= page_num <= len(doc):
+            raise ValueError(f"Page {page_num} not found in PDF.")
+        page = doc[page_num - 1]
+        pix = page.get_pixmap(dpi=grid_dpi, colorspace=fitz.csGRAY)
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+        grid = detect_table(img, grid_dpi)
+        if debug is not None:
+            _save_table_debug(debug, img, grid, pdf_path, page_num)
+        if not grid.rows:
+            raise ValueError(f"No ruled table found on page {page_num}.")
+        table_data, confidence = fill_cells(
+            page, img, grid.rows, 72 / grid_dpi, profile=TABLE_PROFILE, label=f"mbmc page {page_num}",
+            ocr_dpi=dpi, spans=grid.spans,
+        )
     df = pd.DataFrame(table_data)
+    df.attrs["confidence"] = confidence
+    df.attrs["spans"] = grid.spans
     return df
 
+def _save_table_debug(debug, img, grid, pdf_path, page_num):
+    """Queue the ruling mask, the detected cell boxes and the table region on the request's debug store."""
+    debug.save_image(f"page{page_num}_table_mask", grid.lines, source=pdf_path)
+    color_img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    for row in grid.rows:
+        for box in row:
+            if box is not None:
+                x, y, w, h = box
+                cv2.rectangle(color_img, (x, y), (x+w, y+h), (0, 0, 255), 2)
+    debug.save_image(f"page{page_num}_table_boxes", color_img, source=pdf_path)
+    if grid.bbox is not None:
+        x0, y0, x1, y1 = grid.bbox
+        debug.save_image(f"page{page_num}_table_crop", img[y0:y1, x0:x1], source=pdf_path)
+
 def opencv_pdf_table_to_df_original(pdf_path, page_num=2, dpi=300, out_path='mbmc_page2.png'):
     """
     [BACKUP] Original: Convert a PDF page to an image and extract the largest table as a DataFrame using OpenCV + pytesseract OCR.
     """
-    pages = convert_from_path(pdf_path, dpi=dpi)
-    if page_num-1 >= len(pages):
+    pages = convert_from_path(pdf_path, dpi=dpi, first_page=page_num, last_page=page_num)
+    if not pages:
         raise ValueError(f"Page {page_num} not found in PDF.")
-    pages[page_num-1].save(out_path, 'PNG')
+    pages[0].save(out_path, 'PNG')
     img = cv2.imread(out_path, 0)
     _, img_bin = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
     kernel_len = np.array(img).shape[1] // 100
@@ -324,13 +308,14 @@ def opencv_pdf_table_to_df_original(pdf_path, page_num=2, dpi=300, out_path='mbm
     df = pd.DataFrame(table_data)
     return df
 
-def extract_road_types_opencv_ocr(pdf_path):
+def extract_road_types_opencv_ocr(pdf_path, df=None):
     """
     Extract road types from page 2 of the PDF using OpenCV + pytesseract OCR table extraction.
     Returns a string of unique, valid road types from the 3rd column, joined by slashes if multiple.
     """
     try:
-        df = opencv_pdf_table_to_df(pdf_path, page_num=2)
+        if df is None:
+            df = opencv_pdf_table_to_df(pdf_path, page_num=2)
         if df.shape[1] >= 3:
             road_types = [
                 str(val).strip()
@@ -352,53 +337,53 @@ def extract_road_types_opencv_ocr(pdf_path):
         print(f"[ERROR] [mbmc] OpenCV+OCR road type extraction failed: {e}")
         return ""
 
-def extract_rate_in_rs_from_tables(tables, pdf_path=None):
+def extract_rate_in_rs_from_tables(tables, pdf_path=None, df=None):
     """
     Extract rate per meter from the table in the PDF using OpenCV+OCR logic, always extracting from the 5th column (index 4), skipping header and 'Total' rows.
     """
-    if pdf_path is None:
+    if pdf_path is None and df is None:
         return ""
     try:
-        df = opencv_pdf_table_to_df(pdf_path, page_num=2)
+        if df is None:
+            df = opencv_pdf_table_to_df(pdf_path, page_num=2)
         if df.shape[1] >= 5:
             values = []
             for idx, val in enumerate(df.iloc[1:, 4], start=1):
-                val_str = str(val).replace(",", "").strip()
                 row_label = str(df.iloc[idx, 0]).lower() if df.shape[1] > 0 else ""
                 if row_label.startswith("total"):
                     continue
-                if re.match(r"^\d+(?:\.\d+)?$", val_str):
-                    values.append(val_str)
+                value = parse_amount(val)
+                if value is not None:
+                    values.append(format_amount(value))
             return " / ".join(values) if values else ""
         return ""
     except Exception as e:
         print(f"[ERROR] [mbmc] OpenCV+OCR RM Rate extraction failed: {e}")
         return ""
 
-def extract_section_length_from_tables(tables, pdf_path=None):
+def extract_section_length_from_tables(tables, pdf_path=None, df=None):
     """
     Extract section length from the table in the PDF using OpenCV+OCR logic, extracting and summing values from the 4th column (index 3), skipping header and 'Total' rows.
     """
-    if pdf_path is None:
+    if pdf_path is None and df is None:
         return ""
     try:
-        df = opencv_pdf_table_to_df(pdf_path, page_num=2)
+        if df is None:
+            df = opencv_pdf_table_to_df(pdf_path, page_num=2)
         if df.shape[1] >= 4:
             total_length = 0.0
             for idx, val in enumerate(df.iloc[1:, 3], start=1):
-                val_str = str(val).replace(",", "").strip()
                 row_label = str(df.iloc[idx, 0]).lower() if df.shape[1] > 0 else ""
                 if row_label.startswith("total"):
                     continue
-                if re.match(r"^\d+(?:\.\d+)?$", val_str):
-                    total_length += float(val_str)
-            return str(int(total_length)) if total_length.is_integer() else str(total_length)
+                total_length += parse_amount(val) or 0.0
+            return format_amount(total_length)
         return ""
     except Exception as e:
         print(f"[ERROR] [mbmc] OpenCV+OCR section length extraction failed: {e}")
         return ""
 
-def extract_covered_under_capping(text, tables, pdf_path=None):
+def extract_covered_under_capping(text, tables, pdf_path=None, df=None):
     """
     Extract amounts covered under capping from PDF using OpenCV+OCR logic.
     Sums values from columns 7, 8, and 9 in the "Total" row, which typically contain:
@@ -414,11 +399,12 @@ def extract_covered_under_capping(text, tables, pdf_path=None):
     Returns:
         str: Sum of covered under capping amounts as a string, empty string if extraction fails
     """
-    if pdf_path is None:
+    if pdf_path is None and df is None:
         return ""
     
     try:
-        df = opencv_pdf_table_to_df(pdf_path, page_num=2)
+        if df is None:
+            df = opencv_pdf_table_to_df(pdf_path, page_num=2)
         if df.shape[1] >= 10:  # Need at least 10 columns
             # Find the "Total" row
             total_row = None
@@ -431,12 +417,10 @@ def extract_covered_under_capping(text, tables, pdf_path=None):
                 covered_amount = 0.0
                 # Sum values from columns 7, 8, and 9 (indices 6, 7, 8) in the total row
                 for col_idx in [6, 7, 8]:
-                    val_str = str(df.iloc[total_row, col_idx]).replace(",", "").strip()
-                    if re.match(r"^\d+(?:\.\d+)?$", val_str):
-                        covered_amount += float(val_str)
+                    covered_amount += parse_amount(df.iloc[total_row, col_idx]) or 0.0
                 
                 # Return as integer if whole number, otherwise as float string
-                return str(int(covered_amount)) if covered_amount.is_integer() else str(covered_amount)
+                return format_amount(covered_amount)
         return ""
     except Exception as e:
         print(f"[ERROR] [mbmc] OpenCV+OCR covered under capping extraction failed: {e}")
@@ -467,13 +451,14 @@ def extract_not_part_of_capping(text, tables):
     
     return ""
 
-def extract_gst_amount_opencv(pdf_path):
+def extract_gst_amount_opencv(pdf_path, df=None):
     """
     Extract GST amount from MBMC PDF using OpenCV+OCR table extraction.
     Sums CGST (12th col, index 11) and SGST (13th col, index 12) from the last/total row.
     """
     try:
-        df = opencv_pdf_table_to_df(pdf_path, page_num=2)
+        if df is None:
+            df = opencv_pdf_table_to_df(pdf_path, page_num=2)
         if df.shape[1] >= 13:
             # Find the 'Total' row, else use last row
             total_row = None
@@ -483,39 +468,112 @@ def extract_gst_amount_opencv(pdf_path):
                     break
             if total_row is None:
                 total_row = df.shape[0] - 1
-            cgst_str = str(df.iloc[total_row, 11]).replace(",", "").strip()
-            sgst_str = str(df.iloc[total_row, 12]).replace(",", "").strip()
-            cgst = float(cgst_str) if re.match(r"^\d+(?:\.\d+)?$", cgst_str) else 0.0
-            sgst = float(sgst_str) if re.match(r"^\d+(?:\.\d+)?$", sgst_str) else 0.0
-            total = cgst + sgst
-            return str(int(total)) if total.is_integer() else str(total)
+            cgst = parse_amount(df.iloc[total_row, 11]) or 0.0
+            sgst = parse_amount(df.iloc[total_row, 12]) or 0.0
+            return format_amount(cgst + sgst)
         return ""
     except Exception as e:
         print(f"[ERROR] [mbmc] OpenCV+OCR GST extraction failed: {e}")
         return ""
 
-def non_refundable_request_parser(pdf_path, manual_values=None):
+def _ocr_table_or_none(ctx):
+    try:
+        return ctx.ocr_table(OCR_TABLE_PAGE)
+    except Exception as e:
+        print(f"[ERROR] [mbmc] OpenCV+OCR table extraction failed: {e}")
+        return None
+
+def _table_inputs(ctx):
+    """(df, pdf_path) for the table-based extractors: the shared OCR grid, or (None, None) when it failed."""
+    df = _ocr_table_or_none(ctx)
+    return df, (ctx.pdf_path if df is not None else None)
+
+def _capping_tables(ctx):
+    """Tables searched for license / rental amounts: the cell grid when it was read, else Camelot lattice."""
+    df = _ocr_table_or_none(ctx)
+    if df is not None:
+        return [SimpleNamespace(df=df)]
+    return ctx.lattice_tables(TABLE_PAGES)
+
+def _field_section_length(ctx):
+    df, pdf_path = _table_inputs(ctx)
+    return extract_section_length_from_tables(None, pdf_path=pdf_path, df=df) or extract_section_length(ctx.text)
+
+def _field_covered_under_capping(ctx):
+    df, pdf_path = _table_inputs(ctx)
+    return extract_covered_under_capping(ctx.text, None, pdf_path=pdf_path, df=df)
+
+def _field_gst_amount(ctx):
+    df, pdf_path = _table_inputs(ctx)
+    return extract_gst_amount_opencv(pdf_path, df=df) if df is not None else ""
+
+def _field_sd_amount(ctx):
+    df, pdf_path = _table_inputs(ctx)
+    return extract_sd_amount_opencv(ctx.text, pdf_path=pdf_path, df=df)
+
+def _field_road_types(ctx):
+    df, pdf_path = _table_inputs(ctx)
+    return extract_road_types_opencv_ocr(pdf_path, df=df) if df is not None else ""
+
+def _field_rate(ctx):
+    df, pdf_path = _table_inputs(ctx)
+    return extract_rate_in_rs_from_tables(None, pdf_path=pdf_path, df=df)
+
+def _field_total_dn_amount(ctx):
+    return extract_total_dn_amount({
+        "SD Amount": _field_sd_amount(ctx),
+        "BG Amount": "0",
+        "GST Amount": _field_gst_amount(ctx),
+        "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": _field_covered_under_capping(ctx)
+    })
+
+_TEXT = ("text",)
+_OCR_TABLE = ("text", f"ocr_table:{OCR_TABLE_PAGE}")
+
+# Per-field extractors for field-subset requests (see parsers/fields.py); each mirrors the full row
+FIELDS = {
+    "Demand Note Reference number": Field(_TEXT, lambda ctx: extract_demand_note_reference(ctx.text)),
+    "Demand Note Date": Field(_TEXT, lambda ctx: extract_demand_note_date(ctx.text)),
+    "DN RECEIVED FROM PARTNER/AUTHORITY- DATE": Field(_TEXT, lambda ctx: extract_demand_note_date(ctx.text)),
+    "Difference from, DN date  - DN Sent to Central team (ARTL)": Field(_TEXT, lambda ctx: extract_difference_days(extract_demand_note_date(ctx.text))),
+    "Section Length (Mtr.)": Field(_OCR_TABLE, _field_section_length),
+    "Total Route (MTR)": Field(_OCR_TABLE, _field_section_length),
+    "GST Amount": Field(_OCR_TABLE, _field_gst_amount),
+    "SD Amount": Field(_OCR_TABLE, _field_sd_amount),
+    "Road Types - CC/BT/TILES/ Normal Soil/kacha": Field(_OCR_TABLE, _field_road_types),
+    "Rate/mtr- Current DN (UG/OH)": Field(_OCR_TABLE, _field_rate),
+    "Covered under capping (Restoration Charges, admin, registration etc.)": Field(_OCR_TABLE, _field_covered_under_capping),
+    "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": Field(_OCR_TABLE, _field_covered_under_capping),
+    "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)": Field(_OCR_TABLE, lambda ctx: extract_not_part_of_capping(ctx.text, _capping_tables(ctx))),
+    "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team": Field(_OCR_TABLE, _field_total_dn_amount),
+}
+
+def _extract_non_refundable_row(ctx, manual_values=None):
+    """
+    Build the Non-Refundable row from the shared ExtractionContext.
+    The page-2 OCR table grid is computed once and shared by every table-based field.
+    """
     print("[DEBUG] [mbmc] >>> ENTERED non_refundable_request_parser <<<")
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text() for page in doc)
-    doc.close()
+    text = ctx.text
     print(f"[DEBUG] [mbmc] --- FULL PDF TEXT START ---\n{text}\n[DEBUG] [mbmc] --- FULL PDF TEXT END ---")
-    # Extract tables from the PDF (still used for not_part_of_capping fallback)
-    tables = camelot.read_pdf(pdf_path, pages='1,2', flavor='lattice')
-    print(f"[DEBUG] [mbmc] Camelot tables found: {len(tables)}")
+    df = _ocr_table_or_none(ctx)
+    # Tables for the not_part_of_capping search (Camelot only when the grid failed)
+    tables = _capping_tables(ctx)
+    print(f"[DEBUG] [mbmc] Capping tables found: {len(tables)}")
+    pdf_path = ctx.pdf_path if df is not None else None
 
     # Extract data from text and tables, prioritizing OpenCV+OCR for all table-based fields
     demand_note_ref = extract_demand_note_reference(text)
-    section_length = extract_section_length_from_tables(None, pdf_path=pdf_path) or extract_section_length(text)
-    gst_amount = extract_gst_amount_opencv(pdf_path)
-    sd_amount = extract_sd_amount_opencv(text, pdf_path=pdf_path)
+    section_length = extract_section_length_from_tables(None, pdf_path=pdf_path, df=df) or extract_section_length(text)
+    gst_amount = extract_gst_amount_opencv(pdf_path, df=df) if df is not None else ""
+    sd_amount = extract_sd_amount_opencv(text, pdf_path=pdf_path, df=df)
     row_app_date = extract_row_application_date(text) if 'extract_row_application_date' in globals() else ''
     demand_note_date = extract_demand_note_date(text)
     received_date = demand_note_date
     diff_days = extract_difference_days(received_date)
-    road_types = extract_road_types_opencv_ocr(pdf_path)
-    rate_in_rs = extract_rate_in_rs_from_tables(None, pdf_path=pdf_path)
-    covered_under_capping = extract_covered_under_capping(text, None, pdf_path=pdf_path)
+    road_types = extract_road_types_opencv_ocr(pdf_path, df=df) if df is not None else ""
+    rate_in_rs = extract_rate_in_rs_from_tables(None, pdf_path=pdf_path, df=df)
+    covered_under_capping = extract_covered_under_capping(text, None, pdf_path=pdf_path, df=df)
     not_part_of_capping = extract_not_part_of_capping(text, tables)
 
     # Initialize the row with empty values
@@ -578,9 +636,25 @@ def non_refundable_request_parser(pdf_path, manual_values=None):
 
     return row
 
-def sd_parser(pdf_path, manual_values=None):
+def build_non_refundable_row(ctx, manual_values=None):
+    """
+    Non-Refundable row builder used by the parser registry.
+    Extraction runs once per context (the SD builder reuses it); manual values are applied to a copy.
+    """
+    row = list(ctx.memo("mbmc:non_refundable_row", lambda: _extract_non_refundable_row(ctx)))
+    if manual_values:
+        for field, value in manual_values.items():
+            if field in HEADERS:
+                row[HEADERS.index(field)] = value
+    return row
+
+def non_refundable_request_parser(pdf_path, manual_values=None):
+    return build_non_refundable_row(ExtractionContext(pdf_path), manual_values)
+
+def build_sd_row(ctx, manual_values=None):
     """
     SD Parser for MBMC: outputs a 20-column, 2-row Excel with static headers and mapped row values, using OpenCV+OCR for SD Amount and related fields.
+    The Non-Refundable row (and the OCR pass behind it) is shared through the context.
     """
     alt_headers = [
         "SD OU Circle Name", "Execution Partner Vendor Code", "Execution Partner Vendor Name", "Execution Partner GBPA PO No.",
@@ -590,8 +664,8 @@ def sd_parser(pdf_path, manual_values=None):
         "Payment Mode-", "Route", "Node Id"
     ]
 
-    # Get data from the non-refundable parser (now uses OpenCV+OCR for all table-based fields)
-    row_main = non_refundable_request_parser(pdf_path)
+    # Get data from the non-refundable row (uses OpenCV+OCR for all table-based fields)
+    row_main = build_non_refundable_row(ctx)
 
     def get_main(header):
         try:
@@ -635,6 +709,9 @@ def sd_parser(pdf_path, manual_values=None):
 
     return alt_headers, row
 
+def sd_parser(pdf_path, manual_values=None):
+    return build_sd_row(ExtractionContext(pdf_path), manual_values)
+
 __all__ = [
     'extract_demand_note_reference',
     'extract_road_types_opencv_ocr',
@@ -643,5 +720,9 @@ __all__ = [
     'extract_covered_under_capping',
     'extract_sd_amount_opencv',
     'non_refundable_request_parser',
-    'sd_parser'
+    'sd_parser',
+    'build_non_refundable_row',
+    'build_sd_row',
+    'ARTIFACTS',
+    'FIELDS'
 ]
\ No newline at end of file
@@ -1,7 +1,10 @@
-import fitz  # PyMuPDF
-import camelot
 import re
 from datetime import datetime
+from .context import ExtractionContext
+from .fields import Field
+
+# Artifacts the row builders read from the shared ExtractionContext
+ARTIFACTS = ("text", "lattice:1")
 
 HEADERS = [
     "Intercity/Intracity- Deployment Intercity/intracity- O&M FTTH- Deployment FTTH-O&M",
@@ -393,14 +396,48 @@ def extract_surface_wise_length_from_tables(tables):
                     break
     return ' / '.join(lengths)
 
-def non_refundable_request_parser(pdf_path, manual_values=None):
+def non_refundable_cost(covered_under_capping, not_part_of_capping):
+    try:
+        cost = float(covered_under_capping) + float(not_part_of_capping or 0)
+    except Exception:
+        cost = covered_under_capping
+    return str(int(cost)) if str(cost).replace('.', '', 1).isdigit() and float(cost).is_integer() else str(cost)
+
+def _field_non_refundable_cost(ctx):
+    tables = ctx.lattice_tables("1")
+    return non_refundable_cost(extract_covered_under_capping(ctx.text, tables), extract_not_part_of_capping(ctx.text, tables))
+
+def _field_total_dn_amount(ctx):
+    return extract_total_dn_amount({
+        "SD Amount": extract_sd_amount_from_text(ctx.text),
+        "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": _field_non_refundable_cost(ctx)
+    })
+
+# Per-field extractors for field-subset requests (see parsers/fields.py); each mirrors the full row
+FIELDS = {
+    "Demand Note Reference number": Field(("text",), lambda ctx: extract_demand_note_reference(ctx.text)),
+    "Demand Note Date": Field(("text",), lambda ctx: extract_demand_note_date(ctx.text)),
+    "DN RECEIVED FROM PARTNER/AUTHORITY- DATE": Field(("text",), lambda ctx: extract_demand_note_date(ctx.text)),
+    "Difference from, DN date  - DN Sent to Central team (ARTL)": Field(("text",), lambda ctx: extract_difference_days(extract_demand_note_date(ctx.text))),
+    "ROW APPLICATION  DATE": Field(("text",), lambda ctx: extract_row_application_date(ctx.text)),
+    "GST Amount": Field(("text",), lambda ctx: extract_gst_amount_from_text(ctx.text)),
+    "SD Amount": Field(("text",), lambda ctx: extract_sd_amount_from_text(ctx.text)),
+    "Section Length (Mtr.)": Field(("lattice:1",), lambda ctx: extract_section_length_from_tables(ctx.lattice_tables("1"))),
+    "Road Types - CC/BT/TILES/ Normal Soil/kacha": Field(("lattice:1",), lambda ctx: extract_road_types_from_tables(ctx.lattice_tables("1"))),
+    "Rate/mtr- Current DN (UG/OH)": Field(("lattice:1",), lambda ctx: extract_rate_in_rs_from_tables(ctx.lattice_tables("1"))),
+    "Covered under capping (Restoration Charges, admin, registration etc.)": Field(("text", "lattice:1"), lambda ctx: extract_covered_under_capping(ctx.text, ctx.lattice_tables("1"))),
+    "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)": Field(("text", "lattice:1"), lambda ctx: extract_not_part_of_capping(ctx.text, ctx.lattice_tables("1"))),
+    "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": Field(("text", "lattice:1"), _field_non_refundable_cost),
+    "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team": Field(("text", "lattice:1"), _field_total_dn_amount),
+}
+
+def _extract_non_refundable_row(ctx, manual_values=None):
     """
     Main extraction logic for Non Refundable Request Parser (was extract_fields_from_pdf).
+    Reads the text layer and page-1 lattice tables from the shared ExtractionContext.
     """
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text() for page in doc)
-    doc.close()
-    tables = camelot.read_pdf(pdf_path, pages='1', flavor='lattice')
+    text = ctx.text
+    tables = ctx.lattice_tables("1")
     print("\n" + "="*60)
     print("[DEBUG] [mcgm] DN EXTRACTED TEXT (START)")
     print(text)
@@ -465,12 +502,7 @@ def non_refundable_request_parser(pdf_path, manual_values=None):
         elif header == "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)":
             row.append(not_part_of_capping)
         elif header == "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )":
-            non_refundable_cost = None
-            try:
-                non_refundable_cost = float(covered_under_capping) + float(not_part_of_capping or 0)
-            except Exception:
-                non_refundable_cost = covered_under_capping
-            row.append(str(int(non_refundable_cost)) if str(non_refundable_cost).replace('.', '', 1).isdigit() and float(non_refundable_cost).is_integer() else str(non_refundable_cost))
+            row.append(non_refundable_cost(covered_under_capping, not_part_of_capping))
         elif header == "Rate/mtr- Current DN (UG/OH) (2)":
             row.append(rate_in_rs)
         elif header == "NO OF POLES":
@@ -491,16 +523,32 @@ def non_refundable_request_parser(pdf_path, manual_values=None):
     print("[DEBUG] [mcgm] END EXTRACTED FIELDS\n")
     return row
 
-def sd_parser(pdf_path, manual_values=None):
+def build_non_refundable_row(ctx, manual_values=None):
+    """
+    Non-Refundable row builder used by the parser registry.
+    Extraction runs once per context (the SD builder reuses it); manual values are applied to a copy.
+    """
+    row = list(ctx.memo("mcgm:non_refundable_row", lambda: _extract_non_refundable_row(ctx)))
+    if manual_values:
+        for field, value in manual_values.items():
+            if field in HEADERS:
+                row[HEADERS.index(field)] = value
+    return row
+
+def non_refundable_request_parser(pdf_path, manual_values=None):
+    return build_non_refundable_row(ExtractionContext(pdf_path), manual_values)
+
+def build_sd_row(ctx, manual_values=None):
     """
     SD Parser for MCGM Type 1: outputs a 20-column, 2-row Excel with static headers and mapped row values.
+    The Non-Refundable row it reads from is built once per context.
     """
     alt_headers = [
         "SD OU Circle Name", "Execution Partner Vendor Code", "Execution Partner Vendor Name", "Execution Partner GBPA PO No.",
         "GIS Code", "M6 Code", "Locator ID", "Mother Work Order", "Child Work Order", "FA Location", "Partner PO circle",
         "Unique route id", "Supplier Code", "Supplier site name", "NFA no.", "Payment type", "DN No", "DN Date", "SD Amount", "SD Time Period"
     ]
-    row_main = non_refundable_request_parser(pdf_path)
+    row_main = build_non_refundable_row(ctx)
     def get_main(header):
         try:
             return row_main[HEADERS.index(header)]
@@ -536,13 +584,13 @@ def sd_parser(pdf_path, manual_values=None):
                 row[idx] = value
     return alt_headers, row
 
-def extract_all_fields_for_testing(pdf_path):
-    import fitz
-    import camelot
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text() for page in doc)
-    doc.close()
-    tables = camelot.read_pdf(pdf_path, pages='1', flavor='lattice')
+def sd_parser(pdf_path, manual_values=None):
+    return build_sd_row(ExtractionContext(pdf_path), manual_values)
+
+def extract_all_fields_for_testing(pdf_path, ctx=None):
+    ctx = ctx or ExtractionContext(pdf_path)
+    text = ctx.text
+    tables = ctx.lattice_tables("1")
     results = {
         "Demand Note Reference number": extract_demand_note_reference(text),
         "Section Length": extract_section_length_from_tables(tables),
@@ -0,0 +1,271 @@
+# MIDC (Maharashtra Industrial Development Corporation) Type 1 demand note parser.
+# Type 1 is the itemised permission letter from the Executive Engineer's office:
+#   1) permission fee per km per duct (+ "Say" rounding, 18% GST)
+#   2) road reinstatement charges per metre for each surface (+ GST)
+#   3) lumpsum deposit for reinstatement of plot approach roads (the SD)
+#   4) Total (1 to 3)
+# The charges sit on pages 1-2. The text layer is used when the PDF has one (with lattice tables flattened
+# into lines); scanned letters are OCR'd, and only those two pages.
+import re
+from datetime import datetime
+from .context import ExtractionContext
+from .mcgm import HEADERS
+from .numbers import amount_text, difference_days, sum_amounts
+from .rows import apply_manual_values, debug_fields, row_from_values, sd_row
+
+# Pages that carry the demand (the rest are terms & conditions)
+CHARGE_PAGES = (1, 2)
+OCR_LANG = "eng"
+
+# Artifacts the row builders read from the shared ExtractionContext
+ARTIFACTS = (f"ocr_text:{OCR_LANG}:1,2",)
+
+STATIC_VALUES = {
+    "Intercity/Intracity- Deployment Intercity/intracity- O&M FTTH- Deployment FTTH-O&M": "Intercity/Intracity - Deployment",
+    "BUSINESS UNIT": "TNL-FF-Maharashtra",
+    "Circle": "MUM",
+    "City": "MUM",
+    "LM/BB/FTTH": "LM",
+    "Type (UG/OH)": "UG",
+    "Capping/Non Capping": "Non capping",
+    "Cost type with Cost Breakup EG.. - PROCESING FEES/ SUPERVISOIN CHARGE/ ADMIN FEES/ LICENSE FEES etc etc.": "Restoration Charges",
+    "BG Amount": "0",
+    "Locator Code (material)": "61027-IP01-2948564-CONT1210",
+    "Authority( email address)": "ceo@midcindia.org",
+    "Authority": "Maharashtra Industrial Development Corporation",
+    "BENEFICIERY NAME": "Maharashtra Industrial Development Corporation",
+    "Mode of payment(DD/ONLINE-URL/ONLINE-NEFT/BHARATKOSH": "NEFT / RTGS",
+    "EXECUTION PARTNER NAME": "Excel Telesonic India Private Limited",
+    "Payable (Authority) Location": "Navi Mumbai",
+    "Printing Location": "Mumbai",
+    "Cost type(restoration/ supervison/ agency changes/ admin etc)": "Restoration Charges",
+    "Permission Type (Primary/ Secondary)": "Primary",
+}
+
+NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+RUPEES = r"Rs\.?\s*" + NUMBER
+DATE = r"(\d{1,2})\s*[/.\-]\s*(\d{1,2})\s*[/.\-]\s*(20\d{2})"
+
+
+def _date(match):
+    if not match:
+        return ""
+    day, month, year = match.groups()[-3:]
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%d/%m/%Y")
+    except ValueError:
+        return ""
+
+
+def document_text(ctx):
+    """Text of the charge pages: text layer (+ flattened lattice tables) when present, else targeted OCR."""
+    def compute():
+        texts = ctx.ocr_page_texts(OCR_LANG, CHARGE_PAGES)
+        text = "\n".join(texts)
+        if ctx.has_text_layer(CHARGE_PAGES):
+            try:
+                tables = ctx.lattice_tables(",".join(str(p) for p in CHARGE_PAGES if p <= ctx.page_count))
+                for table in tables:
+                    text += "\n" + "\n".join("  ".join(str(c) for c in row) for row in table.df.values.tolist())
+            except Exception as e:
+                print(f"[ERROR] [midc] Camelot lattice extraction failed: {e}")
+        return text
+    return ctx.memo("midc:text", compute)
+
+
+def extract_demand_note_reference(text):
+    """'No.EE/Dn.II/MHP/Eoffice/I/ I113925 /of 2025' -> 'No.EE/Dn.II/MHP/Eoffice/I/I113925'."""
+    match = re.search(r"No\.?\s*/?\s*EE\s*/\s*Dn\.?\s*(II|2)\s*/\s*MHP\s*/\s*E-?\s*office\s*/\s*I\s*/\s*([A-Z]?\s*\d[\d\s]*)?", text, re.IGNORECASE)
+    if not match:
+        return ""
+    number = re.sub(r"\s+", "", match.group(2) or "")
+    return f"No.EE/Dn.II/MHP/Eoffice/I/{number}"
+
+
+def extract_demand_note_date(text):
+    return _date(re.search(r"Date\s*[:\-]*\s*" + DATE, text, re.IGNORECASE))
+
+
+def extract_row_application_date(text):
+    """'2) Your letter dated 18.04.2025' is the ROW application."""
+    return _date(re.search(r"Your\s+letter\s+(?:dated|dtd\.?)\s*" + DATE, text, re.IGNORECASE))
+
+
+def extract_section_length(text):
+    for pattern in (
+        NUMBER + r"\s*m(?:trs?|eters?)?\.?\s+total\s+length",
+        r"=\s*" + NUMBER + r"\s*m\s*x\s*Rs",
+        r"length\s+of\s+" + NUMBER + r"\s*(?:m|mtr)",
+        r"for\s+" + NUMBER + r"\s*m\b",
+    ):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return amount_text(match.group(1))
+    return ""
+
+
+def extract_ug_type(text):
+    types = []
+    if re.search(r"open\s+trench", text, re.IGNORECASE):
+        types.append("OT")
+    if re.search(r"\bHDD\b", text):
+        types.append("HDD")
+    return " / ".join(types) or "OT"
+
+
+def split_items(text):
+    """
+    Cut the letter into its numbered charge items: {1: fee, 2: reinstatement, 3: deposit, 4: total}.
+    Each item runs from its 'n)' marker to the next one.
+    """
+    markers = []
+    for n, pattern in ((1, r"pay\s+fees"), (2, r"reinstatement\s+charges"), (3, r"Deposit\s+for\s+Reinstatement"), (4, r"Total\s*\(\s*1\s*to\s*3\s*\)")):
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            markers.append((match.start(), n))
+    markers.sort()
+    items = {}
+    for (start, n), (end, _) in zip(markers, markers[1:] + [(len(text), None)]):
+        items[n] = text[start:end]
+    return items
+
+
+def labelled_amounts(section):
+    """
+    Amounts in one charge item, by role: 'say' (rounded amount), 'gst', 'total', and 'items' (the rest).
+    Only 'Rs.'-prefixed numbers count, so '18%' and '3 Ducts' are skipped.
+    """
+    result = {"items": [], "say": "", "gst": "", "total": ""}
+    for line in section.splitlines():
+        amounts = [amount_text(m) for m in re.findall(RUPEES + r"(?!\s*/-?\s*(?:Km|m)\b)", line)]
+        amounts = [a for a in amounts if a]
+        if not amounts:
+            continue
+        value = amounts[-1]
+        lowered = line.lower()
+        if "say" in lowered:
+            result["say"] = value
+        elif "gst" in lowered:
+            result["gst"] = value
+        elif "total" in lowered:
+            result["total"] = value
+        else:
+            result["items"].append(value)
+    return result
+
+
+def _base_amount(amounts):
+    return amounts["say"] or (sum_amounts(*amounts["items"]) if amounts["items"] else "")
+
+
+def extract_road_types(section):
+    """'(i) For Hard Side Shoulder' -> 'Hard Side Shoulder'."""
+    names = []
+    for match in re.finditer(r"For\s+([A-Za-z][A-Za-z /&]+?)\s*$", section, re.IGNORECASE | re.MULTILINE):
+        name = match.group(1).strip()
+        if name.lower() not in ("hard side shoulders as below",) and name not in names:
+            names.append(name)
+    return " / ".join(names)
+
+
+def extract_rates(section):
+    """'= 375 m x Rs. 484/- m' -> '484'."""
+    rates = []
+    for match in re.finditer(r"m\s*x\s*Rs\.?\s*" + NUMBER + r"\s*/-?\s*m\b", section, re.IGNORECASE):
+        rate = amount_text(match.group(1))
+        if rate and rate not in rates:
+            rates.append(rate)
+    return " / ".join(rates)
+
+
+def extract_charges(text):
+    """Permission fee, reinstatement, GST, deposit (SD) and grand total from the numbered items."""
+    items = split_items(text)
+    fee = labelled_amounts(items.get(1, ""))
+    reinstatement = labelled_amounts(items.get(2, ""))
+    deposit = labelled_amounts(items.get(3, ""))
+    total = labelled_amounts(items.get(4, ""))
+    return {
+        "permission_fee": _base_amount(fee),
+        "reinstatement": _base_amount(reinstatement),
+        "gst": sum_amounts(fee["gst"], reinstatement["gst"]) if (fee["gst"] or reinstatement["gst"]) else "",
+        "deposit": _base_amount(deposit) or deposit["total"],
+        "total": total["say"] or (total["items"][0] if total["items"] else total["total"]),
+        "road_types": extract_road_types(items.get(2, "")),
+        "rates": extract_rates(items.get(2, "")),
+    }
+
+
+def row_from_fields(fields):
+    """Build a Non-Refundable row in HEADERS order from extracted fields plus the MIDC static values."""
+    not_part = fields.get("not_part_of_capping", "")
+    covered = fields.get("covered_under_capping", "")
+    non_refundable = sum_amounts(covered, not_part) if (covered or not_part) else ""
+    total = fields.get("total") or (sum_amounts(non_refundable, fields.get("sd_amount"), fields.get("gst_amount")) if non_refundable else "")
+    dn_date = fields.get("demand_note_date", "")
+    values = {
+        "Demand Note Reference number": fields.get("demand_note_reference", ""),
+        "UG TYPE( HDD/ OT/ MICROTRENCHING)": fields.get("ug_type", "OT"),
+        "Road Types - CC/BT/TILES/ Normal Soil/kacha": fields.get("road_types", ""),
+        "GO RATE": fields.get("rate", ""),
+        "Rate/mtr- Current DN (UG/OH)": fields.get("rate", ""),
+        "Section Length (Mtr.)": fields.get("section_length", ""),
+        "Total Route (MTR)": fields.get("section_length", ""),
+        "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)": not_part,
+        "Covered under capping (Restoration Charges, admin, registration etc.)": covered,
+        "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": non_refundable,
+        "GST Amount": fields.get("gst_amount", ""),
+        "SD Amount": fields.get("sd_amount", ""),
+        "ROW APPLICATION  DATE": fields.get("row_application_date", ""),
+        "Demand Note Date": dn_date,
+        "DN RECEIVED FROM PARTNER/AUTHORITY- DATE": dn_date,
+        "Difference from, DN date  - DN Sent to Central team (ARTL)": difference_days(dn_date),
+        "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team": total,
+    }
+    return row_from_values(values, STATIC_VALUES)
+
+
+def _extract_non_refundable_row(ctx):
+    text = document_text(ctx)
+    ctx.debug_text("midc_type1_text", text)
+    charges = extract_charges(text)
+    row = row_from_fields({
+        "demand_note_reference": extract_demand_note_reference(text),
+        "demand_note_date": extract_demand_note_date(text),
+        "row_application_date": extract_row_application_date(text),
+        "section_length": extract_section_length(text),
+        "ug_type": extract_ug_type(text),
+        "road_types": charges["road_types"],
+        "rate": charges["rates"],
+        # The per-km permission fee is a licence fee; reinstatement is the restoration charge
+        "not_part_of_capping": charges["permission_fee"],
+        "covered_under_capping": charges["reinstatement"],
+        "gst_amount": charges["gst"],
+        "sd_amount": charges["deposit"],
+        "total": charges["total"],
+    })
+    debug_fields(ctx, "midc_type1_fields", row)
+    return row
+
+
+def build_non_refundable_row(ctx, manual_values=None):
+    """Non-Refundable row; extraction runs once per context, manual values are applied to a copy."""
+    row = list(ctx.memo("midc_type1:non_refundable_row", lambda: _extract_non_refundable_row(ctx)))
+    return apply_manual_values(row, HEADERS, manual_values)
+
+
+def sd_row_from(row_main, manual_values=None):
+    """SD row (MCGM SD layout) from a MIDC Non-Refundable row."""
+    return sd_row(row_main, "Mumbai", manual_values, work_codes="NA")
+
+
+def build_sd_row(ctx, manual_values=None):
+    return sd_row_from(build_non_refundable_row(ctx), manual_values)
+
+
+def non_refundable_request_parser(pdf_path, manual_values=None):
+    return build_non_refundable_row(ExtractionContext(pdf_path), manual_values)
+
+
+def sd_parser(pdf_path, manual_values=None):
+    return build_sd_row(ExtractionContext(pdf_path), manual_values)
@@ -0,0 +1,146 @@
+# MIDC Type 2 demand note parser.
+# Type 2 is the Division II (Mahape) permission letter for a route rather than a last-mile site: the same
+# itemised letter as Type 1 (permission fee per km, road reinstatement, lumpsum deposit, Total (1 to 3)),
+# with the outward number handwritten into "No.EE/Dn.II/MHP/Eoffice/I/ I110310 /of 2025".
+# Its rows differ from Type 1 in what they carry: each item's total including GST (the permission fee total
+# is "not part of capping", the reinstatement total "covered under capping", no separate GST), the DN
+# reference with its year, and DD payment to the Executive Engineer. Item splitting and amount labelling are
+# shared with Type 1.
+import re
+from .context import ExtractionContext
+from .mcgm import HEADERS
+from .midc_type1 import (
+    OCR_LANG, STATIC_VALUES as TYPE1_STATIC_VALUES,
+    document_text, extract_demand_note_date, extract_row_application_date, extract_section_length,
+    extract_ug_type, extract_road_types, extract_rates, split_items, labelled_amounts,
+)
+from .numbers import difference_days, sum_amounts
+from .rows import SD_HEADERS, apply_manual_values, debug_fields, row_from_values, sd_row
+
+# Same charge pages as Type 1
+ARTIFACTS = (f"ocr_text:{OCR_LANG}:1,2",)
+
+STATIC_VALUES = {
+    **TYPE1_STATIC_VALUES,
+    "LM/BB/FTTH": "BB",
+    "BENEFICIERY NAME": "Executive Engineer, MIDC, Division No.II, Mahape",
+    "Mode of payment(DD/ONLINE-URL/ONLINE-NEFT/BHARATKOSH": "DD",
+    "Payable (Authority) Location": "Mumbai",
+}
+
+# Printed part of the outward number; the number itself is handwritten in the gap, so OCR puts it either
+# inside the gap or on the line above
+REFERENCE_PREFIX = re.compile(
+    r"No\.?\s*/?\s*EE\s*/\s*Dn\.?\s*(?:II|2)\s*/\s*MHP\s*/\s*E-?\s*office\s*/\s*I\s*/", re.IGNORECASE
+)
+REFERENCE_NUMBER = re.compile(r"^\s*[A-Z|]?\s*(\d[\d\s]{3,}\d)\b", re.IGNORECASE)
+REFERENCE_YEAR = re.compile(r"/?\s*of\s*(20\d{2})", re.IGNORECASE)
+
+
+def _reference_number(value):
+    """'I110310' / 'I 110310.' -> '110310'. E-office numbers have 6 digits, so a 7-digit read that starts
+    with 1 is the handwritten series letter I taken for a 1."""
+    match = REFERENCE_NUMBER.search(value)
+    if not match:
+        return ""
+    number = re.sub(r"\s+", "", match.group(1))
+    return number[1:] if len(number) == 7 and number.startswith("1") else number
+
+
+def extract_demand_note_reference(text):
+    """'No.EE/Dn.II/MHP/Eoffice/I/ I110310 /of 2025' -> 'No.EE/Dn.II/MHP/Eoffice/I/110310/of 2025'."""
+    match = REFERENCE_PREFIX.search(text)
+    if not match:
+        return ""
+    rest = text[match.end():].split("\n", 1)[0]
+    number = _reference_number(rest)
+    if not number:
+        previous = text[:match.start()].rstrip("\n").rsplit("\n", 1)[-1]
+        number = _reference_number(previous)
+    year = REFERENCE_YEAR.search(rest)
+    reference = "No.EE/Dn.II/MHP/Eoffice/I/" + number
+    return reference + (f"/of {year.group(1)}" if year else "")
+
+
+def _item_total(amounts):
+    """Total of one charge item including GST: its 'Total' line, else the (rounded) amount plus GST."""
+    if amounts["total"]:
+        return amounts["total"]
+    # When OCR splits 'Say' from its amount, the rounded amount is the last unlabelled one
+    base = amounts["say"] or (amounts["items"][-1] if amounts["items"] else "")
+    return sum_amounts(base, amounts["gst"]) if base else ""
+
+
+def extract_charges(text):
+    """Permission fee and reinstatement totals (with GST), deposit (SD) and grand total from the numbered items."""
+    items = split_items(text)
+    fee = labelled_amounts(items.get(1, ""))
+    reinstatement = labelled_amounts(items.get(2, ""))
+    deposit = labelled_amounts(items.get(3, ""))
+    total = labelled_amounts(items.get(4, ""))
+    return {
+        "permission_fee": _item_total(fee),
+        "reinstatement": _item_total(reinstatement),
+        # The grand total can be read onto the deposit item's last line, so only its first amount is the deposit
+        "deposit": deposit["say"] or (deposit["items"][0] if deposit["items"] else deposit["total"]),
+        "total": total["say"] or (total["items"][0] if total["items"] else total["total"]),
+        "road_types": extract_road_types(items.get(2, "")),
+        "rates": extract_rates(items.get(2, "")),
+    }
+
+
+def _extract_non_refundable_row(ctx):
+    text = document_text(ctx)
+    ctx.debug_text("midc_type2_text", text)
+    charges = extract_charges(text)
+    not_part = charges["permission_fee"]
+    covered = charges["reinstatement"]
+    non_refundable = sum_amounts(covered, not_part) if (covered or not_part) else ""
+    section_length = extract_section_length(text)
+    dn_date = extract_demand_note_date(text)
+    values = {
+        "Demand Note Reference number": extract_demand_note_reference(text),
+        "UG TYPE( HDD/ OT/ MICROTRENCHING)": extract_ug_type(text),
+        "Road Types - CC/BT/TILES/ Normal Soil/kacha": charges["road_types"],
+        "GO RATE": charges["rates"],
+        "Rate/mtr- Current DN (UG/OH)": charges["rates"],
+        "Section Length (Mtr.)": section_length,
+        "Total Route (MTR)": section_length,
+        "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)": not_part,
+        "Covered under capping (Restoration Charges, admin, registration etc.)": covered,
+        "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": non_refundable,
+        "SD Amount": charges["deposit"],
+        "ROW APPLICATION  DATE": extract_row_application_date(text),
+        "Demand Note Date": dn_date,
+        "DN RECEIVED FROM PARTNER/AUTHORITY- DATE": dn_date,
+        "Difference from, DN date  - DN Sent to Central team (ARTL)": difference_days(dn_date),
+        "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team":
+            charges["total"] or (sum_amounts(non_refundable, charges["deposit"]) if non_refundable else ""),
+    }
+    row = row_from_values(values, STATIC_VALUES)
+    debug_fields(ctx, "midc_type2_fields", row)
+    return row
+
+
+def build_non_refundable_row(ctx, manual_values=None):
+    """Non-Refundable row; extraction runs once per context, manual values are applied to a copy."""
+    row = list(ctx.memo("midc_type2:non_refundable_row", lambda: _extract_non_refundable_row(ctx)))
+    return apply_manual_values(row, HEADERS, manual_values)
+
+
+def build_sd_row(ctx, manual_values=None):
+    return sd_row(build_non_refundable_row(ctx), "Mumbai", manual_values, work_codes="NA")
+
+
+def non_refundable_request_parser(pdf_path, manual_values=None):
+    return build_non_refundable_row(ExtractionContext(pdf_path), manual_values)
+
+
+def sd_parser(pdf_path, manual_values=None):
+    return build_sd_row(ExtractionContext(pdf_path), manual_values)
+
+
+__all__ = [
+    "HEADERS", "SD_HEADERS", "ARTIFACTS", "build_non_refundable_row", "build_sd_row",
+    "non_refundable_request_parser", "sd_parser",
+]
@@ -0,0 +1,265 @@
+# NMMC (Navi Mumbai Municipal Corporation) demand note parser.
+# NMMC DNs are scanned: a Marathi demand letter (outward no. "परि-2/266/2025", rate table, totals)
+# followed by an English GST invoice page with the charge breakup. A single PDF may carry several
+# DNs back to back; split_documents() finds the boundaries and the registry extracts each range in parallel.
+import os
+import re
+from datetime import datetime
+from .context import ExtractionContext
+from .mcgm import HEADERS
+from .numbers import amount_text, difference_days, sum_amounts
+from .rows import apply_manual_values, debug_fields, row_from_values, sd_row
+
+# Marathi is used when its traineddata is installed; amounts and dates OCR fine with English alone
+OCR_LANG = os.environ.get("NMMC_OCR_LANG", "eng+mar")
+
+# Artifacts the row builders read from the shared ExtractionContext
+ARTIFACTS = (f"ocr_text:{OCR_LANG}",)
+
+STATIC_VALUES = {
+    "Intercity/Intracity- Deployment Intercity/intracity- O&M FTTH- Deployment FTTH-O&M": "Intercity/Intracity - Deployment",
+    "BUSINESS UNIT": "TNL-FF-Maharashtra",
+    "Circle": "MUM",
+    "City": "MUM",
+    "Capping/Non Capping": "Non capping",
+    "Cost type with Cost Breakup EG.. - PROCESING FEES/ SUPERVISOIN CHARGE/ ADMIN FEES/ LICENSE FEES etc etc.": "Restoration Charges / Supervision Charges / Land Rent",
+    "Authority": "NAVI MUMBAI MUNICIPAL CORPORATION",
+    "BENEFICIERY NAME": "NAVI MUMBAI MUNICIPAL CORPORATION",
+    "Mode of payment(DD/ONLINE-URL/ONLINE-NEFT/BHARATKOSH": "DD",
+    "EXECUTION PARTNER NAME": "Excel Telesonic India Private Limited",
+    "Payable (Authority) Location": "Navi Mumbai",
+    "Printing Location": "Navi Mumbai",
+    "Cost type(restoration/ supervison/ agency changes/ admin etc)": "Restoration Charges",
+    "Cost type (way leave charges/ rent/ license etc)": "Land Rent",
+    "Permission Type (Primary/ Secondary)": "Primary",
+    "Type (UG/OH)": "UG",
+    "Locator Code (material)": "61027-IP01-2948564-CONT1210"
+}
+
+# Surface names as they appear in the Marathi rate table
+ROAD_TYPES = {
+    "डांबरी": "BT",
+    "डांबर": "BT",
+    "asphalt": "BT",
+    "काँक्रीट": "CC",
+    "कॉक्रीट": "CC",
+    "सिमेंट": "CC",
+    "concrete": "CC",
+    "पेव्हर": "TILES",
+    "paver": "TILES",
+    "कच्चा": "Normal Soil/kacha",
+    "माती": "Normal Soil/kacha",
+}
+
+NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+# Between an invoice label and its amount: skip the 99xxxx HSN/SAC code column
+LABEL_GAP = r"[^\d]{0,20}(?:99\d{4}\s+)?"
+
+# Outward number of the demand letter: "जा.क्र.नमुंमपा/परि-2/ 266 / 2025"
+DN_REFERENCE_PATTERNS = [
+    re.compile(r"परि\s*[-.]?\s*(\d)\s*/\s*(\d{2,5})\s*/\s*(20\d{2})"),
+    re.compile(r"(?:Zone|Z)\s*[-.]?\s*(\d)\s*/\s*(\d{2,5})\s*/\s*(20\d{2})", re.IGNORECASE),
+]
+LETTER_MARKERS = ("Tax Payer", "विषय", "खोदकाम", "पुनर्स्थापना", "NMMC GST NO")
+INVOICE_MARKER = re.compile(r"GST\s*INVOICE|Invoice\s*No", re.IGNORECASE)
+
+
+def _search_amount(patterns, text):
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            value = amount_text(match.group(1))
+            if value:
+                return value
+    return ""
+
+
+def is_invoice_page(page_text):
+    return bool(INVOICE_MARKER.search(page_text))
+
+
+def is_letter_page(page_text):
+    if is_invoice_page(page_text):
+        return False
+    return bool(extract_demand_note_reference(page_text)) or any(m in page_text for m in LETTER_MARKERS)
+
+
+def split_documents(ctx):
+    """
+    Split a PDF into per-DN page ranges. A demand letter page starts a new DN; invoice and annexure
+    pages belong to the DN before them. Returns sub-contexts (no pages are copied).
+    """
+    texts = ctx.ocr_page_texts(OCR_LANG)
+    starts = []
+    has_letter = has_invoice = False
+    for i, page_text in enumerate(texts):
+        letter = is_letter_page(page_text)
+        invoice = is_invoice_page(page_text)
+        if not starts or (letter and has_letter) or (invoice and has_invoice and not letter):
+            starts.append(i)
+            has_letter = has_invoice = False
+        has_letter = has_letter or letter
+        has_invoice = has_invoice or invoice
+    if len(starts) <= 1:
+        return [ctx]
+    bounds = starts + [len(texts)]
+    print(f"[DEBUG] [nmmc] Split {ctx.pdf_path} into page ranges: {list(zip(bounds, bounds[1:]))}")
+    return [ctx.subrange(a, b) for a, b in zip(bounds, bounds[1:])]
+
+
+def extract_demand_note_reference(text):
+    """'परि-2/266/2025' -> 'NMMCZ-22662025' (same form as the NMMC file names)."""
+    for pattern in DN_REFERENCE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            zone, number, year = match.groups()
+            return f"NMMCZ-{zone}{number}{year}"
+    return ""
+
+
+def extract_invoice_number(text):
+    match = re.search(r"Invoice\s*No\.?\s*[:\-]?\s*([A-Z]{2,}[\w\-]*\d)", text, re.IGNORECASE)
+    return match.group(1).strip() if match else ""
+
+
+def extract_demand_note_date(letter_text, invoice_text=""):
+    """Letter date ('दि. 18/03/2025'), else the invoice date ('17.03.2025'), as dd/mm/yyyy."""
+    for text in (letter_text, invoice_text):
+        match = re.search(r"(\d{1,2})\s*[/.\-]\s*(\d{1,2})\s*[/.\-]\s*(20\d{2})", text or "")
+        if match:
+            day, month, year = match.groups()
+            try:
+                return datetime(int(year), int(month), int(day)).strftime("%d/%m/%Y")
+            except ValueError:
+                continue
+    return ""
+
+
+def extract_section_length(text):
+    """Trench length from the letter body ('... टाकण्यासाठी 825.00 मी.'), else the ground-rent line."""
+    return _search_amount([
+        r"टाकण्यासाठी\s*" + NUMBER,
+        r"प्रमाणे\s*" + NUMBER + r"\s*चौ",
+        NUMBER + r"\s*(?:Mtrs?|mtr)\b",
+    ], text)
+
+
+def extract_rate(text):
+    """Rate per metre from the rate table ('रु 9600/-')."""
+    rates = []
+    for match in re.finditer(r"(?:रु|Rs\.?|₹)\s*\.?\s*" + NUMBER + r"\s*/-", text):
+        rate = amount_text(match.group(1))
+        if rate and rate not in rates:
+            rates.append(rate)
+    return " / ".join(rates)
+
+
+def extract_hdd_pits(text):
+    match = re.search(r"(?:पीट|pits?)\s*[-:]?\s*(\d+)", text, re.IGNORECASE)
+    return match.group(1) if match else ""
+
+
+def extract_ug_type(text):
+    types = []
+    if re.search(r"\bHDD\b", text):
+        types.append("HDD")
+    if re.search(r"ओपन\s*ट्रे|open\s*trench", text, re.IGNORECASE):
+        types.append("OT")
+    return " / ".join(types) or "OT"
+
+
+def extract_road_types(text):
+    found = []
+    lowered = text.lower()
+    for name, road_type in ROAD_TYPES.items():
+        if name.lower() in lowered and road_type not in found:
+            found.append(road_type)
+    return " / ".join(found)
+
+
+def extract_charges(letter_text, invoice_text):
+    """
+    Charge breakup. The English invoice page is preferred; the Marathi totals on the letter are the fallback.
+    Returns a dict with restoration, supervision, security_deposit, land_rent and total (strings, '' if missing).
+    """
+    invoice = {
+        "restoration": _search_amount([r"Reinstall\w*(?:\s*on)?" + LABEL_GAP + NUMBER], invoice_text),
+        "supervision": _search_amount([r"Supervision" + LABEL_GAP + NUMBER], invoice_text),
+        "security_deposit": _search_amount([r"Security\s*Deposit" + LABEL_GAP + NUMBER, r"Security" + LABEL_GAP + NUMBER], invoice_text),
+        "land_rent": _search_amount([r"Land\s*Rent" + LABEL_GAP + NUMBER], invoice_text),
+        "total": _search_amount([r"Invoice\s*Value[^\d]{0,20}" + NUMBER, r"Gross\s*Value[^\d]{0,20}" + NUMBER], invoice_text),
+    }
+    letter = {
+        "restoration": _search_amount([r"पुनर्स्थापना\s*शुल्क\s*एकुण\s*" + NUMBER], letter_text),
+        "supervision": _search_amount([r"पर्यवेक्षण\s*शुल्क\s*\d+\s*%\s*" + NUMBER], letter_text),
+        "security_deposit": _search_amount([r"अनामत\s*रक्कम\s*\d+\s*%\s*" + NUMBER], letter_text),
+        "land_rent": _search_amount([r"करीता\s*" + NUMBER], letter_text),
+        "total": _search_amount([r"एकुण\s*रक्कम\s*[=:]?\s*(?:रु\.?)?\s*" + NUMBER], letter_text),
+    }
+    return {key: invoice[key] or letter[key] for key in invoice}
+
+
+def _document_texts(ctx):
+    """(letter_text, invoice_text) of one DN range."""
+    texts = ctx.ocr_page_texts(OCR_LANG)
+    invoice_text = "\n".join(t for t in texts if is_invoice_page(t))
+    letter_text = "\n".join(t for t in texts if not is_invoice_page(t))
+    return letter_text, invoice_text
+
+
+def _extract_non_refundable_row(ctx):
+    letter_text, invoice_text = _document_texts(ctx)
+    ctx.debug_text("nmmc_text", f"--- LETTER ---\n{letter_text}\n--- INVOICE ---\n{invoice_text}")
+    text = letter_text + "\n" + invoice_text
+    charges = extract_charges(letter_text, invoice_text)
+    demand_note_ref = extract_demand_note_reference(letter_text) or extract_invoice_number(invoice_text)
+    demand_note_date = extract_demand_note_date(letter_text, invoice_text)
+    section_length = extract_section_length(letter_text)
+    covered_under_capping = sum_amounts(charges["restoration"], charges["supervision"]) if (charges["restoration"] or charges["supervision"]) else ""
+    not_part_of_capping = charges["land_rent"]
+    non_refundable_cost = sum_amounts(covered_under_capping, not_part_of_capping) if (covered_under_capping or not_part_of_capping) else ""
+    gst_amount = "0"  # GST is payable by the recipient under reverse charge (invoice shows 0)
+    values = {
+        "Demand Note Reference number": demand_note_ref,
+        "UG TYPE( HDD/ OT/ MICROTRENCHING)": extract_ug_type(text),
+        "Road Types - CC/BT/TILES/ Normal Soil/kacha": extract_road_types(letter_text),
+        "HDD - Number of Pits": extract_hdd_pits(letter_text),
+        "Rate/mtr- Current DN (UG/OH)": extract_rate(letter_text),
+        "Section Length (Mtr.)": section_length,
+        "Total Route (MTR)": section_length,
+        "Annual Lease/ rent amount": not_part_of_capping,
+        "Not part of capping (License Fee/Rental Payment /Way Leave charges etc.)": not_part_of_capping,
+        "Covered under capping (Restoration Charges, admin, registration etc.)": covered_under_capping,
+        "Non Refundable Cost( Amount to process for payment shold be sum of 'Z' and 'AA' coulm )": non_refundable_cost,
+        "GST Amount": gst_amount,
+        "SD Amount": charges["security_deposit"],
+        "Demand Note Date": demand_note_date,
+        "DN RECEIVED FROM PARTNER/AUTHORITY- DATE": demand_note_date,
+        "Difference from, DN date  - DN Sent to Central team (ARTL)": difference_days(demand_note_date),
+        "Total DN Amount ( NON REFUNDABLE+SD+ BG+ GST) To be filled by helpdesk team": charges["total"] or sum_amounts(non_refundable_cost, charges["security_deposit"], gst_amount),
+        "Total Amount as per capping MB(Partner Scope)": covered_under_capping,
+        "Total Amount as per capping MB(Not in Partner Scope)": not_part_of_capping,
+    }
+    row = row_from_values(values, STATIC_VALUES)
+    debug_fields(ctx, "nmmc_fields", row)
+    return row
+
+
+def build_non_refundable_row(ctx, manual_values=None):
+    """Non-Refundable row for one DN range; extraction runs once per context, manual values go on a copy."""
+    row = list(ctx.memo("nmmc:non_refundable_row", lambda: _extract_non_refundable_row(ctx)))
+    return apply_manual_values(row, HEADERS, manual_values)
+
+
+def build_sd_row(ctx, manual_values=None):
+    """SD row for one DN range, in the MCGM SD layout."""
+    return sd_row(build_non_refundable_row(ctx), "Navi Mumbai", manual_values)
+
+
+def non_refundable_request_parser(pdf_path, manual_values=None):
+    """First DN of the file; use registry.parse_documents to get every DN in a combined PDF."""
+    return build_non_refundable_row(split_documents(ExtractionContext(pdf_path))[0], manual_values)
+
+
+def sd_parser(pdf_path, manual_values=None):
+    return build_sd_row(split_documents(ExtractionContext(pdf_path))[0], manual_values)
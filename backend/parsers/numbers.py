@@ -0,0 +1,71 @@
+# Shared parsing of the figures found in demand notes and in their OCR: Indian digit grouping
+# ("1,23,456.00"), international grouping, "Rs." / "₹" / "रु." prefixes, "/-" suffixes and Devanagari digits.
+# amount_text / sum_amounts give the string form the DN rows hold ('236203', '1532256.37', '' when unknown).
+import re
+from datetime import datetime
+
+DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+# 1,23,45,678 (Indian), 12,345,678 (international) or 12345678, with optional decimals
+GROUPED_NUMBER = re.compile(r"^(?:\d{1,3}(?:,\d{2})*,\d{3}|\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?$")
+CURRENCY_PREFIX = re.compile(r"^(?:Rs\.?|INR|₹|रु\.?)\s*", re.IGNORECASE)
+# First figure inside a longer string (an OCR cell, a label with its value)
+NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def ascii_digits(text):
+    """Devanagari digits replaced by ASCII ones."""
+    return (text or "").translate(DEVANAGARI_DIGITS)
+
+
+def parse_amount(text):
+    """
+    Value of a string holding exactly one figure ('1,23,456.00', 'Rs. 24,800/-', '१५,३२,२५६'),
+    None for anything else, including badly grouped figures like '12,34,5' (usually an OCR misread).
+    """
+    if text is None:
+        return None
+    value = CURRENCY_PREFIX.sub("", ascii_digits(str(text)).strip())
+    value = re.sub(r"\s*/-?$", "", value).strip().rstrip(".,")
+    if not GROUPED_NUMBER.match(value):
+        return None
+    return float(value.replace(",", ""))
+
+
+def format_amount(number):
+    """'1215200' for whole numbers, '1215200.5' otherwise, '' for None."""
+    if number is None:
+        return ""
+    return str(int(number)) if float(number).is_integer() else str(round(number, 2))
+
+
+def amount_text(value):
+    """
+    Row form of the figure in value: '6,24,000.00' -> '624000', 'रु. १५,३२,२५६.३७ /-' -> '1532256.37'.
+    When value is not a figure by itself, its first figure is used; '' when it has none or it is badly grouped.
+    """
+    number = parse_amount(value)
+    if number is None:
+        match = NUMBER.search(ascii_digits(str(value or "")))
+        number = parse_amount(match.group(0)) if match else None
+    return format_amount(number)
+
+
+def sum_amounts(*values):
+    """Sum of row amounts as a row amount; empty and non-numeric values count as 0."""
+    total = 0.0
+    for value in values:
+        try:
+            total += float(value or 0)
+        except ValueError:
+            continue
+    return format_amount(total)
+
+
+def difference_days(received_date):
+    """Days from a 'dd/mm/yyyy' date to today, '' when there is no valid date."""
+    if not received_date:
+        return ""
+    try:
+        return str((datetime.today() - datetime.strptime(received_date, "%d/%m/%Y")).days)
+    except ValueError:
+        return ""
@@ -0,0 +1,103 @@
+# Per-page classification of demand-note PDFs, run before any table detection or OCR.
+# Each page gets one or more tags from cheap features: text-layer keywords, amount density, vector
+# ruling (drawing count) and image coverage. Pages without a text layer only get a low-DPI raster
+# check for ruled tables, everything else about them is UNKNOWN, and UNKNOWN pages are never skipped.
+# Extractors then ask the context for e.g. the charges-table pages instead of "all".
+import re
+
+COVER_LETTER = "cover_letter"
+CHARGES_TABLE = "charges_table"
+TERMS = "terms"
+ANNEXURE = "annexure"
+UNKNOWN = "unknown"
+
+# Render DPI for the raster check on scanned pages (only ruling lines need to survive)
+RASTER_DPI = 40
+MIN_TEXT_CHARS = 20
+
+COVER_WORDS = (
+    r"\bSub\s*[:.\-]", r"\bRef\s*[:.\-]", r"\bTo,", r"Dear Sir", r"\bDEMAND NOTE\b", r"Your letter",
+    r"विषय", r"संदर्भ", r"प्रति,", r"मागणीपत्र",
+)
+CHARGES_WORDS = (
+    r"\bTotal\b", r"\bGST\b", r"\bRate\b", r"\bAmount\b", r"Deposit", r"Charges", r"Ground Rent",
+    r"Reinstatement", r"एकूण", r"रक्कम", r"दर", r"शुल्क",
+)
+TERMS_WORDS = (
+    r"terms\s*(?:&|and)\s*conditions", r"\bconditions\b", r"\bshall\b", r"\bresponsib", r"\bundertak",
+    r"\bNote\s*:", r"in favou?r of", r"\bto submit\b",
+    r"अटी\s*व\s*शर्ती", r"बंधनकारक", r"जबाबदारी",
+)
+ANNEXURE_WORDS = (r"\bAnnexure\b", r"\bDrawing\b", r"\bSketch\b", r"\bKey\s*Plan\b", r"\bMap\b", r"परिशिष्ट", r"नकाशा")
+AMOUNT = re.compile(r"(?:Rs\.?|₹|रु\.?)\s*\d|\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+\.\d{2}\b")
+# Bare table figures ("1190400"), common in ruled charge tables without currency marks
+FIGURE = re.compile(r"(?<![\d/.\-])\d{4,}(?![\d/.\-])")
+CLAUSE = re.compile(r"^\s*(?:\d{1,2}|[ivx]{1,4}|[१-९][०-९]?)\s*[).]\s+\S", re.MULTILINE)
+
+
+def _hits(patterns, text):
+    return sum(1 for p in patterns if re.search(p, text, re.IGNORECASE))
+
+
+def classify_text(text, drawings=0, image_coverage=0.0):
+    """Tags for a page with a text layer."""
+    amounts = len(AMOUNT.findall(text))
+    figures = len(FIGURE.findall(text))
+    clauses = len(CLAUSE.findall(text))
+    cover = _hits(COVER_WORDS, text)
+    charges = _hits(CHARGES_WORDS, text)
+    terms = _hits(TERMS_WORDS, text)
+    annexure = _hits(ANNEXURE_WORDS, text)
+    tags = []
+    if cover >= 2:
+        tags.append(COVER_LETTER)
+    if charges >= 2 and (amounts >= 3 or figures >= 4 or drawings >= 20):
+        tags.append(CHARGES_TABLE)
+    if (terms >= 2 or clauses >= 5) and amounts < max(3, clauses):
+        tags.append(TERMS)
+    if annexure and not tags:
+        tags.append(ANNEXURE)
+    if not tags and image_coverage > 0.5 and len(text.strip()) < 200:
+        tags.append(ANNEXURE)
+    return tuple(tags) or (UNKNOWN,)
+
+
+def has_ruled_table(page):
+    """Low-DPI raster check: at least four long dark horizontal rules and two vertical ones."""
+    import fitz
+    import numpy as np
+    pix = page.get_pixmap(dpi=RASTER_DPI, colorspace=fitz.csGRAY)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    dark = img < min(128, int(img.mean()) - 40)
+    rows = dark.mean(axis=1) > 0.45
+    cols = dark.mean(axis=0) > 0.25
+    # Count runs, not pixels, so a thick rule counts once
+    row_rules = int(np.count_nonzero(rows[1:] & ~rows[:-1]) + rows[0])
+    col_rules = int(np.count_nonzero(cols[1:] & ~cols[:-1]) + cols[0])
+    return row_rules >= 4 and col_rules >= 2
+
+
+def classify_page(page, text=None):
+    """Tags for one PyMuPDF page (text may be passed in when it is already extracted)."""
+    text = page.get_text() if text is None else text
+    if len(text.strip()) < MIN_TEXT_CHARS:
+        try:
+            return (CHARGES_TABLE,) if has_ruled_table(page) else (UNKNOWN,)
+        except Exception as e:
+            print(f"[ERROR] [pages] Raster check failed on page {page.number + 1}: {e}")
+            return (UNKNOWN,)
+    area = abs(page.rect) or 1.0
+    image_coverage = sum(abs(page.get_image_bbox(img)) for img in page.get_images(full=True)
+                         if not page.get_image_bbox(img).is_infinite) / area
+    drawings = len(page.get_drawings()) if len(text) < 20000 else 0
+    return classify_text(text, drawings, image_coverage)
+
+
+def classify_document(pdf_path, page_texts=None):
+    """Tags for every page of a PDF, in page order."""
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return [
+            classify_page(page, page_texts[i] if page_texts is not None else None)
+            for i, page in enumerate(doc)
+        ]
@@ -0,0 +1,153 @@
+# Purchase order PDFs ("PO_4009_<po number>_<rev>_US.pdf" in the site and route folders): PO number,
+# revision, date and value from the header, and one line item per site / route with its quantity (metres),
+# unit price, line total and taxes. Everything comes from the text layer; the continuation-sheet header
+# repeated on every page is cut out first so that line items spanning a page break read as one block.
+# po_master_rows turns parsed POs into po_master rows (route_id_site_id + the PO number and length columns).
+import re
+
+from parsers.context import ExtractionContext
+from parsers.numbers import parse_amount
+
+PAGE_HEADER = re.compile(r"Purchase Order Continuation Sheet.*?Regd Office:[^\n]*\n", re.DOTALL)
+# " 3\nB0STDDSS1  -   Trenching and ..." starts a line item
+LINE_START = re.compile(r"^[ \t]*(\d+)[ \t]*\n(?=[A-Z0-9]+[ \t]+-[ \t]+)", re.MULTILINE)
+DATES = r"(\d{2}-[A-Z]{3}-\s*\d{2})"
+LINE_FIGURES = re.compile(
+    DATES + r"\s*\(" + DATES + r"\)\s*\n\s*([\d.,]+)\s*\n\s*([A-Za-z]+)\s*\n\s*([\d.,]+)\s*\n\s*([\d.,]+)"
+)
+TAX = re.compile(r"^([A-Z]+)_(\d+(?:\.\d+)?)%[^\n]*\n\s*([\d.,]+)", re.MULTILINE)
+# Route IDs are written as paths with a note after them ("MUM/Route/90 IP1", "MUM/Route/166 Vashi DC")
+ROUTE_ID = re.compile(r"^(\S+/\S+)(?:\s+(.*))?$")
+COBUILD = re.compile(r"co-?\s*buil", re.IGNORECASE)
+IP1 = re.compile(r"\bIP\s*1\b", re.IGNORECASE)
+METRE_UOMS = ("meter", "metre", "mtr", "m")
+
+
+def _value(pattern, text):
+    match = re.search(pattern, text)
+    return match.group(1).strip() if match else ""
+
+
+def _date(value):
+    return re.sub(r"\s+", "", value)
+
+
+def extract_header(text):
+    reference = _value(r"PO No\.\s*\n:\n([^\n]+)", text)
+    return {
+        "PO No": _value(r"(\d+)$", reference),
+        "PO Reference": reference,
+        "Revision": _value(r"Rev No\.\s*\n:\n(\d+)", text),
+        "PO Date": _value(r"PO Date\s*\n:\n([^\n]+)", text),
+        "Partner": _value(r"Partner Name:\s*([^\n]+)", text),
+        "Total PO Value": parse_amount(_value(r"Total Purchase Order Value\s*:\s*([\d.,]+)", text)),
+    }
+
+
+def extract_line(block):
+    """One line item block (from its item code to before the next item), None if its figures are missing."""
+    head, _, rest = block.partition("Chapter Heading:")
+    lines = [l.strip() for l in head.splitlines() if l.strip()]
+    figures = LINE_FIGURES.search(rest)
+    if len(lines) < 2 or not figures:
+        return None
+    item_code, _, first = lines[0].partition("-")
+    need_by, end_date, qty, uom, unit_price, line_total = figures.groups()
+    return {
+        "Item Code": item_code.strip(),
+        "Description": " ".join([first.strip()] + lines[1:-1]),
+        # The line after the description names the site / route the line is for
+        "SiteID": lines[-1],
+        "Need By": _date(need_by),
+        "Activity End Date": _date(end_date),
+        "Qty": parse_amount(qty),
+        "UOM": uom,
+        "Unit Price": parse_amount(unit_price),
+        "Line Total": parse_amount(line_total),
+        "Taxes": {f"{name} {rate}%": parse_amount(amount) for name, rate, amount in TAX.findall(rest)},
+        "Total Line Value": parse_amount(_value(r"Total Line Value\s*\n\s*([\d.,]+)", rest)),
+    }
+
+
+def extract_lines(text):
+    body = PAGE_HEADER.sub("", text)
+    start = body.find("Line Total")
+    end = body.find("Total PO Value:", start)
+    body = body[start:end if end != -1 else len(body)]
+    starts = list(LINE_START.finditer(body))
+    lines = []
+    for i, match in enumerate(starts):
+        stop = starts[i + 1].start() if i + 1 < len(starts) else len(body)
+        line = extract_line(body[match.end():stop])
+        if line is not None:
+            lines.append({"S.No": int(match.group(1)), **line})
+    return lines
+
+
+def po_document_parser(pdf_path, ctx=None):
+    """Header fields of a PO PDF plus its line items under "Lines"."""
+    ctx = ctx or ExtractionContext(pdf_path)
+    text = ctx.text
+    return {**extract_header(text), "Lines": extract_lines(text)}
+
+
+def site_id_and_kind(line):
+    """
+    po_master key and column kind ("cobuild" / "ip1") of a line item. Route IDs are keyed like po_master
+    ("MUM/Route/90 IP1" -> "MUM_Route_90"), and a Cobuilt / IP1 note after the ID picks the kind; without one
+    the description decides.
+    """
+    site_id = " ".join(line["SiteID"].split())
+    note = ""
+    match = ROUTE_ID.match(site_id)
+    if match:
+        site_id, note = match.group(1).replace("/", "_"), match.group(2) or ""
+    if COBUILD.search(note):
+        return site_id, "cobuild"
+    if IP1.search(note):
+        return site_id, "ip1"
+    return site_id, "cobuild" if COBUILD.search(line.get("Description", "")) else "ip1"
+
+
+def is_per_site(line):
+    """A lump sum for the whole site (one unit at the unit price) rather than a price per metre."""
+    qty = line.get("Qty") or 0.0
+    return qty <= 1 and line.get("Line Total") == line.get("Unit Price")
+
+
+def po_master_rows(documents):
+    """
+    po_master rows (route_id_site_id, PO number and length) from parsed POs, one per site / route.
+    Co-Built lines fill the *_cobuild columns, IP1 lines the *_ip1 ones, so the two POs of a route land in one
+    row. PO length is the line quantity in metres, summed when a PO has several lines for the same site;
+    per-site lump sums are not lengths, so a site with only those gets the PO number but no length. When several
+    POs name a site for the same columns, the latest revision of the highest PO number wins. Columns the PDFs
+    do not carry (route_type, uid, parent_route) are left out, so an upsert keeps what po_master already holds
+    for them.
+    """
+    rows = {}
+    ordered = sorted(documents, key=lambda d: (int(d.get("PO No") or 0), int(d.get("Revision") or 0)))
+    for doc in ordered:
+        per_site = {}
+        for line in doc.get("Lines", []):
+            if (line.get("UOM") or "").lower() not in METRE_UOMS:
+                continue
+            key, kind = site_id_and_kind(line)
+            row = per_site.setdefault(key, {"route_id_site_id": key})
+            row[f"po_no_{kind}"] = doc["PO No"]
+            if not is_per_site(line):
+                row[f"po_length_{kind}"] = row.get(f"po_length_{kind}", 0.0) + (line.get("Qty") or 0.0)
+        for key, row in per_site.items():
+            merged = rows.setdefault(key, {})
+            for kind in ("cobuild", "ip1"):
+                # A newer PO for these columns replaces the older one's length too, even when it has none
+                if f"po_no_{kind}" in row:
+                    merged.pop(f"po_length_{kind}", None)
+            merged.update(row)
+    return list(rows.values())
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    print(json.dumps(po_document_parser(sys.argv[1]), indent=2))
@@ -0,0 +1,133 @@
+# Authority -> parser module registry.
+# Parser modules pull in camelot, cv2, pytesseract and pdf2image at import time, so they are
+# only imported the first time an authority is actually used (or by the warm-up hook).
+#
+# A parser module declares:
+#   ARTIFACTS                                  artifact specs it reads (see parsers/context.py)
+#   HEADERS                                    Non-Refundable column order
+#   build_non_refundable_row(ctx, manual_values=None) -> row
+#   build_sd_row(ctx, manual_values=None) -> (sd_headers, sd_row)   (optional)
+#   split_documents(ctx) -> [sub-contexts]    (optional, for PDFs carrying several demand notes)
+#   FIELDS = {header: Field(artifacts, extract)}  (optional, per-field extractors, see parsers/fields.py)
+# Both builders read from one shared ExtractionContext, so each artifact is computed once per document.
+import importlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .context import ExtractionContext
+from . import fields as field_extraction
+
+PARSER_MODULES = {
+    "MCGM": "parsers.mcgm",
+    "MBMC": "parsers.mbmc",
+    "NMMC": "parsers.nmmc",
+    "KDMC": "parsers.kdmc",
+    "MIDCTYPE1": "parsers.midc_type1",
+    "MIDCTYPE2": "parsers.midc_type2",
+}
+
+# Column layout shared by the authority parsers (MBMC reuses the MCGM headers)
+HEADERS_AUTHORITY = "MCGM"
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def normalize_authority(authority):
+    """'midc-type1', 'MIDC Type 1' and 'MIDC_TYPE1' all map to 'MIDCTYPE1'."""
+    return re.sub(r"[^A-Z0-9]", "", (authority or "").upper())
+
+
+def register_parser(authority, module_path):
+    """Register (or replace) the parser module for an authority without importing it."""
+    key = normalize_authority(authority)
+    with _lock:
+        PARSER_MODULES[key] = module_path
+        _loaded.pop(key, None)
+
+
+def registered_authorities():
+    return list(PARSER_MODULES)
+
+
+def is_supported(authority):
+    return normalize_authority(authority) in PARSER_MODULES
+
+
+def get_parser(authority):
+    """Import (once) and return the parser module for an authority. Raises ValueError for unknown authorities."""
+    key = normalize_authority(authority)
+    module = _loaded.get(key)
+    if module is not None:
+        return module
+    if key not in PARSER_MODULES:
+        raise ValueError(f"Unsupported authority: {authority}")
+    with _lock:
+        module = _loaded.get(key)
+        if module is None:
+            module = importlib.import_module(PARSER_MODULES[key])
+            _loaded[key] = module
+    return module
+
+
+def get_headers(authority=None):
+    return get_parser(authority if is_supported(authority) else HEADERS_AUTHORITY).HEADERS
+
+
+def loaded_authorities():
+    return list(_loaded)
+
+
+def parse_document(pdf_path, authority, manual_values=None, sd_manual_values=None, sd=True, ctx=None, debug=None):
+    """
+    Run an authority's row builders over one shared ExtractionContext.
+    Returns (headers, row, sd_headers, sd_row); sd_headers/sd_row are None when sd=False
+    or the authority has no SD builder. debug is an optional debug_artifacts.DebugStore.
+    """
+    parser = get_parser(authority)
+    ctx = ctx or ExtractionContext(pdf_path, debug=debug)
+    ctx.prepare(getattr(parser, "ARTIFACTS", ()))
+    row = parser.build_non_refundable_row(ctx, manual_values)
+    sd_headers = sd_row = None
+    if sd and hasattr(parser, "build_sd_row"):
+        sd_headers, sd_row = parser.build_sd_row(ctx, sd_manual_values)
+    return parser.HEADERS, row, sd_headers, sd_row
+
+
+def parse_documents(pdf_path, authority, manual_values=None, sd_manual_values=None, sd=True, max_workers=4, debug=None):
+    """
+    Like parse_document, but for PDFs that may carry several demand notes.
+    Authorities with split_documents(ctx) get one result per demand note, extracted in parallel;
+    everyone else gets a single-item list.
+    """
+    parser = get_parser(authority)
+    ctx = ExtractionContext(pdf_path, debug=debug)
+    parts = parser.split_documents(ctx) if hasattr(parser, "split_documents") else [ctx]
+    if len(parts) <= 1:
+        return [parse_document(pdf_path, authority, manual_values, sd_manual_values, sd=sd, ctx=parts[0] if parts else ctx)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(parts))) as executor:
+        return list(executor.map(
+            lambda part: parse_document(pdf_path, authority, manual_values, sd_manual_values, sd=sd, ctx=part),
+            parts
+        ))
+
+
+def extract_fields(pdf_path, authority, fields, manual_values=None, ctx=None, debug=None):
+    """
+    Only the requested Non-Refundable fields ({name: value}, aliases such as "dn_number" or full headers).
+    Only the artifacts those fields depend on are computed; see parsers/fields.py.
+    """
+    parser = get_parser(authority)
+    return field_extraction.extract_fields(parser, ctx or ExtractionContext(pdf_path, debug=debug), fields, manual_values)
+
+
+def extract_fields_documents(pdf_path, authority, fields, manual_values=None, max_workers=4, debug=None):
+    """extract_fields for every demand note in the PDF (see parse_documents)."""
+    parser = get_parser(authority)
+    ctx = ExtractionContext(pdf_path, debug=debug)
+    parts = parser.split_documents(ctx) if hasattr(parser, "split_documents") else [ctx]
+    if len(parts) <= 1:
+        return [field_extraction.extract_fields(parser, parts[0] if parts else ctx, fields, manual_values)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(parts))) as executor:
+        return list(executor.map(lambda part: field_extraction.extract_fields(parser, part, fields, manual_values), parts))
@@ -0,0 +1,64 @@
+# Row assembly shared by the DN parsers that fill the MCGM layouts (NMMC, KDMC, MIDC): the Non-Refundable row
+# from extracted values under the authority's static values, manual values from the UI applied on top, and
+# the SD row derived from a Non-Refundable row.
+from .mcgm import HEADERS
+
+SD_HEADERS = [
+    "SD OU Circle Name", "Execution Partner Vendor Code", "Execution Partner Vendor Name", "Execution Partner GBPA PO No.",
+    "GIS Code", "M6 Code", "Locator ID", "Mother Work Order", "Child Work Order", "FA Location", "Partner PO circle",
+    "Unique route id", "Supplier Code", "Supplier site name", "NFA no.", "Payment type", "DN No", "DN Date", "SD Amount", "SD Time Period"
+]
+
+PAYMENT_MODE = "Mode of payment(DD/ONLINE-URL/ONLINE-NEFT/BHARATKOSH"
+
+
+def row_from_values(values, static_values, headers=HEADERS):
+    """Row in headers order; a static value wins over an extracted one."""
+    return [static_values.get(header, values.get(header, "")) for header in headers]
+
+
+def apply_manual_values(row, headers, manual_values):
+    if manual_values:
+        for field, value in manual_values.items():
+            if field in headers:
+                row[headers.index(field)] = value
+    return row
+
+
+def sd_row(row_main, fa_location, manual_values=None, work_codes=""):
+    """
+    (SD_HEADERS, SD row) from a Non-Refundable row. The payment type is the row's mode of payment, so the two
+    sheets always agree; work_codes fills GIS / M6 / Mother / Child work order ("" leaves them to the user).
+    """
+    def get_main(header):
+        return row_main[HEADERS.index(header)]
+
+    row = [
+        "TNL-FF-Maharashtra",                      # SD OU Circle Name
+        "632607",                                  # Execution Partner Vendor Code
+        "Excel Telesonic India Private Limited",   # Execution Partner Vendor Name
+        "",                                        # Execution Partner GBPA PO No. (manual)
+        work_codes,                                # GIS Code
+        work_codes,                                # M6 Code
+        "61027-IP01-2948564-CONT1210",             # Locator ID
+        work_codes,                                # Mother Work Order
+        work_codes,                                # Child Work Order
+        fa_location,                               # FA Location
+        "",                                        # Partner PO circle (manual)
+        "",                                        # Unique route id (manual)
+        "",                                        # Supplier Code (manual)
+        "",                                        # Supplier site name (manual)
+        "",                                        # NFA no. (manual)
+        get_main(PAYMENT_MODE),                    # Payment type
+        get_main("Demand Note Reference number"),  # DN No
+        get_main("Demand Note Date"),              # DN Date
+        get_main("SD Amount"),                     # SD Amount
+        "2 Years"                                  # SD Time Period
+    ]
+    return list(SD_HEADERS), apply_manual_values(row, SD_HEADERS, manual_values)
+
+
+def debug_fields(ctx, name, row, headers=HEADERS):
+    """Extracted row as 'header: value' lines in the request's debug store (only when debugging)."""
+    if ctx.debug is not None:
+        ctx.debug_text(name, "\n".join(f"{h}: {v}" for h, v in zip(headers, row)))
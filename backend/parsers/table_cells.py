@@ -0,0 +1,235 @@
+# Cell text for table grids detected on a rendered page: text layer first, OCR only where it is missing.
+# Each detected cell box (pixels of the render) is mapped back to PDF points and filled with the PyMuPDF
+# words whose centre falls inside it. A cell goes to Tesseract only when that text is empty or garbled
+# (see text_quality) and the cell actually has ink in the render; blank cells are left empty. For
+# born-digital demand notes this means no OCR at all, while scanned pages still get every cell OCR'd.
+#
+# Two resolutions: the grid is detected on a cheap GRID_DPI render, and only the cells that need OCR
+# are re-rendered from the PDF (PyMuPDF clip) at CELL_OCR_DPI, so small digits get the pixels.
+#
+# Authorities with a known table layout pass a TableProfile: per column, the Tesseract page segmentation
+# mode, character whitelist, language and preprocessing, and for text columns an optional vocabulary the
+# OCR is snapped to. Profiles apply to body cells only (rows after header_rows, cells that span a
+# single row and column); header and merged cells are read with the generic profile.
+#
+# OCR'd cells carry a confidence (lowest Tesseract word confidence in the cell; text-layer and blank
+# cells are 100). Numeric cells that come back below OCR_MIN_CONFIDENCE, or that do not parse as a
+# number, are OCR'd once more on their own with the numeric profile at RETRY_DPI.
+import difflib
+import os
+import unicodedata
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .context import OCR_WORKERS, available_ocr_lang
+from .numbers import parse_amount
+
+ColumnProfile = namedtuple("ColumnProfile", ["psm", "whitelist", "lang", "preprocess", "vocabulary", "numeric"])
+TableProfile = namedtuple("TableProfile", ["columns", "header_rows"])
+
+# Anything without a profile: block of text, full character set
+GENERIC = ColumnProfile(psm=6, whitelist="", lang="eng", preprocess=None, vocabulary=(), numeric=False)
+# Figures: one line, digits and separators only, binarized crop
+NUMERIC = ColumnProfile(psm=7, whitelist="0123456789.,", lang="eng", preprocess="binarize", vocabulary=(), numeric=True)
+
+# Render DPI for line / grid detection (ruling lines survive fine at low resolution)
+GRID_DPI = int(os.environ.get("TRENCH_GRID_DPI", "100"))
+# Render DPI of the cell crops sent to Tesseract
+CELL_OCR_DPI = int(os.environ.get("TRENCH_CELL_OCR_DPI", "300"))
+# Padding (PDF points) added around a cell before rendering its crop
+CELL_PAD_PT = 1.0
+# Render DPI of the second, digits-only pass over doubtful numeric cells
+RETRY_DPI = int(os.environ.get("TRENCH_CELL_RETRY_DPI", "450"))
+# Cells OCR'd with a lower confidence (0-100) than this are doubtful
+OCR_MIN_CONFIDENCE = float(os.environ.get("TRENCH_OCR_MIN_CONFIDENCE", "70"))
+# Minimum similarity (0-1) for snapping OCR text to a column vocabulary
+VOCABULARY_CUTOFF = 0.75
+# Minimum share of "good" characters for text-layer text to be trusted
+TEXT_QUALITY_MIN = float(os.environ.get("TRENCH_TEXT_QUALITY_MIN", "0.85"))
+# Share of dark pixels (inside the cell borders) below which a cell is considered blank
+BLANK_INK = 0.002
+# Pixels trimmed from each side of a cell before the ink check, so the ruling lines do not count
+INK_MARGIN = 4
+
+
+def text_quality(text):
+    """
+    Share of characters in text that look like real text (letters, digits, marks, punctuation, symbols,
+    spaces). Broken font encodings show up as control / private-use / unassigned characters, U+FFFD or
+    "(cid:NN)" placeholders. Empty text scores 0.
+    """
+    text = (text or "").strip()
+    if not text or "(cid:" in text:
+        return 0.0
+    good = sum(
+        1 for ch in text
+        if ch.isspace() or (ch != "\ufffd" and unicodedata.category(ch)[0] in "LMNPS")
+    )
+    return good / len(text)
+
+
+def cell_ink(img, box, margin=INK_MARGIN):
+    """Share of dark pixels inside a cell box (x, y, w, h) of a grayscale render, borders trimmed."""
+    x, y, w, h = box
+    inner = img[y + margin:y + h - margin, x + margin:x + w - margin]
+    if inner.size == 0:
+        return 0.0
+    return float((inner < 128).mean())
+
+
+def text_layer_cells(page, rows, scale):
+    """
+    Text-layer text of every cell in rows (lists of pixel boxes, None for positions covered by a merged
+    cell, which get ""), same shape as rows.
+    scale converts render pixels to PDF points (72 / render dpi). Words are assigned to the cell holding
+    their centre, and kept in reading order: words of a line joined by spaces, lines by newlines.
+    """
+    import numpy as np
+    words = page.get_text("words")
+    if not words:
+        return [["" for _ in row] for row in rows]
+    words.sort(key=lambda w: (w[5], w[6], w[7]))
+    cx = np.array([(w[0] + w[2]) / 2 for w in words]) / scale
+    cy = np.array([(w[1] + w[3]) / 2 for w in words]) / scale
+    result = []
+    for row in rows:
+        texts = []
+        for box in row:
+            if box is None:
+                texts.append("")
+                continue
+            x, y, w, h = box
+            inside = np.flatnonzero((cx >= x) & (cx < x + w) & (cy >= y) & (cy < y + h))
+            lines = {}
+            for i in inside:
+                lines.setdefault((words[i][5], words[i][6]), []).append(words[i][4])
+            texts.append("\n".join(" ".join(parts) for parts in lines.values()))
+        result.append(texts)
+    return result
+
+
+def render_cell(page, box, scale, dpi=CELL_OCR_DPI):
+    """Grayscale crop of one cell box (pixels of the grid render), re-rendered from the page at dpi."""
+    import fitz
+    import numpy as np
+    x, y, w, h = box
+    clip = fitz.Rect(
+        x * scale - CELL_PAD_PT, y * scale - CELL_PAD_PT,
+        (x + w) * scale + CELL_PAD_PT, (y + h) * scale + CELL_PAD_PT,
+    ) & page.rect
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+
+
+def text_column(vocabulary=(), lang="eng", psm=6):
+    """Profile for a text column, optionally constrained to a vocabulary of known values."""
+    return GENERIC._replace(lang=lang, psm=psm, vocabulary=tuple(vocabulary))
+
+
+def profile_config(profile):
+    config = f"--psm {profile.psm}"
+    if profile.whitelist:
+        config += f" -c tessedit_char_whitelist={profile.whitelist}"
+    return config
+
+
+def preprocess_crop(crop, mode):
+    if mode == "binarize":
+        import cv2
+        _, crop = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return crop
+
+
+def snap_to_vocabulary(text, vocabulary):
+    """The vocabulary entry closest to text (case-insensitive), or text itself when none is close enough."""
+    if not text or not vocabulary:
+        return text
+    folded = {v.casefold(): v for v in vocabulary}
+    match = difflib.get_close_matches(" ".join(text.split()).casefold(), folded, n=1, cutoff=VOCABULARY_CUTOFF)
+    return folded[match[0]] if match else text
+
+
+def ocr_crop(crop, profile=GENERIC):
+    """(text, confidence) of one cell crop read with a column profile: lines of words, lowest word confidence."""
+    import pytesseract
+    data = pytesseract.image_to_data(
+        preprocess_crop(crop, profile.preprocess), lang=available_ocr_lang(profile.lang),
+        config=profile_config(profile), output_type=pytesseract.Output.DICT,
+    )
+    lines, confidences = {}, []
+    for i, word in enumerate(data["text"]):
+        if not str(word).strip():
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(str(word).strip())
+        if float(data["conf"][i]) >= 0:
+            confidences.append(float(data["conf"][i]))
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return snap_to_vocabulary(text, profile.vocabulary), (min(confidences) if confidences else 0.0)
+
+
+def cell_profiles(rows, table_profile=None, spans=None):
+    """ColumnProfile of every cell in rows: the column's profile for body cells, GENERIC everywhere else."""
+    profiles = []
+    for r, row in enumerate(rows):
+        profiles.append([
+            table_profile.columns.get(c, GENERIC)
+            if table_profile is not None and r >= table_profile.header_rows
+            and (spans is None or spans[r][c] == (1, 1)) else GENERIC
+            for c in range(len(row))
+        ])
+    return profiles
+
+
+def _run_ocr(jobs):
+    with ThreadPoolExecutor(max_workers=min(OCR_WORKERS, len(jobs))) as executor:
+        return list(executor.map(lambda job: ocr_crop(*job), jobs))
+
+
+def fill_cells(page, img, rows, scale, profile=None, label="table", ocr_dpi=CELL_OCR_DPI, spans=None):
+    """
+    (texts, confidences) for rows of pixel boxes on the grid render (img) of page, both shaped like rows
+    (rows and spans as in parsers/table_structure.TableGrid; covered positions stay "").
+    Text-layer text where it is usable, OCR with the cell's column profile (see cell_profiles) for cells
+    whose text is empty or garbled but that have ink, "" for blank cells. Doubtful numeric cells get a
+    second pass at RETRY_DPI, kept when it reads as a number or is more confident.
+    Crops are rendered one after another (a PyMuPDF page is not thread-safe), OCR runs in parallel.
+    """
+    table = text_layer_cells(page, rows, scale)
+    confidence = [[100.0 for _ in row] for row in rows]
+    profiles = cell_profiles(rows, profile, spans)
+    to_ocr = []
+    blank = 0
+    for r, row in enumerate(rows):
+        for c, box in enumerate(row):
+            if box is None:
+                continue
+            if text_quality(table[r][c]) >= TEXT_QUALITY_MIN:
+                continue
+            if cell_ink(img, box) < BLANK_INK:
+                table[r][c] = ""
+                blank += 1
+            else:
+                to_ocr.append((r, c))
+    retry = []
+    if to_ocr:
+        jobs = [(render_cell(page, rows[r][c], scale, ocr_dpi), profiles[r][c]) for r, c in to_ocr]
+        for (r, c), (text, conf) in zip(to_ocr, _run_ocr(jobs)):
+            table[r][c], confidence[r][c] = text, conf
+            if profiles[r][c].numeric and text and (conf < OCR_MIN_CONFIDENCE or parse_amount(text) is None):
+                retry.append((r, c))
+    if retry:
+        jobs = [(render_cell(page, rows[r][c], scale, RETRY_DPI), NUMERIC) for r, c in retry]
+        for (r, c), (text, conf) in zip(retry, _run_ocr(jobs)):
+            old = table[r][c]
+            if (parse_amount(text) is not None and parse_amount(old) is None) or conf > confidence[r][c]:
+                table[r][c], confidence[r][c] = text, conf
+            print(f"[LOG] [cells] {label}: re-OCR ({r}, {c}) {old!r} -> {table[r][c]!r} (confidence {confidence[r][c]:.0f})")
+    low = [(r, c) for r, c in to_ocr if confidence[r][c] < OCR_MIN_CONFIDENCE]
+    if low:
+        print(f"[WARN] [cells] {label}: {len(low)} cells below confidence {OCR_MIN_CONFIDENCE:.0f}: {low}")
+    cells = sum(box is not None for row in rows for box in row)
+    print(
+        f"[LOG] [cells] {label}: {cells - blank - len(to_ocr)} cells from text layer, {blank} blank, "
+        f"{len(to_ocr)} OCR'd, {len(retry)} re-OCR'd"
+    )
+    return table, confidence
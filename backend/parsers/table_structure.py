@@ -0,0 +1,165 @@
+# Ruled-table structure from a grayscale page render, without contour sorting.
+# Horizontal and vertical ruling lines are isolated with line-shaped morphology, then row and column
+# separators are read off the projection profiles of those two masks (NumPy sums over the table region).
+# Every pair of adjacent separators bounds one grid cell; a cell spans into its neighbour when the ruling
+# between them is missing along that stretch. The result is an explicit grid: fixed column indices for
+# every row (merged cells are anchored at their top-left position and cover the rest), so lookups like
+# df.iloc[:, 9] mean the same column whether or not a row has merged cells. O(pixels) and deterministic.
+# Scan skew is measured from the horizontal rules and corrected before the profiles are taken; the cell
+# boxes are mapped back to the original render, so callers never see the rotation.
+from collections import namedtuple
+
+# Rows of (x, y, w, h) pixel boxes, None where a merged cell covers the position; spans holds
+# (row_span, col_span) for anchors and None for covered positions; bbox and lines (the ruling mask, for
+# debugging) are in deskewed coordinates; skew is the corrected angle in degrees
+TableGrid = namedtuple("TableGrid", ["rows", "spans", "bbox", "lines", "skew"])
+
+# A separator must run along at least this share of the table's width / height
+MIN_SEPARATOR_FRACTION = 0.08
+# Share of a cell edge that must be ruled for the edge to separate two cells
+MIN_EDGE_COVERAGE = 0.5
+# Line-detection kernel length as a fraction of the page width (the 1/100 the OpenCV pipelines used)
+KERNEL_FRACTION = 0.01
+# Gap (pixels) between rules that still joins them into one table
+CORNER_GAP = 5
+# Skew (degrees) below which the render is used as is, and above which it is not treated as skew
+MIN_SKEW = 0.1
+MAX_SKEW = 5.0
+
+
+def line_masks(img):
+    """(horizontal, vertical) boolean masks of ruling lines in a grayscale render."""
+    import cv2
+    _, binary = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    kernel_len = max(int(img.shape[1] * KERNEL_FRACTION), 3)
+    hori_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_len, 1))
+    vert_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, kernel_len))
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, hori_kernel, iterations=3)
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, vert_kernel, iterations=3)
+    return horizontal > 0, vertical > 0
+
+
+def table_region(horizontal, vertical):
+    """(x0, y0, x1, y1) of the largest connected block of ruling lines, None when there is none."""
+    import cv2
+    import numpy as np
+    # The line-shaped opening trims antialiased rule ends, leaving corners a pixel or two apart at low DPI
+    lines = cv2.dilate((horizontal | vertical).astype(np.uint8), np.ones((CORNER_GAP, CORNER_GAP), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+    if count < 2:
+        return None
+    # Label 0 is the background; pick the component with the largest bounding box
+    areas = stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT]
+    best = 1 + int(np.argmax(areas))
+    x, y, w, h = stats[best, :4]
+    return int(x), int(y), int(x + w), int(y + h)
+
+
+def estimate_skew(horizontal):
+    """Median angle (degrees, image coordinates) of the longest horizontal rules, 0.0 without rules."""
+    import cv2
+    import numpy as np
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(horizontal.astype(np.uint8), connectivity=8)
+    if count < 2:
+        return 0.0
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    longest = 1 + np.argsort(widths)[::-1][:10]
+    angles = []
+    for label in longest[widths[longest - 1] >= 0.5 * widths.max()]:
+        x, y, w, h = stats[label, :4]
+        ys, xs = np.nonzero(labels[y:y + h, x:x + w] == label)
+        if w > 1 and len(xs) > 1:
+            angles.append(np.degrees(np.arctan(np.polyfit(xs, ys, 1)[0])))
+    return float(np.median(angles)) if angles else 0.0
+
+
+def separators(profile, min_length, band):
+    """
+    Centres of the runs of profile (ruled pixels per row or column) reaching min_length, after summing
+    the profile over a band of neighbouring rows so slightly skewed lines still add up.
+    """
+    import numpy as np
+    if band > 1:
+        profile = np.convolve(profile, np.ones(band), mode="same")
+    on = (profile >= min_length).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], on, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return ((starts + ends - 1) // 2).tolist()
+
+
+def _edge_coverage(mask_band, lo, hi):
+    """Share of [lo, hi) covered in a 1-D boolean band (cumulative sums, so each edge is O(1))."""
+    if hi <= lo:
+        return 0.0
+    return float(mask_band[hi] - mask_band[lo]) / (hi - lo)
+
+
+def detect_table(img, dpi):
+    """TableGrid of the largest ruled table in a grayscale render at dpi (empty rows when none is found)."""
+    import cv2
+    import numpy as np
+    horizontal, vertical = line_masks(img)
+    skew = estimate_skew(horizontal)
+    inverse = None
+    if MIN_SKEW < abs(skew) <= MAX_SKEW:
+        centre = (img.shape[1] / 2, img.shape[0] / 2)
+        matrix = cv2.getRotationMatrix2D(centre, skew, 1.0)
+        img = cv2.warpAffine(img, matrix, (img.shape[1], img.shape[0]), flags=cv2.INTER_LINEAR, borderValue=255)
+        inverse = cv2.invertAffineTransform(matrix)
+        horizontal, vertical = line_masks(img)
+    else:
+        skew = 0.0
+    region = table_region(horizontal, vertical)
+    lines = ((horizontal | vertical) * 255).astype(np.uint8)
+    if region is None:
+        return TableGrid([], [], None, lines, skew)
+    x0, y0, x1, y1 = region
+    h_region = horizontal[y0:y1, x0:x1]
+    v_region = vertical[y0:y1, x0:x1]
+    band = max(int(round(dpi / 50)), 1)
+    ys = separators(h_region.sum(axis=1), MIN_SEPARATOR_FRACTION * (x1 - x0), band)
+    xs = separators(v_region.sum(axis=0), MIN_SEPARATOR_FRACTION * (y1 - y0), band)
+    if len(ys) < 2 or len(xs) < 2:
+        return TableGrid([], [], region, lines, skew)
+    n_rows, n_cols = len(ys) - 1, len(xs) - 1
+    tol = band + 1
+    # Cumulative ruling along each separator (bands of +-tol around it), for O(1) edge coverage checks
+    v_cum = [np.concatenate(([0], np.cumsum(v_region[:, max(x - tol, 0):x + tol + 1].any(axis=1)))) for x in xs]
+    h_cum = [np.concatenate(([0], np.cumsum(h_region[max(y - tol, 0):y + tol + 1, :].any(axis=0)))) for y in ys]
+    # Union-find over grid positions: merge neighbours whose shared edge is not ruled
+    parent = list(range(n_rows * n_cols))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for r in range(n_rows):
+        for c in range(n_cols):
+            if c + 1 < n_cols and _edge_coverage(v_cum[c + 1], ys[r], ys[r + 1]) < MIN_EDGE_COVERAGE:
+                parent[find(r * n_cols + c + 1)] = find(r * n_cols + c)
+            if r + 1 < n_rows and _edge_coverage(h_cum[r + 1], xs[c], xs[c + 1]) < MIN_EDGE_COVERAGE:
+                parent[find((r + 1) * n_cols + c)] = find(r * n_cols + c)
+    groups = {}
+    for i in range(n_rows * n_cols):
+        groups.setdefault(find(i), []).append(divmod(i, n_cols))
+    rows = [[None] * n_cols for _ in range(n_rows)]
+    spans = [[None] * n_cols for _ in range(n_rows)]
+    for members in groups.values():
+        r0 = min(r for r, _ in members)
+        r1 = max(r for r, _ in members)
+        c0 = min(c for _, c in members)
+        c1 = max(c for _, c in members)
+        box = (x0 + xs[c0], y0 + ys[r0], xs[c1 + 1] - xs[c0], ys[r1 + 1] - ys[r0])
+        rows[r0][c0] = box if inverse is None else _unrotate(box, inverse)
+        spans[r0][c0] = (r1 - r0 + 1, c1 - c0 + 1)
+    return TableGrid(rows, spans, region, lines, skew)
+
+
+def _unrotate(box, inverse):
+    """Box of the deskewed render moved back to the original one (centre mapped, size kept)."""
+    x, y, w, h = box
+    cx, cy = inverse @ (x + w / 2, y + h / 2, 1.0)
+    return int(round(cx - w / 2)), int(round(cy - h / 2)), w, h
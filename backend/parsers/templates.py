@@ -0,0 +1,213 @@
+# Layout templates for fixed-format demand notes.
+# Demand notes from one corporation are near-identical, so the first time a layout is seen the generic
+# path runs (grid detection over the whole page, every cell read) and a fingerprint is recorded:
+# page size, positions of a few anchor words, the detected table grid and the rectangles of the cells
+# the fields came from. Later pages matching the fingerprint are read straight from those rectangles
+# (text layer clip, or OCR of just those crops), skipping table detection entirely.
+#
+# All coordinates are normalised to the page (0..1, origin top-left), so they survive DPI changes.
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .context import OCR_DPI, OCR_WORKERS, MIN_TEXT_LAYER_CHARS, available_ocr_lang
+
+TEMPLATE_DIR = os.environ.get("TRENCH_TEMPLATE_DIR") or os.path.join(os.path.expanduser("~"), ".trench_extractor", "templates")
+# How far (fraction of the page) anchors may drift relative to each other and still match
+ANCHOR_TOLERANCE = float(os.environ.get("TRENCH_TEMPLATE_TOLERANCE", "0.02"))
+# Padding (fraction of the page) added around a recorded cell before reading it
+CELL_PADDING = 0.004
+
+
+def _page_index(ctx, page_num):
+    return ctx._select_pages([page_num])[0]
+
+
+def page_words(ctx, page_num, lang="eng"):
+    """
+    Words of one page as (text, x0, y0, x1, y1, line_key), normalised to the page.
+    Taken from the text layer when the page has one, otherwise from one Tesseract image_to_data pass.
+    Cached on the root context, so anchors and page text come from the same OCR run.
+    """
+    index = _page_index(ctx, page_num)
+
+    def compute():
+        import fitz
+        with fitz.open(ctx.pdf_path) as doc:
+            page = doc[index]
+            width, height = page.rect.width, page.rect.height
+            if len(ctx.document_page_texts[index].strip()) >= MIN_TEXT_LAYER_CHARS:
+                return [
+                    (w[4], w[0] / width, w[1] / height, w[2] / width, w[3] / height, (w[5], w[6]))
+                    for w in page.get_text("words")
+                ]
+            pix = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY)
+        import numpy as np
+        import pytesseract
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+        data = pytesseract.image_to_data(img, lang=available_ocr_lang(lang), config="--psm 6", output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data["text"]):
+            if not text.strip():
+                continue
+            x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            words.append((text, x / pix.width, y / pix.height, (x + w) / pix.width, (y + h) / pix.height, key))
+        return words
+    return ctx.root.memo(f"words:{index}:{lang}", compute)
+
+
+def words_to_text(words):
+    """Rebuild line-ordered page text from page_words output."""
+    lines = {}
+    for text, _, _, _, _, key in words:
+        lines.setdefault(tuple(key), []).append(text)
+    return "\n".join(" ".join(parts) for parts in lines.values())
+
+
+def page_size(ctx, page_num):
+    index = _page_index(ctx, page_num)
+
+    def compute():
+        import fitz
+        with fitz.open(ctx.pdf_path) as doc:
+            rect = doc[index].rect
+            return round(rect.width), round(rect.height)
+    return ctx.root.memo(f"page_size:{index}", compute)
+
+
+def fingerprint(ctx, page_num, anchors, lang="eng"):
+    """Page size plus the top-left position of the first word containing each anchor."""
+    found = {}
+    for anchor in anchors:
+        for text, x0, y0, _, _, _ in page_words(ctx, page_num, lang):
+            if anchor in text:
+                found[anchor] = [round(x0, 4), round(y0, 4)]
+                break
+    return {"page_size": list(page_size(ctx, page_num)), "anchors": found}
+
+
+def detect_grid(ctx, page_num, dpi=None):
+    """
+    Ruled table cells of one page as an explicit grid (see parsers/table_structure): rows of normalised
+    (x0, y0, x1, y1) rectangles at fixed column indices, None where a merged cell covers the position.
+    Detected on a GRID_DPI render (the expensive step templates skip).
+    """
+    import fitz
+    import numpy as np
+    from .table_cells import GRID_DPI
+    from .table_structure import detect_table
+    dpi = dpi or GRID_DPI
+    index = _page_index(ctx, page_num)
+    with fitz.open(ctx.pdf_path) as doc:
+        pix = doc[index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    grid = detect_table(img, dpi)
+    if ctx.debug is not None:
+        ctx.debug.save_image(f"page{page_num}_table_mask", grid.lines, source=ctx.pdf_path)
+    return [
+        [
+            None if box is None else (
+                box[0] / pix.width, box[1] / pix.height, (box[0] + box[2]) / pix.width, (box[1] + box[3]) / pix.height,
+            )
+            for box in row
+        ]
+        for row in grid.rows
+    ]
+
+
+def read_cells(ctx, page_num, rects, lang="eng", offset=(0.0, 0.0)):
+    """
+    Text inside each normalised rectangle ({name: rect} -> {name: text}), shifted by offset.
+    Text-layer pages are clipped directly; scanned pages are cropped with a PyMuPDF clip render
+    (only the cell is rasterised) and OCR'd as a single line, cells in parallel.
+    """
+    import fitz
+    index = _page_index(ctx, page_num)
+    dx, dy = offset
+    scanned = len(ctx.document_page_texts[index].strip()) < MIN_TEXT_LAYER_CHARS
+    results, crops = {}, {}
+    with fitz.open(ctx.pdf_path) as doc:
+        page = doc[index]
+        width, height = page.rect.width, page.rect.height
+        for name, (x0, y0, x1, y1) in rects.items():
+            clip = fitz.Rect(
+                max(x0 + dx - CELL_PADDING, 0) * width, max(y0 + dy - CELL_PADDING, 0) * height,
+                min(x1 + dx + CELL_PADDING, 1) * width, min(y1 + dy + CELL_PADDING, 1) * height,
+            )
+            if scanned:
+                crops[name] = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY, clip=clip)
+            else:
+                results[name] = page.get_text("text", clip=clip).strip()
+    if crops:
+        import numpy as np
+        import pytesseract
+        ocr_lang = available_ocr_lang(lang)
+
+        def ocr(pix):
+            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+            return pytesseract.image_to_string(img, lang=ocr_lang, config="--psm 7").strip()
+        with ThreadPoolExecutor(max_workers=min(OCR_WORKERS, len(crops))) as executor:
+            results.update(zip(crops, executor.map(ocr, crops.values())))
+    return results
+
+
+class TemplateStore:
+    """
+    Recorded templates for one authority, persisted as a JSON list in TEMPLATE_DIR.
+    Loaded lazily; writes go through a temp file so a crashed write never corrupts the store.
+    """
+
+    def __init__(self, authority, directory=None):
+        self.path = os.path.join(directory or TEMPLATE_DIR, f"{authority.lower()}.json")
+        self._lock = threading.Lock()
+        self._templates = None
+
+    def _load(self):
+        if self._templates is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._templates = json.load(f)
+            except (OSError, ValueError):
+                self._templates = []
+        return self._templates
+
+    def templates(self):
+        with self._lock:
+            return list(self._load())
+
+    def match(self, fp):
+        """
+        (template, (dx, dy)) for the first template with the same page size whose anchors are all present
+        and moved by the same offset (within ANCHOR_TOLERANCE); (None, None) when nothing matches.
+        """
+        for template in self.templates():
+            if list(template["page_size"]) != list(fp["page_size"]):
+                continue
+            anchors = template["anchors"]
+            if not anchors or any(a not in fp["anchors"] for a in anchors):
+                continue
+            offsets = [(fp["anchors"][a][0] - x, fp["anchors"][a][1] - y) for a, (x, y) in anchors.items()]
+            dx = sum(o[0] for o in offsets) / len(offsets)
+            dy = sum(o[1] for o in offsets) / len(offsets)
+            if all(abs(ox - dx) <= ANCHOR_TOLERANCE and abs(oy - dy) <= ANCHOR_TOLERANCE for ox, oy in offsets):
+                return template, (dx, dy)
+        return None, None
+
+    def record(self, fp, grid, cells):
+        """Store a new template (fingerprint, detected grid rows, field cell rectangles) and return it."""
+        grid = [[None if r is None else list(r) for r in row] for row in grid]
+        template = dict(fp, grid=grid, cells={k: list(v) for k, v in cells.items()})
+        template["id"] = hashlib.sha1(json.dumps(fp, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            if any(t.get("id") == template["id"] for t in self._load()):
+                return template
+            self._templates.append(template)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._templates, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        return template
@@ -0,0 +1,121 @@
+# po_master from the purchase order PDFs in the site and route folders, instead of a re-exported MasterPO
+# Excel. A sync walks the given trees for PO PDFs (named like hot_folder's purchase-order rule), parses each
+# distinct file once (the "For Bank" folders and multi-site POs repeat the same PDF) in a process pool, keeps
+# the latest revision of every PO, and turns the line items into po_master rows (see
+# parsers/po_document.po_master_rows). Rows are upserted in bulk on route_id_site_id, like /api/upload-po-master.
+# A PO whose line values do not add up to its total is reported, since a missed line would mean a missing site.
+#
+#   python po_sync.py                         # parse the default trees and print the rows
+#   python po_sync.py ROUTES --upsert         # ... and upsert them into po_master
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from hot_folder import HOT_FOLDER_ROOTS, PURCHASE_ORDER, classify_name, file_sha256
+
+PO_SYNC_WORKERS = int(os.environ.get("TRENCH_PO_SYNC_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+
+
+def find_po_pdfs(roots):
+    """Paths of the PO PDFs under roots."""
+    paths = []
+    for root in roots:
+        for dirpath, _dirs, names in os.walk(root):
+            for name in names:
+                if name.lower().endswith(".pdf") and classify_name(name) == PURCHASE_ORDER:
+                    paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def _parse(path):
+    from parsers.po_document import po_document_parser
+    return po_document_parser(path)
+
+
+def _check_totals(doc):
+    """Warning when the lines do not add up to the PO value (None when they do, or the PDF has no total)."""
+    total = doc.get("Total PO Value")
+    lines_total = sum(line.get("Total Line Value") or 0 for line in doc.get("Lines", []))
+    if total and abs(total - lines_total) > 1:
+        return f"PO {doc.get('PO No')}: line values add up to {lines_total:.2f}, PO value is {total:.2f}"
+    return None
+
+
+def parse_po_files(paths, max_workers=None):
+    """
+    {"documents": [...], "rows": [...], "errors": {path: message}, "warnings": [...]} for the given PO PDFs.
+    Identical files are parsed once; of several revisions of one PO only the latest is kept.
+    """
+    start = time.perf_counter()
+    unique = {}
+    for path in paths:
+        unique.setdefault(file_sha256(path), path)
+    documents, errors = {}, {}
+    if unique:
+        workers = min(max_workers or PO_SYNC_WORKERS, len(unique))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_parse, path): path for path in unique.values()}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    doc = future.result()
+                except Exception as e:
+                    print(f"[ERROR] [po-sync] {path}: {e}")
+                    errors[path] = str(e)
+                    continue
+                if not doc.get("PO No") or not doc.get("Lines"):
+                    errors[path] = "No PO number or line items found"
+                    continue
+                doc["source"] = path
+                current = documents.get(doc["PO No"])
+                if current is None or int(doc.get("Revision") or 0) > int(current.get("Revision") or 0):
+                    documents[doc["PO No"]] = doc
+    from parsers.po_document import po_master_rows
+    documents = sorted(documents.values(), key=lambda d: d["PO No"])
+    rows = po_master_rows(documents)
+    warnings = [w for w in map(_check_totals, documents) if w]
+    print(
+        f"[LOG] [po-sync] {len(paths)} files, {len(unique)} distinct, {len(documents)} POs, {len(rows)} rows"
+        f" in {time.perf_counter() - start:.1f}s"
+    )
+    return {"documents": documents, "rows": rows, "errors": errors, "warnings": warnings}
+
+
+def sync_tree(roots=None, max_workers=None):
+    roots = [os.path.abspath(r) for r in (roots or HOT_FOLDER_ROOTS) if os.path.isdir(r)]
+    return parse_po_files(find_po_pdfs(roots), max_workers)
+
+
+def upsert_po_master(rows):
+    """Bulk upsert on route_id_site_id; returns the error messages. Rows are sent grouped by their column set."""
+    from supabase import create_client
+    supabase = create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    errors = []
+    for group in groups.values():
+        try:
+            response = supabase.table("po_master").upsert(group, on_conflict="route_id_site_id").execute()
+            if hasattr(response, "error") and response.error:
+                errors.append(str(response.error))
+        except Exception as e:
+            errors.append(str(e))
+    return errors
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    arg_parser = argparse.ArgumentParser(description="Build po_master rows from the PO PDFs in the site folders.")
+    arg_parser.add_argument("roots", nargs="*", help="folders to search (default: TRENCH_HOT_FOLDERS or the repo trees)")
+    arg_parser.add_argument("--workers", type=int, default=None, help="parser processes")
+    arg_parser.add_argument("--upsert", action="store_true", help="upsert the rows into po_master")
+    args = arg_parser.parse_args()
+    result = sync_tree(args.roots or None, args.workers)
+    print(json.dumps({k: result[k] for k in ("rows", "errors", "warnings")}, indent=2))
+    if args.upsert:
+        load_dotenv()
+        errors = upsert_po_master(result["rows"])
+        print(f"[LOG] [po-sync] Upserted {len(result['rows'])} rows, errors: {errors or 'none'}")
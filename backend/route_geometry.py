@@ -0,0 +1,262 @@
+# Surveyed trench geometry from the KMZ / KML files in the site and route folders, and its length.
+# The KML is streamed out of the KMZ (a zip) through ElementTree.iterparse, so a large survey is never held
+# as a whole tree: every <LineString> becomes an (n, 2) float64 array of lon / lat as soon as its coordinates
+# end, and finished Placemarks are cleared. Points (chambers, poles, site markers) are ignored.
+# Lengths are geodesic on the WGS84 ellipsoid, computed per segment with the meridional and prime-vertical
+# radii at the segment's mid-latitude (exact to well under a millimetre for segments of a few hundred metres,
+# which is what surveys are made of). All lines of a batch are concatenated and measured in one vectorised
+# pass, then summed per line, so measuring hundreds of routes costs about as much as measuring one.
+# length_report compares each file's surveyed length with the dn_master rows it belongs to.
+#
+#   python route_geometry.py                  # surveyed vs DN / application lengths for the default trees
+#   python route_geometry.py ROUTES --no-db   # surveyed lengths only
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from hot_folder import HOT_FOLDER_ROOTS, ROUTE_KML, classify_name, site_of
+
+ROUTE_WORKERS = int(os.environ.get("TRENCH_ROUTE_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+# Surveyed and billed lengths further apart than this (percent of the billed length) are flagged
+LENGTH_TOLERANCE_PCT = float(os.environ.get("TRENCH_LENGTH_TOLERANCE_PCT", "10"))
+
+WGS84_A = 6378137.0
+WGS84_E2 = 6.69437999014e-3
+
+# One LineString: the name of its Placemark and an (n, 2) array of lon, lat in degrees
+RouteLine = namedtuple("RouteLine", ["placemark", "coords"])
+
+# "4765 mtr", "80 Mtrs", "30M" in a file name
+STATED_LENGTH = re.compile(r"(\d+(?:\.\d+)?)\s*(?:mtrs?|m)(?![A-Za-z])", re.IGNORECASE)
+# Application numbers in file names ("M-East 0783339980 .kmz", "783340697_100 mtr.kmz")
+APPLICATION_NUMBER = re.compile(r"(?<!\d)0?(\d{9})(?!\d)")
+
+
+def parse_coordinates(text):
+    """(n, 2) lon / lat array of a KML coordinates string ("lon,lat[,alt] lon,lat[,alt] ...")."""
+    tuples = (text or "").split()
+    if not tuples:
+        return np.empty((0, 2))
+    dims = tuples[0].count(",") + 1
+    try:
+        values = np.array(",".join(tuples).split(","), dtype=float).reshape(-1, dims)
+    except ValueError:
+        # Tuples with and without altitude mixed in one string
+        values = np.array([t.split(",")[:2] for t in tuples], dtype=float)
+    return values[:, :2]
+
+
+def iter_linestrings(source):
+    """RouteLines of a KML file object, streamed."""
+    stack, placemarks = [], []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = elem.tag.rpartition("}")[2]
+        if event == "start":
+            stack.append(tag)
+            if tag == "Placemark":
+                placemarks.append("")
+            continue
+        stack.pop()
+        if tag == "name" and stack and stack[-1] == "Placemark":
+            placemarks[-1] = (elem.text or "").strip()
+        elif tag == "coordinates" and "LineString" in stack:
+            coords = parse_coordinates(elem.text)
+            if len(coords) >= 2:
+                yield RouteLine(placemarks[-1] if placemarks else "", coords)
+            elem.clear()
+        elif tag == "Placemark":
+            placemarks.pop()
+            elem.clear()
+
+
+def read_lines(path):
+    """RouteLines of a .kmz (every .kml member) or .kml file."""
+    if not zipfile.is_zipfile(path):
+        with open(path, "rb") as f:
+            return list(iter_linestrings(f))
+    lines = []
+    with zipfile.ZipFile(path) as kmz:
+        for member in kmz.namelist():
+            if member.lower().endswith(".kml"):
+                with kmz.open(member) as f:
+                    lines.extend(iter_linestrings(io.BufferedReader(f)))
+    return lines
+
+
+def segment_lengths(coords):
+    """Geodesic length in metres of each segment of an (n, 2) lon / lat array (n - 1 values)."""
+    lon, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    mid = (lat[1:] + lat[:-1]) / 2
+    w = 1 - WGS84_E2 * np.sin(mid) ** 2
+    prime_vertical = WGS84_A / np.sqrt(w)
+    meridional = WGS84_A * (1 - WGS84_E2) / w ** 1.5
+    dlon = (np.diff(lon) + np.pi) % (2 * np.pi) - np.pi
+    return np.hypot(prime_vertical * np.cos(mid) * dlon, meridional * np.diff(lat))
+
+
+def line_lengths(coord_arrays):
+    """Length in metres of each coordinate array, all measured in one vectorised pass."""
+    if not coord_arrays:
+        return np.zeros(0)
+    sizes = np.array([len(c) for c in coord_arrays])
+    points = np.concatenate(coord_arrays)
+    # Running total over every segment of the concatenation; a line's length is the difference between the
+    # totals at its last and first point, which leaves out the segment joining it to the next line
+    totals = np.concatenate(([0.0], np.cumsum(segment_lengths(points)))) if len(points) else np.zeros(1)
+    ends = np.cumsum(sizes)
+    starts = np.minimum(ends - sizes, len(totals) - 1)
+    lasts = np.minimum(np.maximum(ends - 1, starts), len(totals) - 1)
+    return totals[lasts] - totals[starts]
+
+
+def find_route_files(roots):
+    paths = []
+    for root in roots:
+        for dirpath, _dirs, names in os.walk(root):
+            for name in names:
+                if classify_name(name) == ROUTE_KML:
+                    paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def load_routes(paths, max_workers=None):
+    """{"path", "lines": [RouteLine], "error"} per file; files are read in a process pool."""
+    routes = []
+    if not paths:
+        return routes
+    workers = min(max_workers or ROUTE_WORKERS, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(read_lines, path) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                routes.append({"path": path, "lines": future.result(), "error": None})
+            except Exception as e:
+                print(f"[ERROR] [routes] {path}: {e}")
+                routes.append({"path": path, "lines": [], "error": str(e)})
+    return routes
+
+
+def measure_routes(routes):
+    """Adds "line_lengths" and "length" (metres) to each route, with one length computation for all of them."""
+    arrays = [line.coords for route in routes for line in route["lines"]]
+    lengths = line_lengths(arrays)
+    offset = 0
+    for route in routes:
+        count = len(route["lines"])
+        route["line_lengths"] = [round(float(v), 2) for v in lengths[offset:offset + count]]
+        route["length"] = round(float(lengths[offset:offset + count].sum()), 2)
+        offset += count
+    return routes
+
+
+def stated_length(path):
+    """Length written in the file name ("Route number 45_4765 mtr.kmz" -> 4765.0), None without one."""
+    match = STATED_LENGTH.search(os.path.splitext(os.path.basename(path))[0])
+    return float(match.group(1)) if match else None
+
+
+def site_key(value):
+    """Comparable form of a site / route ID: "MU-MA928" and "MA928", "MUM/Route/90" and "Route 90" match."""
+    value = re.sub(r"^(MUM|MU)(?=[^A-Z0-9]|M[AB])", "", str(value or "").strip().upper())
+    return re.sub(r"[^A-Z0-9]", "", value)
+
+
+def dn_master_rows():
+    """Site, application / DN numbers and lengths of every dn_master row (the columns match_rows and the reports use)."""
+    from supabase import create_client
+    supabase = create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    response = supabase.table("dn_master").select(
+        "route_id_site_id, application_number, dn_number, dn_length_mtr, application_length_mtr"
+    ).execute()
+    return response.data or []
+
+
+def _deviation(surveyed, billed):
+    try:
+        billed = float(billed)
+    except (TypeError, ValueError):
+        return None
+    return round((surveyed - billed) / billed * 100, 1) if billed else None
+
+
+def match_rows(path, site, rows):
+    """
+    dn_master rows of a route file: by the application number in its name, or by its site folder when the name
+    has none (a route folder can hold the surveys of several applications).
+    """
+    numbers = {n.lstrip("0") for n in APPLICATION_NUMBER.findall(os.path.basename(path))}
+    if numbers:
+        return [r for r in rows if str(r.get("application_number") or "").lstrip("0") in numbers]
+    if site:
+        return [r for r in rows if site_key(r.get("route_id_site_id")) == site_key(site)]
+    return []
+
+
+def length_report(roots=None, rows=None, tolerance_pct=LENGTH_TOLERANCE_PCT, max_workers=None):
+    """
+    One entry per route file: surveyed length, the length stated in its name, and each matching dn_master row,
+    with the deviation of the surveyed length from the stated length and from dn_length_mtr /
+    application_length_mtr in percent. File names are written before the survey, so they often disagree.
+    rows defaults to dn_master; pass [] to only measure.
+    """
+    start = time.perf_counter()
+    roots = [os.path.abspath(r) for r in (roots or HOT_FOLDER_ROOTS) if os.path.isdir(r)]
+    routes = measure_routes(load_routes(find_route_files(roots), max_workers))
+    errors = {}
+    if rows is None:
+        try:
+            rows = dn_master_rows()
+        except Exception as e:
+            errors["dn_master"] = str(e)
+            rows = []
+    report = []
+    for route in routes:
+        site = site_of(route["path"], roots)
+        stated = stated_length(route["path"])
+        stated_dev = _deviation(route["length"], stated)
+        matches = []
+        for row in match_rows(route["path"], site, rows):
+            dn_dev = _deviation(route["length"], row.get("dn_length_mtr"))
+            app_dev = _deviation(route["length"], row.get("application_length_mtr"))
+            devs = [abs(d) for d in (dn_dev, app_dev) if d is not None]
+            matches.append({
+                **row,
+                "dn_deviation_pct": dn_dev,
+                "application_deviation_pct": app_dev,
+                "within_tolerance": max(devs) <= tolerance_pct if devs else None,
+            })
+        report.append({
+            "path": route["path"],
+            "site": site,
+            "lines": len(route["lines"]),
+            "surveyed_length_m": route["length"],
+            "line_lengths_m": route["line_lengths"],
+            "stated_length_m": stated,
+            "stated_deviation_pct": stated_dev,
+            "stated_within_tolerance": abs(stated_dev) <= tolerance_pct if stated_dev is not None else None,
+            "dn_master": matches,
+            "error": route["error"],
+        })
+    print(f"[LOG] [routes] Measured {len(report)} route files in {time.perf_counter() - start:.2f}s")
+    return {"routes": report, "errors": errors}
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    arg_parser = argparse.ArgumentParser(description="Surveyed trench lengths from KMZ / KML files.")
+    arg_parser.add_argument("roots", nargs="*", help="folders to search (default: TRENCH_HOT_FOLDERS or the repo trees)")
+    arg_parser.add_argument("--no-db", action="store_true", help="do not compare with dn_master")
+    arg_parser.add_argument("--tolerance", type=float, default=LENGTH_TOLERANCE_PCT, help="allowed deviation in percent")
+    args = arg_parser.parse_args()
+    load_dotenv()
+    result = length_report(args.roots or None, [] if args.no_db else None, args.tolerance)
+    print(json.dumps(result, indent=2))
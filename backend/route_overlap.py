@@ -0,0 +1,288 @@
+# Overlapping trench sections between surveyed routes, to catch a stretch that is paid for under two DNs.
+# Every LineString segment of the ingested KMZ / KML routes (route_geometry) is projected to metres on a local
+# plane and packed into a sort-tile-recursive (STR) grid: segments are sorted into vertical slices by x, each
+# slice by y, and cut into leaves of LEAF_SIZE segments whose bounding boxes are kept as NumPy arrays.
+# A query tests its segments against all leaf boxes at once and only measures distances to the segments of the
+# leaves it hits. A query route is sampled every SAMPLE_STEP_M metres; the overlap with an indexed route is the
+# length of the samples lying within OVERLAP_BUFFER_M of it. Overlaps shorter than OVERLAP_MIN_M are dropped,
+# which leaves out routes that merely cross or touch.
+# The index over the hot-folder trees is built once and rebuilt when a route file changes (route_index).
+# An uploaded route that is already indexed (the same file, or the same coordinates re-exported) is not
+# reported as overlapping itself: indexed routes are matched by file SHA-256 and by geometry_key.
+#
+#   python route_overlap.py                   # overlapping route pairs and the dn_master rows they bill
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import route_geometry
+from hot_folder import HOT_FOLDER_ROOTS, file_sha256, site_of
+
+LEAF_SIZE = 16
+OVERLAP_BUFFER_M = float(os.environ.get("TRENCH_OVERLAP_BUFFER_M", "5"))
+OVERLAP_MIN_M = float(os.environ.get("TRENCH_OVERLAP_MIN_M", "20"))
+SAMPLE_STEP_M = 1.0
+# Decimal places of the lon / lat compared by geometry_key (1e-7 degrees is about 1 cm)
+GEOMETRY_DECIMALS = 7
+# Reference latitude of the local plane (Mumbai); east-west scale is exact here and within 0.1% across the city
+PLANE_LATITUDE = float(os.environ.get("TRENCH_PLANE_LATITUDE", "19.1"))
+
+
+def project(coords, lat0=PLANE_LATITUDE):
+    """(n, 2) lon / lat degrees -> (n, 2) metres on a plane tangent at lat0 (WGS84 radii)."""
+    phi = np.radians(lat0)
+    w = 1 - route_geometry.WGS84_E2 * np.sin(phi) ** 2
+    east = route_geometry.WGS84_A / np.sqrt(w) * np.cos(phi)
+    north = route_geometry.WGS84_A * (1 - route_geometry.WGS84_E2) / w ** 1.5
+    return np.radians(coords) * np.array([east, north])
+
+
+def _point_segment_distances(points, a, b):
+    """(p, s) distances from each point to each segment a[i] -> b[i]."""
+    d = b - a
+    length2 = np.maximum((d ** 2).sum(axis=1), 1e-12)
+    rel = points[:, None, :] - a[None, :, :]
+    t = np.clip((rel * d[None, :, :]).sum(axis=2) / length2[None, :], 0.0, 1.0)
+    closest = a[None, :, :] + t[:, :, None] * d[None, :, :]
+    return np.hypot(*(points[:, None, :] - closest).transpose(2, 0, 1))
+
+
+def _samples(segments_a, segments_b, step):
+    """Midpoints of equal pieces of at most step metres along each segment, with the length each stands for."""
+    lengths = np.hypot(*(segments_b - segments_a).T)
+    counts = np.maximum(np.ceil(lengths / step).astype(int), 1)
+    owner = np.repeat(np.arange(len(lengths)), counts)
+    piece = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = (piece + 0.5) / counts[owner]
+    points = segments_a[owner] + t[:, None] * (segments_b[owner] - segments_a[owner])
+    return points, (lengths / counts)[owner], owner
+
+
+def geometry_key(lines):
+    """
+    Fingerprint of a route's coordinates (lon / lat arrays) rounded to GEOMETRY_DECIMALS, independent of
+    placemark order, so a KMZ and the KML exported from it get the same key.
+    """
+    digests = sorted(
+        hashlib.sha1(np.round(np.asarray(coords, dtype=float), GEOMETRY_DECIMALS).tobytes()).hexdigest()
+        for coords in lines
+    )
+    return hashlib.sha1("".join(digests).encode("ascii")).hexdigest()
+
+
+class RouteIndex:
+    """STR-packed grid over the segments of a set of routes, each route given as a list of lon / lat arrays."""
+
+    def __init__(self, routes):
+        self.route_ids = [route_id for route_id, _ in routes]
+        self.numbers = {route_id: number for number, route_id in enumerate(self.route_ids)}
+        starts, ends, owners = [], [], []
+        for number, (_, lines) in enumerate(routes):
+            for coords in lines:
+                xy = project(coords)
+                starts.append(xy[:-1])
+                ends.append(xy[1:])
+                owners.append(np.full(len(xy) - 1, number))
+        self.a = np.concatenate(starts) if starts else np.empty((0, 2))
+        self.b = np.concatenate(ends) if ends else np.empty((0, 2))
+        self.owner = np.concatenate(owners) if owners else np.empty(0, dtype=int)
+        self._pack()
+
+    def _pack(self):
+        count = len(self.a)
+        lo, hi = np.minimum(self.a, self.b), np.maximum(self.a, self.b)
+        centre = (lo + hi) / 2
+        leaves = max(int(np.ceil(count / LEAF_SIZE)), 1)
+        slices = max(int(np.ceil(np.sqrt(leaves))), 1)
+        per_slice = slices * LEAF_SIZE
+        by_x = np.argsort(centre[:, 0], kind="stable")
+        order = []
+        for start in range(0, count, per_slice):
+            chunk = by_x[start:start + per_slice]
+            order.append(chunk[np.argsort(centre[chunk, 1], kind="stable")])
+        self.order = np.concatenate(order) if order else np.empty(0, dtype=int)
+        self.leaf_starts = np.arange(0, count, LEAF_SIZE)
+        if count:
+            self.leaf_lo = np.minimum.reduceat(lo[self.order], self.leaf_starts)
+            self.leaf_hi = np.maximum.reduceat(hi[self.order], self.leaf_starts)
+        else:
+            self.leaf_lo = self.leaf_hi = np.empty((0, 2))
+
+    def _leaf_hits(self, lo, hi):
+        """(q, leaves) bool: which leaf boxes intersect each query box (rows of lo / hi)."""
+        return ((self.leaf_lo[None, :, :] <= hi[:, None, :]) & (self.leaf_hi[None, :, :] >= lo[:, None, :])).all(axis=2)
+
+    def _segments_of(self, leaves):
+        if not len(leaves):
+            return np.empty(0, dtype=int)
+        return np.concatenate([self.order[s:s + LEAF_SIZE] for s in self.leaf_starts[leaves]])
+
+    def candidates(self, lo, hi):
+        """Indices of the segments in leaves whose box intersects any of the query boxes (rows of lo / hi)."""
+        return self._segments_of(np.flatnonzero(self._leaf_hits(lo, hi).any(axis=0)))
+
+    def overlaps(self, lines, buffer_m=OVERLAP_BUFFER_M, min_length_m=OVERLAP_MIN_M, exclude=None):
+        """
+        [{"route", "overlap_m", "share_pct"}] for every indexed route that runs within buffer_m of the query route
+        (lon / lat arrays) for at least min_length_m; share_pct is of the query length. exclude is the query's own
+        route id (or a collection of ids) when it is indexed, so that it is not reported as overlapping itself.
+        """
+        if not lines or not len(self.a):
+            return []
+        if exclude is None or isinstance(exclude, str):
+            exclude = [exclude]
+        exclude = [self.numbers[e] for e in exclude if e in self.numbers] or None
+        xy = [project(coords) for coords in lines]
+        qa = np.concatenate([p[:-1] for p in xy])
+        qb = np.concatenate([p[1:] for p in xy])
+        points, weights, owner = _samples(qa, qb, SAMPLE_STEP_M)
+        total = weights.sum()
+        # Samples are grouped by query segment; bounds[i]:bounds[i + 1] are those of segment i
+        bounds = np.searchsorted(owner, np.arange(len(qa) + 1))
+        hits = self._leaf_hits(np.minimum(qa, qb) - buffer_m, np.maximum(qa, qb) + buffer_m)
+        covered = {}
+        for segment in np.flatnonzero(hits.any(axis=1)):
+            near = self._segments_of(np.flatnonzero(hits[segment]))
+            if exclude is not None:
+                near = near[~np.isin(self.owner[near], exclude)]
+            if not len(near):
+                continue
+            first, last = bounds[segment], bounds[segment + 1]
+            within = _point_segment_distances(points[first:last], self.a[near], self.b[near]) <= buffer_m
+            routes = self.owner[near]
+            for route in np.unique(routes):
+                hit = within[:, routes == route].any(axis=1)
+                if hit.any():
+                    covered.setdefault(route, np.zeros(len(points), dtype=bool))[first:last] |= hit
+        result = []
+        for route, mask in covered.items():
+            length = float(weights[mask].sum())
+            if length >= min_length_m:
+                result.append({
+                    "route": self.route_ids[route],
+                    "overlap_m": round(length, 1),
+                    "share_pct": round(float(length / total * 100), 1) if total else None,
+                })
+        return sorted(result, key=lambda r: -r["overlap_m"])
+
+
+def route_id_of(path, roots):
+    """
+    Id of a route file: its path below the root that holds it, starting with the site folder
+    ("MU-MA928/783340697_100 mtr.kmz"), so routes from several roots get ids of the same form.
+    """
+    for root in roots:
+        site = site_of(path, [root])
+        if site:
+            return "/".join([site] + os.path.relpath(path, os.path.join(root, site)).split(os.sep))
+    return os.path.basename(path)
+
+
+_cache = {"signature": None, "index": None, "routes": None}
+_cache_lock = threading.Lock()
+
+
+def route_index(roots=None):
+    """(RouteIndex, routes) over the route files of the hot-folder trees, rebuilt when a file changes."""
+    roots = [os.path.abspath(r) for r in (roots or HOT_FOLDER_ROOTS) if os.path.isdir(r)]
+    paths = route_geometry.find_route_files(roots)
+    signature = tuple((p, os.path.getmtime(p), os.path.getsize(p)) for p in paths)
+    with _cache_lock:
+        if _cache["signature"] != signature:
+            start = time.perf_counter()
+            routes = [r for r in route_geometry.load_routes(paths) if r["lines"]]
+            for route in routes:
+                route["id"] = route_id_of(route["path"], roots)
+                route["site"] = site_of(route["path"], roots)
+                route["sha256"] = file_sha256(route["path"])
+                route["geometry"] = geometry_key([line.coords for line in route["lines"]])
+            index = RouteIndex([(r["id"], [line.coords for line in r["lines"]]) for r in routes])
+            _cache.update(signature=signature, index=index, routes={r["id"]: r for r in routes})
+            print(f"[LOG] [overlap] Indexed {len(index.a)} segments of {len(routes)} routes in {time.perf_counter() - start:.2f}s")
+        return _cache["index"], _cache["routes"]
+
+
+def same_routes(routes, lines, sha256=None):
+    """Ids of the indexed routes that are the queried route itself: the same file (sha256) or the same coordinates."""
+    key = geometry_key([line.coords for line in lines]) if lines else None
+    return sorted(
+        route_id for route_id, route in routes.items()
+        if (sha256 and route.get("sha256") == sha256) or (key and route.get("geometry") == key)
+    )
+
+
+def overlaps_for_lines(
+    lines, roots=None, rows=None, buffer_m=OVERLAP_BUFFER_M, min_length_m=OVERLAP_MIN_M, route_id=None, sha256=None
+):
+    """
+    Overlaps of a route (RouteLines) with every indexed route, each with the dn_master rows it bills.
+    The route itself is left out when it is indexed: route_id names it, and indexed routes with the same file
+    hash (sha256 of the uploaded file) or the same coordinates are recognised without one (see same_routes).
+    """
+    index, routes = route_index(roots)
+    start = time.perf_counter()
+    same = same_routes(routes, lines, sha256)
+    exclude = same + [route_id] if route_id and route_id not in same else same
+    found = index.overlaps([line.coords for line in lines], buffer_m, min_length_m, exclude=exclude)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for overlap in found:
+        route = routes[overlap["route"]]
+        overlap["site"] = route["site"]
+        overlap["dn_master"] = route_geometry.match_rows(route["path"], route["site"], rows or [])
+    return {"overlaps": found, "same_routes": same, "query_ms": round(elapsed_ms, 1), "indexed_routes": len(routes)}
+
+
+def overlap_report(roots=None, rows=None, buffer_m=OVERLAP_BUFFER_M, min_length_m=OVERLAP_MIN_M):
+    """
+    Every pair of indexed routes that overlap, with the dn_master rows billing each side. A pair whose sides
+    are billed by different DNs is flagged double_billed. rows defaults to dn_master; pass [] to skip it.
+    """
+    errors = {}
+    if rows is None:
+        try:
+            rows = route_geometry.dn_master_rows()
+        except Exception as e:
+            errors["dn_master"] = str(e)
+            rows = []
+    index, routes = route_index(roots)
+    start = time.perf_counter()
+    pairs = []
+    for route_id, route in routes.items():
+        for overlap in index.overlaps(
+            [line.coords for line in route["lines"]], buffer_m, min_length_m, exclude=route_id
+        ):
+            other = routes[overlap["route"]]
+            if index.numbers[other["id"]] < index.numbers[route_id]:
+                continue
+            billed = route_geometry.match_rows(route["path"], route["site"], rows)
+            other_billed = route_geometry.match_rows(other["path"], other["site"], rows)
+            dn_numbers = {r.get("dn_number") for r in billed} | {r.get("dn_number") for r in other_billed}
+            pairs.append({
+                "route": route_id,
+                "other_route": other["id"],
+                "overlap_m": overlap["overlap_m"],
+                "share_pct": overlap["share_pct"],
+                "dn_master": billed,
+                "other_dn_master": other_billed,
+                "double_billed": bool(billed) and bool(other_billed) and len(dn_numbers - {None, ""}) > 1,
+            })
+    pairs.sort(key=lambda p: (not p["double_billed"], -p["overlap_m"]))
+    print(f"[LOG] [overlap] {len(pairs)} overlapping pairs among {len(routes)} routes in {time.perf_counter() - start:.2f}s")
+    return {"pairs": pairs, "errors": errors}
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    arg_parser = argparse.ArgumentParser(description="Overlapping trench sections between surveyed routes.")
+    arg_parser.add_argument("roots", nargs="*", help="folders to search (default: TRENCH_HOT_FOLDERS or the repo trees)")
+    arg_parser.add_argument("--no-db", action="store_true", help="do not look up dn_master")
+    arg_parser.add_argument("--buffer", type=float, default=OVERLAP_BUFFER_M, help="metres between routes counted as overlap")
+    arg_parser.add_argument("--min-length", type=float, default=OVERLAP_MIN_M, help="shortest overlap reported, metres")
+    args = arg_parser.parse_args()
+    load_dotenv()
+    print(json.dumps(overlap_report(args.roots or None, [] if args.no_db else None, args.buffer, args.min_length), indent=2))
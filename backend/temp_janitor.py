@@ -0,0 +1,120 @@
+# Managed scratch directory for uploads and any other files that must touch disk.
+# Files are removed by post-response background tasks; the janitor thread is a safety
+# net that enforces a max age and a total-size quota on the directory.
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+TEMP_ROOT = os.environ.get("TRENCH_TEMP_DIR") or os.path.join(tempfile.gettempdir(), "trench_extractor")
+TEMP_QUOTA_BYTES = int(os.environ.get("TRENCH_TEMP_QUOTA_MB", "512")) * 1024 * 1024
+TEMP_MAX_AGE_SECONDS = int(os.environ.get("TRENCH_TEMP_MAX_AGE_SECONDS", "3600"))
+JANITOR_INTERVAL_SECONDS = int(os.environ.get("TRENCH_JANITOR_INTERVAL_SECONDS", "300"))
+
+_janitor_thread = None
+_janitor_stop = threading.Event()
+
+
+def temp_path(filename=""):
+    """Return a unique path inside the managed temp directory (the file is not created)."""
+    os.makedirs(TEMP_ROOT, exist_ok=True)
+    safe_name = os.path.basename(filename or "")
+    return os.path.join(TEMP_ROOT, f"{uuid.uuid4()}_{safe_name}" if safe_name else str(uuid.uuid4()))
+
+
+def save_upload(upload):
+    """Copy a FastAPI UploadFile into the managed temp directory and return its path."""
+    path = temp_path(upload.filename)
+    upload.file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f)
+    return path
+
+
+def save_bytes(data, filename=""):
+    path = temp_path(filename)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def remove_file(*paths):
+    """Delete files, ignoring ones that are already gone. Meant for BackgroundTasks."""
+    for path in paths:
+        if not path:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[ERROR] [janitor] Could not remove {path}: {e}")
+
+
+def enforce_quota(max_bytes=None, max_age_seconds=None):
+    """
+    Remove expired files, then the oldest files until the directory is under quota.
+    Returns (files_removed, bytes_remaining).
+    """
+    max_bytes = TEMP_QUOTA_BYTES if max_bytes is None else max_bytes
+    max_age_seconds = TEMP_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    if not os.path.isdir(TEMP_ROOT):
+        return 0, 0
+    now = time.time()
+    entries = []
+    for root, _dirs, names in os.walk(TEMP_ROOT):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    removed = 0
+    total = 0
+    kept = []
+    for mtime, size, path in entries:
+        if now - mtime > max_age_seconds:
+            remove_file(path)
+            removed += 1
+        else:
+            kept.append((mtime, size, path))
+            total += size
+    if total > max_bytes:
+        for mtime, size, path in sorted(kept):
+            remove_file(path)
+            removed += 1
+            total -= size
+            if total <= max_bytes:
+                break
+    if removed:
+        print(f"[LOG] [janitor] Removed {removed} temp files, {total} bytes remaining in {TEMP_ROOT}")
+    return removed, total
+
+
+def _janitor_loop(interval):
+    while not _janitor_stop.wait(interval):
+        try:
+            enforce_quota()
+        except Exception as e:
+            print(f"[ERROR] [janitor] Sweep failed: {e}")
+
+
+def start_janitor(interval=None):
+    """Run one sweep now and keep sweeping on a daemon thread."""
+    global _janitor_thread
+    enforce_quota()
+    if _janitor_thread is not None and _janitor_thread.is_alive():
+        return _janitor_thread
+    _janitor_stop.clear()
+    _janitor_thread = threading.Thread(
+        target=_janitor_loop, args=(interval or JANITOR_INTERVAL_SECONDS,), name="temp-janitor", daemon=True
+    )
+    _janitor_thread.start()
+    return _janitor_thread
+
+
+def stop_janitor():
+    _janitor_stop.set()
@@ -0,0 +1,53 @@
+import io
+import zipfile
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Write-only, non-seekable sink; zipfile then emits data descriptors so entries can be streamed."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """
+    Yield a ZIP archive chunk by chunk from (arcname, bytes) pairs, without a temp file.
+    entries may be a generator, so each member can be produced just before it is written.
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, 'w', compression) as zipf:
+        for arcname, data in entries:
+            if data is None:
+                continue
+            zipf.writestr(arcname, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def content_disposition(filename):
+    """Content-Disposition header value that survives non-ASCII file names."""
+    from urllib.parse import quote
+    ascii_name = filename.encode("ascii", "replace").decode("ascii").replace('"', "'")
+    return f'attachment; filename="{ascii_name}"; filename*=utf-8\'\'{quote(filename)}'
@@ -0,0 +1,97 @@
+# Optional warm-up phase, enabled with TRENCH_WARMUP=1.
+# Imports every registered parser, touches Camelot and Tesseract once and parses a tiny generated
+# demand-note-like PDF, so the first real request does not pay import/initialisation cost.
+# The /ready endpoint reports 503 until this has finished (it is ready immediately when disabled).
+import os
+import threading
+import time
+
+WARMUP_ENABLED = os.environ.get("TRENCH_WARMUP", "0").lower() in ("1", "true", "yes")
+
+_status = {"state": "disabled" if not WARMUP_ENABLED else "pending", "steps": {}}
+_lock = threading.Lock()
+_thread = None
+
+
+def tiny_pdf_bytes():
+    """A one-page PDF with a small ruled table, enough for Camelot lattice and the text extractors."""
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=420, height=300)
+    page.insert_text((30, 40), "Demand Note No. 000000000  Date: 01/01/2025", fontsize=9)
+    x0, y0, cell_w, cell_h = 30, 70, 120, 24
+    for r in range(4):
+        page.draw_line((x0, y0 + r * cell_h), (x0 + 3 * cell_w, y0 + r * cell_h))
+    for c in range(4):
+        page.draw_line((x0 + c * cell_w, y0), (x0 + c * cell_w, y0 + 3 * cell_h))
+    cells = [["Road Type", "Length", "Rate"], ["Mastic Asphalt", "10", "1,000"]]
+    for r, values in enumerate(cells):
+        for c, value in enumerate(values):
+            page.insert_text((x0 + c * cell_w + 6, y0 + r * cell_h + 16), value, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _step(name, func):
+    start = time.perf_counter()
+    try:
+        func()
+        result = {"ok": True}
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    with _lock:
+        _status["steps"][name] = result
+    print(f"[LOG] [warmup] {name}: {result}")
+
+
+def run_warmup():
+    """Run every warm-up step once. Step failures are recorded but never raise."""
+    from parsers.registry import registered_authorities, get_parser, parse_document
+    from temp_janitor import save_bytes, remove_file
+
+    with _lock:
+        _status["state"] = "running"
+    pdf_path = save_bytes(tiny_pdf_bytes(), "warmup.pdf")
+    try:
+        for authority in registered_authorities():
+            _step(f"import:{authority}", lambda a=authority: get_parser(a))
+
+        def touch_camelot():
+            import camelot
+            camelot.read_pdf(pdf_path, pages="1", flavor="lattice")
+
+        def touch_tesseract():
+            import numpy as np
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            img = np.full((40, 120), 255, dtype=np.uint8)
+            pytesseract.image_to_string(img, config="--psm 7")
+
+        _step("camelot", touch_camelot)
+        _step("tesseract", touch_tesseract)
+        _step("parse:MCGM", lambda: parse_document(pdf_path, "MCGM"))
+    finally:
+        remove_file(pdf_path)
+        with _lock:
+            _status["state"] = "ready"
+
+
+def start_warmup():
+    """Start the warm-up on a background thread if TRENCH_WARMUP is set; no-op otherwise."""
+    global _thread
+    if not WARMUP_ENABLED or _thread is not None:
+        return _thread
+    _thread = threading.Thread(target=run_warmup, name="parser-warmup", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def is_ready():
+    return _status["state"] in ("disabled", "ready")
+
+
+def status():
+    with _lock:
+        return {"state": _status["state"], "steps": dict(_status["steps"])}
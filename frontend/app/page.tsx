@@ -9,6 +9,7 @@ import { SignInPage } from "@/components/auth/SignInPage"
 import { Header } from "@/components/layout/Header"
 import { AnalyticsCards } from "@/components/dashboard/AnalyticsCards"
 import { AuthorityUploadCard } from "@/components/parser/AuthorityUploadCard"
+import { ProcessingStatusCard } from "@/components/parser/ProcessingStatusCard"
 import { ResultsTable } from "@/components/results/ResultsTable"
 import { AuthoritySidebar } from "@/components/layout/AuthoritySidebar"
 import * as XLSX from "xlsx"
@@ -16,7 +17,7 @@ import LmcPage from '@/components/budget-pages/lmc'
 
 export default function Home() {
   const { user, isAuthenticated, isLoggingIn, handleMicrosoftLogin, handleLogout } = useAuth()
-  const { files, isProcessing, progress, extractedData, processingStatus, handleFileUpload, simulateProcessing } =
+  const { files, isProcessing, extractedData, processingStatus, jobIds, handleFileUpload, startJob } =
     useFileProcessing()
 
   const [activeAuthority, setActiveAuthority] = useState("kdmc")
@@ -107,7 +108,15 @@ export default function Home() {
                   files={files[selectedAuthority.id] || []}
                   isProcessing={isProcessing[selectedAuthority.id] || false}
                   onFileUpload={(e) => handleFileUpload(selectedAuthority.id, e)}
-                  onStartProcessing={() => simulateProcessing(selectedAuthority)}
+                  onStartProcessing={() => startJob(selectedAuthority)}
+                />
+              )}
+              {/* Background job of the selected authority's batch upload */}
+              {selectedAuthority && (jobIds[selectedAuthority.id] || processingStatus[selectedAuthority.id]) && (
+                <ProcessingStatusCard
+                  authority={selectedAuthority}
+                  status={processingStatus[selectedAuthority.id]}
+                  jobId={jobIds[selectedAuthority.id]}
                 />
               )}
               <ResultsTable data={extractedData} authorities={authorities} onExport={() => exportToExcel(extractedData)} />
@@ -340,27 +340,27 @@ export default function DnManagementSection() {
     setValidationResults([]);
     try {
       console.time('validateParsers');
-      // Prepare requests
-      const poForm = new FormData();
-      poForm.append("site_id", poSiteId);
-      const dnAppForm = new FormData();
-      dnAppForm.append("dn_application_file", dnAppFile);
-      const dnForm = new FormData();
-      dnForm.append("dn_file", dnFile);
-      dnForm.append("authority", dnAuthority);
-      // Fire all requests in parallel
-      const [poRes, dnAppRes, dnRes] = await Promise.all([
-        fetch("http://localhost:8000/api/parse-po", { method: "POST", body: poForm }).then(r => r.json()),
-        fetch("http://localhost:8000/api/parse-application", { method: "POST", body: dnAppForm }).then(r => r.json()),
-        fetch("http://localhost:8000/api/parse-dn", { method: "POST", body: dnForm }).then(r => r.json()),
-      ]);
+      // One dossier request: the backend parses the application and the DN and looks up the PO concurrently
+      const form = new FormData();
+      form.append("site_id", poSiteId);
+      form.append("authority", dnAuthority);
+      form.append("app_file", dnAppFile);
+      form.append("dn_file", dnFile);
+      const res = await fetch("http://localhost:8000/api/dossier", { method: "POST", body: form });
+      const dossier = await res.json();
       console.timeEnd('validateParsers');
-      // Merge results into a single array with source
-      const merged: any[] = [];
-      Object.entries(poRes).forEach(([k, v]) => merged.push({ field: k, value: v, source: "PO" }));
-      Object.entries(dnAppRes).forEach(([k, v]) => merged.push({ field: k, value: v, source: "DN Application" }));
-      Object.entries(dnRes).forEach(([k, v]) => merged.push({ field: k, value: v, source: "DN" }));
-      setValidationResults(merged);
+      if (!res.ok) {
+        setValidateError(dossier.error || "Failed to validate parsers.");
+        return;
+      }
+      if (dossier.errors && Object.keys(dossier.errors).length > 0) {
+        console.warn("[DEBUG] Dossier sources with errors:", dossier.errors);
+      }
+      if (dossier.row?.ri_budget_amount_per_meter) {
+        setRiCostPerMeter(dossier.row.ri_budget_amount_per_meter);
+      }
+      // Same {field, value, source} entries the three separate requests used to produce
+      setValidationResults(dossier.fields);
     } catch (err) {
       setValidateError("Failed to validate parsers.");
     } finally {
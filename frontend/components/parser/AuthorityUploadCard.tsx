@@ -415,16 +415,32 @@ return (
               id={`file-upload-${authority.id}`}
               type="file"
               accept=".pdf"
+              multiple
               onChange={handleFileUpload}
               className="hidden"
               disabled={!isImplemented}
             />
             {/* Show uploaded file name if present */}
-            {files.length > 0 && (
+            {files.length === 1 && (
               <div className="mt-4 text-[#6b8cbc] text-sm font-mono truncate">{files[0].name}</div>
             )}
+            {files.length > 1 && (
+              <div className="mt-4 text-[#6b8cbc] text-sm font-mono truncate">{files.length} files selected</div>
+            )}
           </div>
-          {files.length > 0 && !showManualFieldsState && (
+          {/* Several files are parsed on the server as one background job (see ProcessingStatusCard) */}
+          {files.length > 1 && (
+            <Button
+              onClick={onStartProcessing}
+              disabled={isProcessing}
+              className="w-full mt-4 bg-white hover:bg-gray-100 text-[#181e29] font-inter font-semibold flex items-center justify-center gap-2 rounded-lg border border-[#232f47] shadow-none text-base px-6 py-3 transition-colors"
+              style={{ boxShadow: "none" }}
+            >
+              {isProcessing ? <Loader2 className="animate-spin h-5 w-5 mr-2 text-black" /> : <FileText className="h-5 w-5 mr-2 text-black" />}
+              Queue {files.length} Files
+            </Button>
+          )}
+          {files.length === 1 && !showManualFieldsState && (
             <Button
               onClick={handleParseFile}
               disabled={isParsing}
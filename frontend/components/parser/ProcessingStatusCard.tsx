@@ -1,15 +1,22 @@
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Progress } from "@/components/ui/progress"
-import { Loader2 } from "lucide-react"
+import { useJobProgress } from "@/hooks/useJobProgress"
 import type { AuthorityConfig } from "@/types"
 
 interface ProcessingStatusCardProps {
   authority: AuthorityConfig
-  status: string
-  progress: number
+  status?: string
+  progress?: number
+  // Background job to follow (see submitJobToBackend); its streamed status replaces status/progress
+  jobId?: string | null
 }
 
-export function ProcessingStatusCard({ authority, status, progress }: ProcessingStatusCardProps) {
+export function ProcessingStatusCard({ authority, status = "", progress = 0, jobId }: ProcessingStatusCardProps) {
+  const job = useJobProgress(jobId)
+  const shownStatus = job ? job.status : status
+  const shownProgress = job ? job.progress : progress
+  const failed = job ? job.items.filter((item) => item.state === "failed") : []
+
   return (
     <Card className="border border-[#232f47] bg-[#181e29]">
       <CardHeader className="pb-2">
@@ -20,10 +27,27 @@ export function ProcessingStatusCard({ authority, status, progress }: Processing
       <CardContent className="space-y-4">
         <div className="space-y-3">
           <div className="flex justify-between text-sm text-gray-300">
-            <span>{status}</span>
-            <span className="font-medium">{Math.round(progress)}%</span>
+            <span>{shownStatus}</span>
+            <span className="font-medium">{Math.round(shownProgress)}%</span>
           </div>
-          <Progress value={progress} className="w-full h-2 bg-[#232f47]" />
+          <Progress value={shownProgress} className="w-full h-2 bg-[#232f47]" />
+          {job && job.kind === "dn" && (job.state === "done" || job.state === "failed") && job.counts.done > 0 && (
+            <a
+              href={`http://localhost:8000/api/jobs/${job.job_id}/output`}
+              className="inline-block text-sm font-medium text-white underline"
+            >
+              Download Non-Refundable and SD workbooks
+            </a>
+          )}
+          {failed.length > 0 && (
+            <ul className="text-xs text-red-400 space-y-1">
+              {failed.map((item) => (
+                <li key={item.idx}>
+                  {item.filename}: {item.error}
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
       </CardContent>
     </Card>
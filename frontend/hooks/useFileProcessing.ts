@@ -8,9 +8,9 @@ import type { ExtractedData, AuthorityConfig } from "@/types"
 export function useFileProcessing() {
   const [files, setFiles] = useState<{ [key: string]: File[] }>({})
   const [isProcessing, setIsProcessing] = useState<{ [key: string]: boolean }>({})
-  const [progress, setProgress] = useState<{ [key: string]: number }>({})
-  const [extractedData, setExtractedData] = useState<ExtractedData[]>([])
+  const [extractedData] = useState<ExtractedData[]>([])
   const [processingStatus, setProcessingStatus] = useState<{ [key: string]: string }>({})
+  const [jobIds, setJobIds] = useState<{ [key: string]: string }>({})
 
   const handleFileUpload = (authorityId: string, event: React.ChangeEvent<HTMLInputElement>) => {
     const selectedFiles = Array.from(event.target.files || [])
@@ -18,43 +18,31 @@ export function useFileProcessing() {
       ...prev,
       [authorityId]: selectedFiles,
     }))
+    // A new selection starts over: forget the previous batch's job and status
+    setJobIds((prev) => {
+      const { [authorityId]: _, ...rest } = prev
+      return rest
+    })
+    setProcessingStatus((prev) => {
+      const { [authorityId]: _, ...rest } = prev
+      return rest
+    })
   }
 
-  const simulateProcessing = async (authority: AuthorityConfig) => {
+  // Queue every selected file of an authority as one background job; ProcessingStatusCard follows it by jobId
+  const startJob = async (authority: AuthorityConfig) => {
+    const selected = files[authority.id] || []
+    if (!selected.length) return
     setIsProcessing((prev) => ({ ...prev, [authority.id]: true }))
-    setProgress((prev) => ({ ...prev, [authority.id]: 0 }))
-
-    for (let i = 0; i < authority.processingSteps.length; i++) {
-      setProcessingStatus((prev) => ({ ...prev, [authority.id]: authority.processingSteps[i] }))
-      setProgress((prev) => ({ ...prev, [authority.id]: (i + 1) * (100 / authority.processingSteps.length) }))
-      await new Promise((resolve) => setTimeout(resolve, 1200))
+    setProcessingStatus((prev) => ({ ...prev, [authority.id]: "Uploading..." }))
+    try {
+      const jobId = await submitJobToBackend({ authority: authority.id, files: selected })
+      setJobIds((prev) => ({ ...prev, [authority.id]: jobId }))
+    } catch (err) {
+      setProcessingStatus((prev) => ({ ...prev, [authority.id]: String(err) }))
+    } finally {
+      setIsProcessing((prev) => ({ ...prev, [authority.id]: false }))
     }
-
-    // Simulate extracted data
-    const mockData: ExtractedData[] = [
-      {
-        id: `${authority.id}-${Date.now()}`,
-        authority: authority.name,
-        demandNoteNumber: `${authority.name.toUpperCase()}-2024-${Math.floor(Math.random() * 1000)
-          .toString()
-          .padStart(3, "0")}`,
-        municipality: authority.fullName,
-        projectLocation: "Main Infrastructure Project Site",
-        trenchingType: "Utility Installation & Road Development",
-        permitNumber: `PRM-${Math.floor(Math.random() * 10000)}`,
-        applicantName: "Cloud_Extel Infrastructure Solutions",
-        contactInfo: "permits@cloudextel.com",
-        workDescription: `${authority.name} approved infrastructure development project`,
-        estimatedCost: `₹${(Math.random() * 500000 + 100000).toFixed(0)}`,
-        dueDate: new Date(Date.now() + Math.random() * 30 * 24 * 60 * 60 * 1000).toISOString().split("T")[0],
-        status: Math.random() > 0.3 ? "Approved" : "Under Review",
-        confidence: Math.random() * 10 + 90,
-        extractedAt: new Date().toISOString(),
-      },
-    ]
-
-    setExtractedData((prev) => [...prev, ...mockData])
-    setIsProcessing((prev) => ({ ...prev, [authority.id]: false }))
   }
 
   // New: Connect to FastAPI backend
@@ -94,11 +82,11 @@ export function useFileProcessing() {
   return {
     files,
     isProcessing,
-    progress,
     extractedData,
     processingStatus,
+    jobIds,
     handleFileUpload,
-    simulateProcessing,
+    startJob,
     processWithBackend,
   }
 }
@@ -196,3 +184,31 @@ export const processSDWithBackend = async ({
   a.remove();
   window.URL.revokeObjectURL(url);
 };
+
+// Background job: the files are queued on the server and parsed there, so a dropped connection loses nothing.
+// Returns the job id; follow it with ProcessingStatusCard (jobId prop) and download the workbooks from
+// /api/jobs/{jobId}/output once it has finished.
+export const submitJobToBackend = async ({
+  authority,
+  files,
+  kind = "dn",
+}: {
+  authority: string;
+  files: File[];
+  kind?: "dn" | "cost";
+}): Promise<string> => {
+  const formData = new FormData();
+  formData.append("authority", authority);
+  formData.append("kind", kind);
+  files.forEach((file) => formData.append("files", file));
+
+  const response = await fetch("http://localhost:8000/api/jobs", {
+    method: "POST",
+    body: formData,
+  });
+  if (!response.ok) {
+    throw new Error("Failed to queue files: " + (await response.text()));
+  }
+  const { job_id } = await response.json();
+  return job_id;
+};
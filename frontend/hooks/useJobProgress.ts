@@ -0,0 +1,38 @@
+"use client"
+
+import { useEffect, useState } from "react"
+
+export interface JobStatus {
+  job_id: string
+  kind: string
+  authority: string
+  state: "pending" | "running" | "done" | "failed"
+  total: number
+  counts: { pending: number; running: number; done: number; failed: number }
+  progress: number
+  status: string
+  items: { idx: number; filename: string; state: string; attempts: number; error: string | null }[]
+}
+
+// Follows a background ingestion job over Server-Sent Events (/api/jobs/{jobId}/events).
+// EventSource reconnects on its own after a dropped connection; the server replays the current status.
+export function useJobProgress(jobId: string | null | undefined) {
+  const [job, setJob] = useState<JobStatus | null>(null)
+
+  useEffect(() => {
+    if (!jobId) {
+      setJob(null)
+      return
+    }
+    const source = new EventSource(`http://localhost:8000/api/jobs/${jobId}/events`)
+    const onStatus = (event: MessageEvent) => setJob(JSON.parse(event.data))
+    source.addEventListener("progress", onStatus)
+    source.addEventListener("done", (event) => {
+      onStatus(event as MessageEvent)
+      source.close()
+    })
+    return () => source.close()
+  }, [jobId])
+
+  return job
+}
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the detector
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers.detection import _decide, detect_authority, resolve_authority, score_text
+
+MIDC_LETTER = "MAHARASHTRA INDUSTRIAL DEVELOPMENT CORPORATION No.EE/Dn.II/MHP/Eoffice/I/ "
+
+
+def _make_pdf(path, page_texts):
+    import fitz
+    doc = fitz.open()
+    for text in page_texts:
+        doc.new_page().insert_text((50, 72), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_score_text_matches_the_letterhead():
+    scores = score_text("Municipal   Corporation of\nGreater Mumbai  - Online Trenches")
+    assert set(scores) == {"MCGM"}
+    assert scores["MCGM"] > 0.95
+
+
+def test_score_text_tells_midc_types_apart_by_length():
+    type1 = score_text(MIDC_LETTER + "0.375 KM X RS 5000")
+    type2 = score_text(MIDC_LETTER + "4.765 KM X RS 5000")
+    assert type1["MIDCTYPE1"] > type1["MIDCTYPE2"]
+    assert type2["MIDCTYPE2"] > type2["MIDCTYPE1"]
+
+
+def test_score_text_without_signatures():
+    assert score_text("Quarterly report of the housing society") == {}
+
+
+def test_decide_discounts_a_rival_corporation_but_not_the_other_midc_type():
+    assert _decide({}) == (None, 0.0)
+    assert _decide({"MCGM": 0.9, "NMMC": 0.5}) == ("MCGM", 0.45)
+    assert _decide({"MIDCTYPE1": 0.9, "MIDCTYPE2": 0.8}) == ("MIDCTYPE1", 0.9)
+
+
+def test_detect_authority_from_the_text_layer(tmp_path):
+    pdf = _make_pdf(tmp_path / "dn.pdf", ["Municipal Corporation of Greater Mumbai - Online Trenches", "Terms"])
+    result = detect_authority(pdf)
+    assert (result["authority"], result["source"]) == ("MCGM", "text")
+    assert result["confidence"] > 0.95
+
+
+def test_resolve_authority(tmp_path):
+    pdf = _make_pdf(tmp_path / "dn.pdf", ["Municipal Corporation of Greater Mumbai - Online Trenches"])
+    assert resolve_authority(pdf, "nmmc") == "NMMC"
+    assert resolve_authority(pdf, "auto") == "MCGM"
+    assert resolve_authority(pdf, "Pune") == "MCGM"
+    unknown = _make_pdf(tmp_path / "other.pdf", ["Quarterly report of the housing society"])
+    with pytest.raises(ValueError):
+        resolve_authority(unknown)
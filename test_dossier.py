@@ -0,0 +1,114 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the dossier builder
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+import dossier
+
+PO_ROW = {
+    "route_type": "Metro LM", "route_id_site_id": "MU-1608", "uid": "U-77", "parent_route": "HH-12",
+    "po_no_cobuild": "10004771", "po_length_cobuild": "250", "po_no_ip1": "20009999", "po_length_ip1": "900",
+}
+DN = {
+    "Demand Note Reference number": "783339141", "Section Length": "130", "Demand Note Date": "12/03/2025",
+    "Ground Rent": "1,000", "Administrative Charge": "500", "RI Amount": "12,000", "Supervision Charges": "",
+    "GST Amount": "270", "SD Amount": "5,000",
+}
+APPLICATION = {"Application Number": "APP-42", "Authority": "MCGM", "From": "A", "To": "B"}
+
+
+@pytest.mark.parametrize("route_type, po_no, po_length", [
+    ("Metro LM", "10004771", "250"),
+    ("LMC (Standalone)", "10004771", "250"),
+    ("Route", "20009999", "900"),
+    ("FTTH", "", ""),
+])
+def test_po_fields_from_row_picks_columns_by_route_type(route_type, po_no, po_length):
+    fields = dossier.po_fields_from_row(dict(PO_ROW, route_type=route_type), "MU-1608")
+    assert (fields["PO No"], fields["PO Length (Mtr)"], fields["Category"]) == (po_no, po_length, route_type)
+    assert (fields["SiteID"], fields["UID"], fields["Parent Route Name / HH"]) == ("MU-1608", "U-77", "HH-12")
+
+
+def test_po_fields_from_row_cleans_placeholders():
+    fields = dossier.po_fields_from_row({"route_type": "Route", "po_no_ip1": "nan", "uid": "-"}, "MU-1")
+    assert (fields["PO No"], fields["UID"], fields["SiteID"]) == ("", "", "MU-1")
+
+
+def test_derived_fields():
+    row = {"dn_length_mtr": "100", "ground_rent": "1,000", "administrative_charge": "500", "dn_ri_amount": "12,000",
+           "supervision_charges": "", "chamber_fee": "", "gst": "270", "deposit": "5,000"}
+    assert dossier.derived_fields(row, "150") == {
+        "ri_budget_amount_per_meter": "150",
+        "projected_budget_ri_amount_dn": "15000",
+        "actual_total_non_refundable": "13500",
+        "non_refundable_amount_per_mtr": "135",
+        "proj_non_refundable_savings_per_mtr": "15",
+        "proj_savings_per_dn": "1500",
+        "total_dn_amount": "18770",
+    }
+    # Without a length or a budget the per-metre figures stay empty
+    derived = dossier.derived_fields(dict(row, dn_length_mtr=""), None)
+    assert derived["actual_total_non_refundable"] == "13500"
+    assert derived["non_refundable_amount_per_mtr"] == derived["ri_budget_amount_per_meter"] == ""
+
+
+def test_budget_cache_reloads_after_ttl(monkeypatch):
+    loads = []
+    cache = dossier.BudgetCache(ttl=60)
+    monkeypatch.setattr(cache, "_load", lambda: loads.append(1) or {"mu-1608": 150})
+    assert cache.get(" MU-1608 ") == 150
+    assert cache.get("MU-9999") is None
+    assert len(loads) == 1
+    cache._loaded -= 61
+    cache.get("MU-1608")
+    cache.invalidate()
+    cache.get("MU-1608")
+    assert len(loads) == 3
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """The PO lookup, the two PDF parsers and the budget cache answering from the constants above."""
+    calls = {}
+
+    def record(name, value):
+        def source(*args):
+            calls[name] = args
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return source
+    monkeypatch.setattr(dossier, "po_fields", record("PO", dossier.po_fields_from_row(PO_ROW, "MU-1608")))
+    monkeypatch.setattr(dossier, "_application_fields", record("DN Application", APPLICATION))
+    monkeypatch.setattr(dossier, "dn_fields", record("DN", DN))
+    monkeypatch.setattr(dossier.budget_cache, "get", record("Budget", "150"))
+    return record, calls
+
+
+def test_build_dossier_assembles_one_row(sources):
+    _, calls = sources
+    result = dossier.build_dossier("MU-1608", "app.pdf", "dn.pdf", "MCGM")
+    row = result["row"]
+    assert result["errors"] == {}
+    assert calls == {"PO": ("MU-1608",), "DN Application": ("app.pdf",), "DN": ("dn.pdf", "MCGM"), "Budget": ("MU-1608",)}
+    assert (row["po_number"], row["application_number"], row["dn_number"]) == ("10004771", "APP-42", "783339141")
+    assert row["dn_length_mtr"] == row["ot_length"] == "130"
+    assert row["supervision_charges"] == "" and row["project_name"] == dossier.HARDCODED["project_name"]
+    assert row["actual_total_non_refundable"] == "13500"
+    assert row["projected_budget_ri_amount_dn"] == "19500"
+    assert {"field": "Application Number", "value": "APP-42", "source": "DN Application"} in result["fields"]
+
+
+def test_build_dossier_reports_failing_sources(sources, monkeypatch):
+    record, _ = sources
+    monkeypatch.setattr(dossier, "po_fields", record("PO", {"error": "No matching row found in po_master."}))
+    monkeypatch.setattr(dossier, "dn_fields", record("DN", ValueError("Could not detect the authority")))
+    result = dossier.build_dossier("MU-1608", "app.pdf", "dn.pdf")
+    assert result["errors"] == {
+        "PO": "No matching row found in po_master.", "DN": "Could not detect the authority",
+    }
+    row = result["row"]
+    assert (row["route_id_site_id"], row["po_number"], row["dn_number"]) == ("MU-1608", "", "")
+    assert row["application_number"] == "APP-42"
@@ -0,0 +1,110 @@
+import io
+import os
+import sys
+
+import openpyxl
+import pytest
+
+# Add the backend directory to the Python path so we can import the output module
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from excel_output import (
+    BLUE_HEADERS_NON_REFUNDABLE, BLUE_HEADERS_SD, NON_REFUNDABLE, SD, BatchOutput, ConsolidatedWorkbook,
+    OutputTemplate, get_template, output_filename, workbook_bytes,
+)
+from parsers.mcgm import HEADERS as NON_REFUNDABLE_HEADERS
+from parsers.rows import SD_HEADERS
+
+YELLOW = "FFFFFF00"
+BLUE = "FFB7E1FA"
+HEADERS = ["Demand Note Reference number", "GO RATE", "SD Amount", "PO No."]
+
+
+def _sheet(data):
+    return openpyxl.load_workbook(io.BytesIO(data)).active
+
+
+def _header_fills(sheet):
+    return {cell.value: cell.fill.fgColor.rgb for cell in sheet[1]}
+
+
+def test_workbook_bytes_header_formats():
+    template = OutputTemplate(NON_REFUNDABLE, ["GO RATE", "PO No."])
+    sheet = _sheet(workbook_bytes(HEADERS, [["783339141", "10187", "137524.5", ""]], template))
+    assert _header_fills(sheet) == {
+        "Demand Note Reference number": YELLOW, "GO RATE": BLUE, "SD Amount": YELLOW, "PO No.": BLUE,
+    }
+    assert all(cell.font.b for cell in sheet[1])
+
+
+def test_workbook_bytes_keeps_text_and_blanks():
+    rows = [["783339141", "10187.00", "", None], ["0042", "", "1,23,456", "10004771"]]
+    sheet = _sheet(workbook_bytes(HEADERS, rows))
+    values = [[cell.value for cell in row] for row in sheet.iter_rows(min_row=2)]
+    # strings_to_numbers is off, so figures stay as the parser wrote them
+    assert values == [["783339141", "10187.00", None, None], ["0042", None, "1,23,456", "10004771"]]
+
+
+def test_workbook_bytes_pads_short_rows():
+    sheet = _sheet(workbook_bytes(HEADERS, [["783339141"]]))
+    assert sheet.max_column == len(HEADERS)
+    assert [cell.value for cell in sheet[2]] == ["783339141", None, None, None]
+
+
+def test_template_header_styles_are_cached():
+    template = OutputTemplate(SD, ["PO No."])
+    first = template.header_styles(HEADERS)
+    assert first == (False, False, False, True)
+    assert template.header_styles(list(HEADERS)) is first
+
+
+def test_consolidated_workbook_maps_rows_by_header_name():
+    buffer = io.BytesIO()
+    workbook = ConsolidatedWorkbook(buffer, get_template("MCGM", NON_REFUNDABLE))
+    workbook.add_row(HEADERS, ["A-1", "100", "5", "PO1"])
+    workbook.add_row(["PO No.", "Demand Note Reference number"], ["PO2", "A-2"])
+    workbook.close()
+    workbook.close()
+    sheet = _sheet(buffer.getvalue())
+    assert [cell.value for cell in sheet[1]] == HEADERS
+    assert [[cell.value for cell in row] for row in sheet.iter_rows(min_row=2)] == [
+        ["A-1", "100", "5", "PO1"], ["A-2", None, None, "PO2"],
+    ]
+    assert _header_fills(sheet)["GO RATE"] == BLUE
+
+
+def test_mcgm_template_blue_headers():
+    assert get_template("MCGM", NON_REFUNDABLE).blue_headers == frozenset(BLUE_HEADERS_NON_REFUNDABLE)
+    assert "NFA no." in get_template("mcgm", SD).blue_headers
+
+
+def test_output_filename():
+    assert output_filename("783339141", NON_REFUNDABLE) == "783339141_Non Refundable Output.xlsx"
+    assert output_filename("783339141", SD) == "783339141_SD Output.xlsx"
+
+
+@pytest.mark.parametrize("authority", [
+    None, "auto", "AUTO", "MCGM", "MBMC", "NMMC", "KDMC", "MIDC-TYPE1", "MIDC-TYPE2", "midc_type1",
+])
+def test_batch_output_blue_headers_for_every_authority(authority):
+    non_ref, sd = io.BytesIO(), io.BytesIO()
+    with BatchOutput(non_ref, sd, authority) as batch:
+        batch.add(
+            NON_REFUNDABLE_HEADERS, [""] * len(NON_REFUNDABLE_HEADERS), SD_HEADERS, [""] * len(SD_HEADERS),
+            None if authority in (None, "auto", "AUTO") else authority,
+        )
+    for data, blue in ((non_ref.getvalue(), BLUE_HEADERS_NON_REFUNDABLE), (sd.getvalue(), BLUE_HEADERS_SD)):
+        fills = _header_fills(_sheet(data))
+        assert {h for h, fill in fills.items() if fill == BLUE} == set(blue) & set(fills)
+        assert all(fill in (BLUE, YELLOW) for fill in fills.values())
+
+
+def test_batch_output_label_names_the_parsed_authorities():
+    with BatchOutput(io.BytesIO(), io.BytesIO(), "auto") as batch:
+        assert batch.label == "DN"
+        batch.add(HEADERS, ["A-1"], authority="MIDC-TYPE1")
+        batch.add(HEADERS, ["A-2"], authority="NMMC")
+        batch.add(HEADERS, ["A-3"], authority="midc type1")
+    assert batch.label == "MIDCTYPE1_NMMC"
+    with BatchOutput(io.BytesIO(), io.BytesIO(), "MCGM") as batch:
+        batch.add(HEADERS, ["A-1"])
+    assert batch.label == "MCGM"
@@ -0,0 +1,112 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the field extraction helpers
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+import debug_artifacts
+import dossier
+from parsers import mcgm, registry
+from parsers.context import ExtractionContext
+from parsers.fields import Field, artifacts_for, extract_fields, parse_field_list, resolve_field
+
+MCGM_PDF = os.path.join(os.path.dirname(__file__), "MCGM Type 2", "Online Trenches No_0783339141 Demand Note.PDF")
+
+# A parser with a field-level test dump that leaves its page text in the debug store
+DUMP_PARSER = '''
+HEADERS = ["Demand Note Reference number"]
+
+
+def build_non_refundable_row(ctx, manual_values=None):
+    return [ctx.text.split()[0]]
+
+
+def extract_all_fields_for_testing(pdf_path, ctx=None):
+    ctx.debug_text("page_text", ctx.text)
+    return {"Demand Note Reference number": ctx.text.split()[0], "Pages": ctx.page_count}
+'''
+
+
+def _make_pdf(path, page_texts):
+    import fitz
+    doc = fitz.open()
+    for text in page_texts:
+        doc.new_page().insert_text((50, 72), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_parse_field_list():
+    assert parse_field_list(None) is None
+    assert parse_field_list("") is None
+    assert parse_field_list("dn_number, ri_cost,,") == ["dn_number", "ri_cost"]
+    assert parse_field_list('["dn_number", "GST Amount"]') == ["dn_number", "GST Amount"]
+    assert resolve_field("dn_number") == "Demand Note Reference number"
+    assert resolve_field("GST Amount") == "GST Amount"
+
+
+def test_artifacts_for_keeps_first_use_order():
+    parser = SimpleNamespace(FIELDS={
+        "Demand Note Reference number": Field(("text",), None),
+        "GST Amount": Field(("lattice:1", "text"), None),
+    })
+    assert artifacts_for(parser, ["GST Amount", "dn_number", "sd_amount"]) == ["lattice:1", "text"]
+
+
+def test_extract_fields_declared_static_manual_and_fallback(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return ["DN-1", "100", "MCGM"]
+
+    # Parsers memoise their row on the context, so fallbacks build it once
+    def row(ctx, manual_values=None):
+        return list(ctx.memo("fake:non_refundable_row", build))
+    parser = SimpleNamespace(
+        HEADERS=["Demand Note Reference number", "GST Amount", "Authority"],
+        FIELDS={"Demand Note Reference number": Field(("text",), lambda ctx: ctx.text.split()[0])},
+        STATIC_VALUES={"Authority": "MCGM"},
+        build_non_refundable_row=row,
+    )
+    ctx = ExtractionContext(_make_pdf(tmp_path / "dn.pdf", ["DN-7 charges"]))
+    fields = extract_fields(parser, ctx, ["dn_number", "authority", "GST Amount"], {"GST Amount": "5"})
+    assert fields == {"dn_number": "DN-7", "authority": "MCGM", "GST Amount": "5"}
+    assert calls == []
+    assert extract_fields(parser, ctx, ["GST Amount", "gst_amount"]) == {"GST Amount": "100", "gst_amount": "100"}
+    assert calls == [1]
+
+
+@pytest.mark.skipif(not os.path.exists(MCGM_PDF), reason="MCGM sample not available")
+def test_extract_fields_matches_full_row():
+    fields = extract_fields(mcgm, ExtractionContext(MCGM_PDF), list(mcgm.FIELDS) + ["authority"])
+    row = mcgm.build_non_refundable_row(ExtractionContext(MCGM_PDF))
+    for name, value in fields.items():
+        header = "Authority" if name == "authority" else name
+        assert value == row[mcgm.HEADERS.index(header)], name
+
+
+def test_extract_fields_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        extract_fields(mcgm, None, ["not_a_field"])
+
+
+def test_dn_fields_dump_keeps_debug_text(tmp_path, monkeypatch):
+    (tmp_path / "fake_dump_parser.py").write_text(DUMP_PARSER)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(registry, "PARSER_MODULES", dict(registry.PARSER_MODULES))
+    monkeypatch.setattr(registry, "_loaded", {})
+    monkeypatch.delitem(sys.modules, "fake_dump_parser", raising=False)
+    monkeypatch.setattr(debug_artifacts, "DEBUG_ROOT", str(tmp_path / "debug"))
+    registry.register_parser("FAKEDUMP", "fake_dump_parser")
+
+    pdf = _make_pdf(tmp_path / "dn.pdf", ["DN-3 first page", "second page"])
+    store = debug_artifacts.new_store(True)
+    assert dossier.dn_fields(pdf, "fakedump", debug=store) == {"Demand Note Reference number": "DN-3", "Pages": 2}
+    store.flush()
+    assert debug_artifacts.list_artifacts(store.run_id) == ["dn_page_text.txt"]
+    # Without a store nothing is kept
+    assert dossier.dn_fields(pdf, "FAKEDUMP")["Pages"] == 2
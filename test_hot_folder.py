@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the hot folder indexer
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+import hot_folder
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Placemark><name>Trench</name>
+<LineString><coordinates>72.8400,19.0500,0 72.8410,19.0500,0</coordinates></LineString>
+</Placemark></Document></kml>
+"""
+
+
+@pytest.fixture
+def hot_folder_tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(hot_folder, "HOT_FOLDER_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(hot_folder, "HOT_FOLDER_DB", str(tmp_path / "state" / "manifest.sqlite3"))
+    root = tmp_path / "sites"
+    for site in ("MU-1001", "MU-1002"):
+        (root / site).mkdir(parents=True)
+        (root / site / "route.kml").write_text(KML)
+    return root
+
+
+@pytest.mark.parametrize("name, doc_type", [
+    ("route.KMZ", hot_folder.ROUTE_KML),
+    ("Key plan.pptx", hot_folder.DRAWING),
+    ("Non-refundable request.xlsb", hot_folder.DN_TEMPLATE),
+    ("ROW Application 1234.pdf", hot_folder.APPLICATION),
+    ("MU-1608 Demand Note.pdf", hot_folder.DEMAND_NOTE),
+    ("MU_1608_DN.pdf", hot_folder.DEMAND_NOTE),
+    ("PO 10004771.pdf", hot_folder.PURCHASE_ORDER),
+    ("Permission letter.pdf", hot_folder.PERMIT),
+    ("scan_0001.pdf", hot_folder.UNKNOWN),
+])
+def test_classify_name(name, doc_type):
+    assert hot_folder.classify_name(name) == doc_type
+
+
+def test_classify_text_and_site_of(tmp_path):
+    assert hot_folder.classify_text("Sub: Demand Note for laying OFC") == hot_folder.DEMAND_NOTE
+    assert hot_folder.classify_text("") == hot_folder.UNKNOWN
+    root = str(tmp_path)
+    assert hot_folder.site_of(os.path.join(root, "MU-1001", "dn", "a.pdf"), [root]) == "MU-1001"
+    assert hot_folder.site_of(os.path.join(root, "loose.pdf"), [root]) == ""
+    assert hot_folder.site_of("/elsewhere/MU-1001/a.pdf", [root]) == ""
+
+
+def test_hot_folder_scan_is_incremental(hot_folder_tree):
+    first = hot_folder.scan([str(hot_folder_tree)], max_workers=1)
+    # The second site holds a copy of the first site's survey, so it reuses the parsed result
+    assert (first["seen"], first["parsed"], first["reused"], first["failed"]) == (2, 1, 1, 0)
+    second = hot_folder.scan([str(hot_folder_tree)], max_workers=1)
+    assert (second["seen"], second["unchanged"], second["parsed"], second["reused"]) == (2, 2, 0, 0)
+    files = hot_folder.site_files("MU-1002")
+    assert len(files) == 1 and files[0]["state"] == "done"
+    assert files[0]["sha256"] == hot_folder.file_sha256(str(hot_folder_tree / "MU-1002" / "route.kml"))
+
+
+def test_hot_folder_scan_picks_up_changes_and_removals(hot_folder_tree):
+    hot_folder.scan([str(hot_folder_tree)], max_workers=1)
+    (hot_folder_tree / "MU-1001" / "route.kml").write_text(KML.replace("72.8410", "72.84205"))
+    os.remove(hot_folder_tree / "MU-1002" / "route.kml")
+    stats = hot_folder.scan([str(hot_folder_tree)], max_workers=1)
+    assert (stats["seen"], stats["parsed"], stats["removed"]) == (1, 1, 1)
+    assert hot_folder.site_files("MU-1002") == []
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the job queue
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+import jobs
+
+
+@pytest.fixture
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(jobs, "JOBS_DB", str(tmp_path / "jobs" / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "_initialised", False)
+    return tmp_path
+
+
+def _uploads(tmp_path, count):
+    uploads = []
+    for i in range(count):
+        path = tmp_path / f"upload_{i}.pdf"
+        path.write_bytes(b"%PDF-1.4")
+        uploads.append((f"dn_{i}.pdf", str(path)))
+    return uploads
+
+
+def test_jobs_submit_and_claim_in_order(jobs_db):
+    job_id = jobs.submit("dn", "MCGM", _uploads(jobs_db, 2))
+    first = jobs._claim(owner="a")
+    second = jobs._claim(owner="b")
+    assert (first["job_id"], first["idx"], first["filename"], first["kind"]) == (job_id, 0, "dn_0.pdf", "dn")
+    assert second["idx"] == 1
+    assert jobs._claim(owner="c") is None
+    assert os.path.exists(first["path"]) and not os.path.exists(jobs_db / "upload_0.pdf")
+
+
+def test_jobs_submit_rejects_unknown_kind(jobs_db):
+    with pytest.raises(ValueError):
+        jobs.submit("invoice", None, _uploads(jobs_db, 1))
+
+
+def test_jobs_finish_closes_the_job(jobs_db):
+    job_id = jobs.submit("dn", None, _uploads(jobs_db, 1))
+    item = jobs._claim(owner="a")
+    jobs._finish(item, result=[{"row": [1]}], owner="a")
+    status = jobs.status(job_id)
+    assert status["state"] == jobs.DONE and status["progress"] == 100.0
+    assert status["status"] == "Finished: 1 parsed, 0 failed"
+    assert jobs.results(job_id) == [{"index": 0, "filename": "dn_0.pdf", "state": jobs.DONE, "result": [{"row": [1]}]}]
+    assert not os.path.exists(item["path"])
+
+
+def test_jobs_failed_items_keep_their_upload_and_can_be_retried(jobs_db):
+    job_id = jobs.submit("dn", None, _uploads(jobs_db, 2))
+    failed = jobs._claim(owner="a")
+    assert jobs.status(job_id)["status"] == "Parsing dn_0.pdf (0/2 done)"
+    jobs._finish(failed, error="bad scan", owner="a")
+    jobs._finish(jobs._claim(owner="a"), result=[], owner="a")
+    assert jobs.status(job_id)["state"] == jobs.FAILED
+    assert jobs.results(job_id)[0]["error"] == "bad scan"
+    assert os.path.exists(failed["path"])
+
+    assert jobs.retry(job_id) == 1
+    assert jobs.status(job_id)["state"] == jobs.RUNNING
+    again = jobs._claim(owner="b")
+    assert (again["idx"], again["path"]) == (0, failed["path"])
+    assert jobs.retry("no-such-job") is None
+    assert jobs.status("no-such-job") is None and jobs.results("no-such-job") is None
+
+
+def test_jobs_recover_resets_only_dead_workers(jobs_db):
+    jobs.submit("dn", None, _uploads(jobs_db, 2))
+    dead = jobs._claim(owner="dead")
+    live = jobs._claim(owner="live")
+    with jobs._db() as conn:
+        conn.execute("UPDATE items SET heartbeat = ? WHERE owner = ?", (time.time() - 3600, "dead"))
+    assert jobs.recover(lease_seconds=60) == 1
+    again = jobs._claim(owner="new")
+    assert again["idx"] == dead["idx"]
+    # The dead worker's late result is dropped; the live worker keeps its item
+    jobs._finish(dead, result=[], owner="dead")
+    jobs._finish(live, result=[], owner="live")
+    with jobs._db() as conn:
+        states = dict(conn.execute("SELECT idx, state FROM items ORDER BY idx").fetchall())
+    assert states == {dead["idx"]: jobs.RUNNING, live["idx"]: jobs.DONE}
@@ -0,0 +1,157 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the template helpers
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers import templates
+from parsers.context import ExtractionContext
+from parsers.kdmc import locate_charge_cells
+from parsers.templates import TemplateStore, detect_grid, fingerprint, page_words, read_cells, words_to_text
+
+ANCHORS = ("Demand", "Table")
+# A text-layer page: two anchors and a value at a known spot, in points on a 600 x 800 page
+PAGE = [((60, 80), "Demand Note No. 24"), ((60, 200), "Table of charges"), ((400, 300), "15,32,256")]
+
+
+def _make_pdf(path, lines, shift=(0, 0)):
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=600, height=800)
+    for (x, y), text in lines:
+        page.insert_text((x + shift[0], y + shift[1]), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TemplateStore("KDMC", directory=str(tmp_path / "templates"))
+
+
+def test_page_words_and_text_from_text_layer(tmp_path):
+    ctx = ExtractionContext(_make_pdf(tmp_path / "dn.pdf", PAGE))
+    words = page_words(ctx, 1)
+    assert [w[0] for w in words[:3]] == ["Demand", "Note", "No."]
+    assert all(0 <= w[1] < w[3] <= 1 and 0 <= w[2] < w[4] <= 1 for w in words)
+    assert words_to_text(words).splitlines() == ["Demand Note No. 24", "Table of charges", "15,32,256"]
+    assert page_words(ctx, 1) is words
+
+
+def test_fingerprint(tmp_path):
+    ctx = ExtractionContext(_make_pdf(tmp_path / "dn.pdf", PAGE))
+    fp = fingerprint(ctx, 1, ANCHORS + ("Missing",))
+    assert fp["page_size"] == [600, 800]
+    assert set(fp["anchors"]) == set(ANCHORS)
+    assert fp["anchors"]["Demand"][0] == pytest.approx(0.1, abs=0.001)
+    assert fp["anchors"]["Table"][1] < 200 / 800
+
+
+def test_read_cells_applies_offset(tmp_path):
+    ctx = ExtractionContext(_make_pdf(tmp_path / "dn.pdf", PAGE, shift=(30, 40)))
+    rect = (390 / 600, 285 / 800, 470 / 600, 305 / 800)
+    assert read_cells(ctx, 1, {"total": rect}) == {"total": ""}
+    assert read_cells(ctx, 1, {"total": rect}, offset=(30 / 600, 40 / 800)) == {"total": "15,32,256"}
+
+
+def test_store_records_and_matches_shifted_pages(tmp_path, store):
+    fp = fingerprint(ExtractionContext(_make_pdf(tmp_path / "a.pdf", PAGE)), 1, ANCHORS)
+    assert store.match(fp) == (None, None)
+    template = store.record(fp, [[(0.1, 0.1, 0.5, 0.2)]], {"total": (0.6, 0.35, 0.8, 0.4)})
+    assert store.record(fp, [], {})["id"] == template["id"]
+    assert len(store.templates()) == 1
+
+    shifted = fingerprint(ExtractionContext(_make_pdf(tmp_path / "b.pdf", PAGE, shift=(6, 8))), 1, ANCHORS)
+    matched, (dx, dy) = store.match(shifted)
+    assert matched["id"] == template["id"]
+    assert (dx, dy) == (pytest.approx(0.01, abs=0.001), pytest.approx(0.01, abs=0.001))
+
+    # Same page size but the anchors moved apart, or a different page size: no match
+    skewed = dict(shifted, anchors=dict(shifted["anchors"], Table=[0.5, 0.5]))
+    assert store.match(skewed) == (None, None)
+    assert store.match(dict(fp, page_size=[595, 842])) == (None, None)
+    assert store.match(dict(fp, anchors={"Demand": fp["anchors"]["Demand"]})) == (None, None)
+
+
+def test_store_persists_and_tolerates_a_bad_file(tmp_path, store):
+    fp = {"page_size": [600, 800], "anchors": {"Demand": [0.1, 0.1]}}
+    store.record(fp, [], {"total": (0.6, 0.35, 0.8, 0.4)})
+    with open(store.path, encoding="utf-8") as f:
+        assert json.load(f)[0]["cells"] == {"total": [0.6, 0.35, 0.8, 0.4]}
+    assert os.path.basename(store.path) == "kdmc.json"
+    assert TemplateStore("kdmc", directory=os.path.dirname(store.path)).match(fp)[0] is not None
+
+    with open(store.path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert TemplateStore("kdmc", directory=os.path.dirname(store.path)).templates() == []
+
+
+def test_store_defaults_to_template_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(templates, "TEMPLATE_DIR", str(tmp_path))
+    assert TemplateStore("KDMC").path == os.path.join(str(tmp_path), "kdmc.json")
+
+
+def test_locate_charge_cells():
+    # Sr | description | length | rate | amount
+    labels = ["Sr", "Ground rent", "Supervision", "Security deposit", "Cable laying", "Total"]
+    amounts = ["Amount", "1,000", "200", "5,000", "12,345", "18,545"]
+    grid = [[(0, 0, 1, 1)] * 5 for _ in labels]
+    texts = {(r, 1): label for r, label in enumerate(labels)}
+    texts.update({(r, 4): amount for r, amount in enumerate(amounts)})
+    texts.update({(4, 2): "130", (4, 3): "94.96"})
+    assert locate_charge_cells(grid, texts) == {
+        "ground_rent": (1, 4), "supervision": (2, 4), "security_deposit": (3, 4),
+        "restoration": (4, 4), "section_length": (4, 2), "rate": (4, 3), "total": (5, 4),
+    }
+    # A total before the security deposit is not the charges total, and rows without an amount are skipped
+    assert locate_charge_cells(grid[:2], {(1, 1): "Total", (1, 4): "9"}) == {}
+    assert locate_charge_cells(grid, {(1, 1): "Ground rent", (1, 4): "-"}) == {}
+
+
+def test_detect_grid_is_an_explicit_normalised_grid(tmp_path):
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=600, height=800)
+    # 3 rows x 4 columns from (60, 200) to (540, 320); the total row's label spans the first three columns
+    for y in (200, 240, 280, 320):
+        page.draw_line((60, y), (540, y), width=1.5)
+    for x in (60, 180, 300, 420, 540):
+        page.draw_line((x, 200), (x, 280), width=1.5)
+    for x in (60, 420, 540):
+        page.draw_line((x, 280), (x, 320), width=1.5)
+    path = str(tmp_path / "grid.pdf")
+    doc.save(path)
+    doc.close()
+    grid = detect_grid(ExtractionContext(path), 1)
+    assert [len(row) for row in grid] == [4, 4, 4]
+    assert grid[2][1] is None and grid[2][2] is None
+    assert grid[0][0] == pytest.approx((0.1, 0.25, 0.3, 0.3), abs=0.01)
+    assert grid[2][0] == pytest.approx((0.1, 0.35, 0.7, 0.4), abs=0.01)
+    assert grid[2][3] == pytest.approx((0.7, 0.35, 0.9, 0.4), abs=0.01)
+
+    store = TemplateStore("kdmc", directory=str(tmp_path))
+    store.record({"page_size": [600, 800], "anchors": {}}, grid, {"total": grid[2][3]})
+    assert TemplateStore("kdmc", directory=str(tmp_path)).templates()[0]["grid"][2][1] is None
+
+
+def test_locate_charge_cells_in_a_grid_with_merged_cells():
+    # The total label spans the description, length and rate columns; the amount stays in column 4
+    rect = (0, 0, 1, 1)
+    grid = [[rect] * 5, [rect] * 5, [rect, rect, None, None, rect], [rect, rect, None, None, rect]]
+    texts = {
+        (0, 1): "Security deposit", (0, 4): "5,000",
+        (1, 1): "Cable laying", (1, 2): "130", (1, 3): "94.96", (1, 4): "12,345",
+        (2, 1): "Total", (2, 4): "17,345",
+        (3, 1): "Ground rent", (3, 4): "1,000",
+    }
+    cells = locate_charge_cells(grid, texts)
+    assert cells == {
+        "security_deposit": (0, 4), "restoration": (1, 4), "section_length": (1, 2), "rate": (1, 3),
+        "total": (2, 4), "ground_rent": (3, 4),
+    }
+    # Length and rate are not taken from positions a merged cell covers
+    grid[1] = [rect, rect, None, rect, rect]
+    assert "section_length" not in locate_charge_cells(grid, texts)
@@ -0,0 +1,61 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path so we can import the parser
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers import nmmc
+from parsers.context import ExtractionContext
+from parsers.numbers import amount_text, difference_days, sum_amounts
+
+
+def _make_pdf(path, page_texts):
+    import fitz
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_text((50, 72), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_nmmc_split_documents(tmp_path):
+    letter = "Tax Payer Navi Mumbai Municipal Corporation\nOutward No. Zone-2/266/2025\nRestoration charges"
+    invoice = "GST INVOICE\nInvoice No NMMC-2025-0042\nTotal 1,23,456.00"
+    pdf = _make_pdf(tmp_path / "nmmc.pdf", [letter, invoice, "Annexure sketch of the route", letter, invoice])
+    parts = nmmc.split_documents(ExtractionContext(pdf))
+    assert [part.page_range for part in parts] == [(0, 3), (3, 5)]
+
+
+def test_nmmc_single_document_is_not_split(tmp_path):
+    letter = "Tax Payer Navi Mumbai Municipal Corporation\nOutward No. Zone-2/266/2025\nRestoration charges"
+    pdf = _make_pdf(tmp_path / "nmmc.pdf", [letter, "GST INVOICE\nInvoice No NMMC-2025-0042"])
+    ctx = ExtractionContext(pdf)
+    assert nmmc.split_documents(ctx) == [ctx]
+
+
+def test_nmmc_demand_note_reference():
+    assert nmmc.extract_demand_note_reference("जा.क्र.नमुंमपा/परि-2/ 266 / 2025") == "NMMCZ-22662025"
+    assert nmmc.extract_demand_note_reference("Outward No. Zone-2/266/2025") == "NMMCZ-22662025"
+    assert nmmc.extract_demand_note_reference("No reference here") == ""
+
+
+def test_amount_text():
+    assert amount_text("6,24,000.00") == "624000"
+    assert amount_text("रु. १५,३२,२५६.३७ /-") == "1532256.37"
+    assert amount_text("Total Rs. 24,800/- only") == "24800"
+    assert amount_text("12,34,5") == ""
+    assert amount_text(None) == ""
+
+
+def test_sum_amounts():
+    assert sum_amounts("275130", "137524.5") == "412654.5"
+    assert sum_amounts("", None, "abc", "10") == "10"
+
+
+def test_difference_days():
+    received = (datetime.today() - timedelta(days=12)).strftime("%d/%m/%Y")
+    assert difference_days(received) == "12"
+    assert difference_days("") == ""
+    assert difference_days("2025-03-18") == ""
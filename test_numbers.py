@@ -0,0 +1,43 @@
+import os
+import sys
+
+# Add the backend directory to the Python path so we can import the number helpers
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers.numbers import amount_text, ascii_digits, format_amount, parse_amount, sum_amounts
+
+
+def test_parse_amount_groupings():
+    assert parse_amount("1,23,456.00") == 123456.0
+    assert parse_amount("12,345,678") == 12345678.0
+    assert parse_amount("Rs. 24,800/-") == 24800.0
+    assert parse_amount("₹ 1,190,400") == 1190400.0
+    assert parse_amount("१५,३२,२५६.३७") == 1532256.37
+
+
+def test_parse_amount_rejects_bad_ocr_grouping():
+    assert parse_amount("12,34,5") is None
+    assert parse_amount("1,2345") is None
+    assert parse_amount("24,800 and 500") is None
+    assert parse_amount("") is None
+    assert parse_amount(None) is None
+
+
+def test_format_amount():
+    assert format_amount(1215200.0) == "1215200"
+    assert format_amount(1215200.5) == "1215200.5"
+    assert format_amount(1532256.374) == "1532256.37"
+    assert format_amount(None) == ""
+
+
+def test_amount_text_takes_the_first_figure():
+    assert amount_text("6,24,000.00") == "624000"
+    assert amount_text("रु. १५,३२,२५६.३७ /-") == "1532256.37"
+    assert amount_text("Total Rs. 2,75,130 only") == "275130"
+    assert amount_text("nil") == ""
+    assert amount_text(None) == ""
+    assert ascii_digits("दि. २५/०४/२०२५") == "दि. 25/04/2025"
+
+
+def test_sum_amounts_skips_blanks_and_text():
+    assert sum_amounts("236203", "", None, "0.5", "n/a") == "236203.5"
+    assert sum_amounts() == "0"
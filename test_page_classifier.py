@@ -0,0 +1,45 @@
+import os
+import sys
+
+# Add the backend directory to the Python path so we can import the classifier
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers.page_classifier import ANNEXURE, CHARGES_TABLE, COVER_LETTER, TERMS, UNKNOWN, classify_document, classify_text
+
+
+def test_classify_text_cover_letter():
+    text = "To,\nThe Executive Engineer\nSub: Permission for trenching\nRef: Your letter dated 12/03/2025"
+    assert classify_text(text) == (COVER_LETTER,)
+
+
+def test_classify_text_charges_table():
+    text = "Rate per metre 10187.00\nReinstatement Charges 2,75,130\nGST 0.00\nTotal Amount Rs. 4,12,654.50"
+    assert CHARGES_TABLE in classify_text(text)
+
+
+def test_classify_text_terms():
+    text = "\n".join(f"{i}) The applicant shall restore the road" for i in range(1, 7))
+    assert classify_text(text) == (TERMS,)
+
+
+def test_classify_text_annexure_and_unknown():
+    assert classify_text("Annexure A - Key Plan") == (ANNEXURE,)
+    assert classify_text("", image_coverage=0.9) == (ANNEXURE,)
+    assert classify_text("Page 3") == (UNKNOWN,)
+
+
+def test_classify_document(tmp_path):
+    import fitz
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 72), "To,\nThe Executive Engineer\nSub: Permission for trenching", fontsize=10)
+    page = doc.new_page()
+    # A blank scanned-looking page with ruled lines is taken for a charges table
+    for y in range(100, 400, 60):
+        page.draw_line((50, y), (550, y), width=2)
+    for x in (50, 300, 550):
+        page.draw_line((x, 100), (x, 340), width=2)
+    doc.new_page()
+    path = str(tmp_path / "dn.pdf")
+    doc.save(path)
+    doc.close()
+    assert classify_document(path) == [(COVER_LETTER,), (CHARGES_TABLE,), (UNKNOWN,)]
+    assert classify_document(path, ["Annexure A - Key Plan", "", ""])[0] == (ANNEXURE,)
@@ -0,0 +1,99 @@
+import os
+import sys
+
+# Add the backend directory to the Python path so we can import the PO parser
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers.po_document import extract_header, extract_lines, po_master_rows, site_id_and_kind
+
+PO_TEXT = """Line Total
+ 1
+B0STDDSS1  -   Trenching and
+Ducting services,Type:Trenching &
+Digging,Scope:Per Site,Details:OFC
+laying on Co-Built Model
+MUM/Route/90 IP1
+Chapter Heading: 998734
+SAC Number  : 998734
+01-APR-25 (31-MAR-26)
+4,900
+Meter
+1,234.00
+60,46,600.00
+CGST_9%_TNG-NLD_0_Maharashtra
+5,44,194.00
+SGST_9%_TNG-NLD_0_Maharashtra
+5,44,194.00
+Total Line Value
+71,34,988.00
+Purchase Order Continuation Sheet
+PO No: BAL-TNG-NLD--Maharashtra/PUR/10004771
+Page 2 of 3
+Regd Office: Bharti Airtel Limited Interface, Mumbai 400064
+ 2
+B0STDDSS1  -   Trenching and
+Ducting services,Type:Trenching &
+Digging,Scope:Per Site,Details:OFC
+laying on Co-Built Model
+6195
+Chapter Heading: 998734
+27-JUL-25 (25-MAR-27)
+1
+Meter
+16490
+16490
+Total Line Value
+16490
+Total PO Value: 7151478.00
+"""
+
+
+def test_po_document_extract_lines():
+    lines = extract_lines(PO_TEXT)
+    assert [line["S.No"] for line in lines] == [1, 2]
+    route, site = lines
+    assert route["Item Code"] == "B0STDDSS1"
+    assert route["SiteID"] == "MUM/Route/90 IP1"
+    assert route["Need By"] == "01-APR-25"
+    assert (route["Qty"], route["UOM"], route["Unit Price"], route["Line Total"]) == (4900.0, "Meter", 1234.0, 6046600.0)
+    assert route["Taxes"] == {"CGST 9%": 544194.0, "SGST 9%": 544194.0}
+    assert route["Total Line Value"] == 7134988.0
+    # The continuation-sheet header between the two items is not part of either
+    assert site["SiteID"] == "6195"
+    assert site["Need By"] == "27-JUL-25"
+
+
+def test_po_master_rows_keys_and_lengths():
+    doc = {"PO No": "10004771", "Revision": "0", "Lines": extract_lines(PO_TEXT)}
+    rows = {row["route_id_site_id"]: row for row in po_master_rows([doc])}
+    assert rows["MUM_Route_90"] == {"route_id_site_id": "MUM_Route_90", "po_no_ip1": "10004771", "po_length_ip1": 4900.0}
+    # One unit at its unit price is a per-site lump sum, not a length
+    assert rows["6195"] == {"route_id_site_id": "6195", "po_no_cobuild": "10004771"}
+
+
+def test_po_master_rows_latest_po_wins_and_lengths_add_up():
+    line = {"SiteID": "MUM/Route/7 Cobuilt", "Description": "", "Qty": 100.0, "UOM": "Meter", "Unit Price": 10.0, "Line Total": 1000.0}
+    older = {"PO No": "10000001", "Revision": "3", "Lines": [line]}
+    newer = {"PO No": "10000002", "Revision": "0", "Lines": [line, dict(line, Qty=50.0)]}
+    ip1 = {"PO No": "10000003", "Revision": "0", "Lines": [dict(line, SiteID="MUM/Route/7 IP1", Qty=20.0)]}
+    each = {"PO No": "10000004", "Revision": "0", "Lines": [dict(line, SiteID="MUM/Route/8", UOM="Each")]}
+    rows = po_master_rows([newer, ip1, older, each])
+    assert rows == [{
+        "route_id_site_id": "MUM_Route_7", "po_no_cobuild": "10000002", "po_length_cobuild": 150.0,
+        "po_no_ip1": "10000003", "po_length_ip1": 20.0,
+    }]
+
+
+def test_site_id_and_kind():
+    assert site_id_and_kind({"SiteID": "MUM/Route/90  IP1"}) == ("MUM_Route_90", "ip1")
+    assert site_id_and_kind({"SiteID": "MUM/Route/90 Co-Built"}) == ("MUM_Route_90", "cobuild")
+    assert site_id_and_kind({"SiteID": "6195", "Description": "laying on Co-Built Model"}) == ("6195", "cobuild")
+    assert site_id_and_kind({"SiteID": "6195", "Description": "Trenching"}) == ("6195", "ip1")
+
+
+def test_extract_header():
+    text = "PO No.\n:\nBAL-TNG-NLD--Maharashtra/PUR/10004771\nRev No.\n:\n2\nPO Date\n:\n01-APR-2025\n" \
+        "Partner Name: Trench Infra Pvt Ltd\nTotal Purchase Order Value : 71,51,478.00"
+    assert extract_header(text) == {
+        "PO No": "10004771", "PO Reference": "BAL-TNG-NLD--Maharashtra/PUR/10004771", "Revision": "2",
+        "PO Date": "01-APR-2025", "Partner": "Trench Infra Pvt Ltd", "Total PO Value": 7151478.0,
+    }
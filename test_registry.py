@@ -0,0 +1,98 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the Python path so we can import the registry
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers import registry
+
+# A parser module as the registry expects one: one row per context, the first word of its text as the DN number
+FAKE_PARSER = '''
+LOADS = []
+ARTIFACTS = ("text",)
+HEADERS = ["Demand Note Reference number", "Pages", "Manual"]
+LOADS.append(1)
+
+
+def build_non_refundable_row(ctx, manual_values=None):
+    return [ctx.text.split()[0], str(ctx.page_count), (manual_values or {}).get("Manual", "")]
+
+
+def build_sd_row(ctx, manual_values=None):
+    return ["DN No"], [ctx.text.split()[0]]
+'''
+SPLITTING_PARSER = FAKE_PARSER + '''
+
+def split_documents(ctx):
+    return [ctx.subrange(i, i + 1) for i in range(ctx.page_count)]
+'''
+
+
+def _make_pdf(path, page_texts):
+    import fitz
+    doc = fitz.open()
+    for text in page_texts:
+        doc.new_page().insert_text((50, 72), text, fontsize=10)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def fake_parsers(tmp_path, monkeypatch):
+    (tmp_path / "fake_dn_parser.py").write_text(FAKE_PARSER)
+    (tmp_path / "fake_split_parser.py").write_text(SPLITTING_PARSER)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(registry, "PARSER_MODULES", dict(registry.PARSER_MODULES))
+    monkeypatch.setattr(registry, "_loaded", {})
+    for name in ("fake_dn_parser", "fake_split_parser"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    registry.register_parser("Fake DN", "fake_dn_parser")
+    registry.register_parser("fake-split", "fake_split_parser")
+    return tmp_path
+
+
+def test_normalize_authority():
+    for name in ("midc-type1", "MIDC Type 1", "MIDC_TYPE1", "MIDCTYPE1"):
+        assert registry.normalize_authority(name) == "MIDCTYPE1"
+    assert registry.normalize_authority(None) == ""
+
+
+def test_parsers_are_imported_on_first_use(fake_parsers):
+    assert "fake_dn_parser" not in sys.modules
+    assert registry.is_supported("FAKE_DN")
+    parser = registry.get_parser("fake dn")
+    assert registry.get_parser("FAKEDN") is parser
+    assert parser.LOADS == [1]
+    assert registry.loaded_authorities() == ["FAKEDN"]
+
+
+def test_unknown_authority(fake_parsers):
+    with pytest.raises(ValueError):
+        registry.get_parser("Pune")
+    assert registry.get_headers("Pune") == registry.get_parser("MCGM").HEADERS
+
+
+def test_parse_document_shares_one_context(fake_parsers):
+    pdf = _make_pdf(fake_parsers / "dn.pdf", ["DN-1 first page", "second page"])
+    headers, row, sd_headers, sd_row = registry.parse_document(pdf, "FAKEDN", manual_values={"Manual": "x"})
+    assert headers == ["Demand Note Reference number", "Pages", "Manual"]
+    assert row == ["DN-1", "2", "x"]
+    assert (sd_headers, sd_row) == (["DN No"], ["DN-1"])
+    assert registry.parse_document(pdf, "FAKEDN", sd=False)[2:] == (None, None)
+
+
+def test_parse_documents_without_splitter(fake_parsers):
+    pdf = _make_pdf(fake_parsers / "dn.pdf", ["DN-1 first page", "DN-2 second page"])
+    results = registry.parse_documents(pdf, "FAKEDN")
+    assert [row for _, row, _, _ in results] == [["DN-1", "2", ""]]
+
+
+def test_parse_documents_splits_in_page_order(fake_parsers):
+    pdf = _make_pdf(fake_parsers / "dns.pdf", [f"DN-{i} page" for i in range(1, 6)])
+    results = registry.parse_documents(pdf, "FAKE-SPLIT", max_workers=3)
+    assert [row[0] for _, row, _, _ in results] == ["DN-1", "DN-2", "DN-3", "DN-4", "DN-5"]
+    assert all(row[1] == "1" for _, row, _, _ in results)
+    fields = registry.extract_fields_documents(pdf, "FAKE-SPLIT", ["dn_number"])
+    assert fields == [{"dn_number": f"DN-{i}"} for i in range(1, 6)]
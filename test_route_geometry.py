@@ -0,0 +1,115 @@
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+# Add the backend directory to the Python path so we can import the route measurement
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from route_geometry import length_report, line_lengths, parse_coordinates, read_lines, segment_lengths, site_key, stated_length
+
+# One degree of latitude at Mumbai is about 110.7 km
+LAT0, LON0 = 19.05, 72.84
+METRE_LAT = 1 / 110_740
+METRE_LON = 1 / (111_320 * np.cos(np.radians(LAT0)))
+
+
+def _east(start_m, length_m, north_m=0.0, step_m=10.0):
+    """lon / lat array of a line running east from start_m to start_m + length_m, north_m off the axis."""
+    xs = np.arange(start_m, start_m + length_m + step_m / 2, step_m)
+    return np.column_stack([LON0 + xs * METRE_LON, np.full(len(xs), LAT0 + north_m * METRE_LAT)])
+
+
+def test_segment_lengths_along_a_meridian():
+    coords = np.array([[LON0, 19.0], [LON0, 19.001], [LON0, 19.003]])
+    lengths = segment_lengths(coords)
+    assert lengths.shape == (2,)
+    # 0.001 degree of latitude at 19 degrees north is about 110.7 m
+    assert lengths[0] == pytest.approx(110.7, abs=0.2)
+    assert lengths[1] == pytest.approx(2 * lengths[0], rel=1e-4)
+
+
+def test_segment_lengths_across_the_antimeridian():
+    coords = np.array([[179.9999, 0.0], [-179.9999, 0.0]])
+    assert segment_lengths(coords)[0] == pytest.approx(22.26, abs=0.01)
+
+
+def test_line_lengths_do_not_join_lines():
+    a = _east(0, 500)
+    b = _east(0, 200, north_m=1000)
+    lengths = line_lengths([a, b, np.array([[LON0, LAT0]])])
+    assert lengths[0] == pytest.approx(500, rel=0.005)
+    assert lengths[1] == pytest.approx(200, rel=0.005)
+    assert lengths[2] == 0
+    assert line_lengths([]).shape == (0,)
+
+
+def test_line_lengths_matches_segment_sums():
+    lines = [_east(0, 300, north_m=n * 50) for n in range(5)]
+    assert line_lengths(lines) == pytest.approx([segment_lengths(c).sum() for c in lines])
+
+
+def test_stated_length():
+    assert stated_length("ROUTES/Route 45/Route number 45_4765 mtr.kmz") == 4765.0
+    assert stated_length("Site_ID 3054 (Krishna_Mahal)- 34M.kmz") == 34.0
+    assert stated_length("Mumbai_Coverage_Route7.kmz.kml") is None
+
+
+def _kml(lines):
+    placemarks = "".join(
+        f"<Placemark><name>{name}</name><LineString><coordinates>"
+        + " ".join(f"{lon:.7f},{lat:.7f},0" for lon, lat in coords)
+        + "</coordinates></LineString></Placemark>"
+        for name, coords in lines
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><kml xmlns="http://www.opengis.net/kml/2.2"><Document>{placemarks}</Document></kml>'
+
+
+def test_parse_coordinates():
+    assert parse_coordinates("72.84,19.05,0 72.85,19.06,0").tolist() == [[72.84, 19.05], [72.85, 19.06]]
+    assert parse_coordinates("72.84,19.05 72.85,19.06,12").tolist() == [[72.84, 19.05], [72.85, 19.06]]
+    assert parse_coordinates("").shape == (0, 2)
+
+
+def test_read_lines_from_kml_and_kmz(tmp_path):
+    kml = _kml([("Trench A", _east(0, 100)), ("Trench B", _east(0, 50, north_m=100))])
+    (tmp_path / "route.kml").write_text(kml)
+    with zipfile.ZipFile(tmp_path / "route.kmz", "w") as kmz:
+        kmz.writestr("doc.kml", kml)
+    for name in ("route.kml", "route.kmz"):
+        lines = read_lines(str(tmp_path / name))
+        assert [line.placemark for line in lines] == ["Trench A", "Trench B"]
+        assert lines[0].coords.shape == (11, 2)
+
+
+def test_site_key():
+    assert site_key("MU-MA928") == site_key("MA928") == "MA928"
+    assert site_key("MUM/Route/90") == site_key("Route 90") == "ROUTE90"
+    assert site_key(None) == ""
+
+
+def test_length_report_matches_dn_master_rows(tmp_path):
+    root = tmp_path / "Sites"
+    (root / "MU-MA928").mkdir(parents=True)
+    (root / "MU-MA928" / "783340697_100 mtr.kml").write_text(_kml([("Trench", _east(0, 100))]))
+    (root / "MU-MA928" / "overview.kml").write_text(_kml([("Trench", _east(0, 300))]))
+    rows = [
+        {"route_id_site_id": "MA928", "application_number": "0783340697", "dn_length_mtr": "110", "application_length_mtr": "100"},
+        {"route_id_site_id": "MU-MA928", "application_number": "783340698", "dn_length_mtr": "300", "application_length_mtr": None},
+    ]
+    report = length_report([str(root)], rows, tolerance_pct=5, max_workers=1)
+    assert report["errors"] == {}
+    by_name = {os.path.basename(r["path"]): r for r in report["routes"]}
+    surveyed = by_name["783340697_100 mtr.kml"]
+    assert surveyed["site"] == "MU-MA928"
+    assert surveyed["surveyed_length_m"] == pytest.approx(100, rel=0.005)
+    assert surveyed["stated_length_m"] == 100.0 and surveyed["stated_within_tolerance"]
+    # Matched by the application number in the name; -9.1 % from the DN length is outside 5 %
+    [match] = surveyed["dn_master"]
+    assert match["application_number"] == "0783340697"
+    assert match["dn_deviation_pct"] == pytest.approx(-9.1, abs=0.2)
+    assert match["within_tolerance"] is False
+    # Without a number in the name, every row of the site folder matches
+    assert len(by_name["overview.kml"]["dn_master"]) == 2
+    assert by_name["overview.kml"]["stated_length_m"] is None
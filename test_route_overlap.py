@@ -0,0 +1,129 @@
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+# Add the backend directory to the Python path so we can import the overlap index
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+import route_overlap
+from hot_folder import file_sha256
+from route_geometry import read_lines
+from route_overlap import RouteIndex, geometry_key
+
+# One degree of latitude at Mumbai is about 110.7 km
+LAT0, LON0 = 19.05, 72.84
+METRE_LAT = 1 / 110_740
+METRE_LON = 1 / (111_320 * np.cos(np.radians(LAT0)))
+
+
+def _east(start_m, length_m, north_m=0.0, step_m=10.0):
+    """lon / lat array of a line running east from start_m to start_m + length_m, north_m off the axis."""
+    xs = np.arange(start_m, start_m + length_m + step_m / 2, step_m)
+    return np.column_stack([LON0 + xs * METRE_LON, np.full(len(xs), LAT0 + north_m * METRE_LAT)])
+
+
+def _north(east_m, length_m, step_m=10.0):
+    ys = np.arange(-length_m / 2, length_m / 2 + step_m / 2, step_m)
+    return np.column_stack([np.full(len(ys), LON0 + east_m * METRE_LON), LAT0 + ys * METRE_LAT])
+
+
+
+@pytest.fixture
+def index():
+    return RouteIndex([
+        ("parallel", [_east(100, 300, north_m=2)]),
+        ("crossing", [_north(250, 400)]),
+        ("far", [_east(0, 500, north_m=200)]),
+    ])
+
+
+def test_overlaps_reports_parallel_route(index):
+    found = index.overlaps([_east(0, 500)], buffer_m=5, min_length_m=20)
+    assert [o["route"] for o in found] == ["parallel"]
+    # 300 m side by side, plus the stretch past each end still within the buffer (about 4.6 m)
+    assert found[0]["overlap_m"] == pytest.approx(309.2, abs=1)
+    assert found[0]["share_pct"] == pytest.approx(61.8, abs=0.5)
+
+
+def test_overlaps_ignores_crossing_route(index):
+    # A crossing is within the buffer for about 2 * buffer_m only
+    found = index.overlaps([_east(0, 500)], buffer_m=5, min_length_m=5)
+    crossing = [o for o in found if o["route"] == "crossing"]
+    assert crossing and crossing[0]["overlap_m"] == pytest.approx(10, abs=2)
+    assert "crossing" not in [o["route"] for o in index.overlaps([_east(0, 500)], buffer_m=5, min_length_m=20)]
+
+
+def test_overlaps_excludes_the_query_route(index):
+    lines = [_east(100, 300, north_m=2)]
+    assert [o["route"] for o in index.overlaps(lines)] == ["parallel"]
+    assert index.overlaps(lines, exclude="parallel") == []
+
+
+def test_route_id_of_uses_the_matching_root(tmp_path):
+    first, second = tmp_path / "ROUTES", tmp_path / "Sites"
+    path = second / "MU-MA928" / "surveys" / "783340697_100 mtr.kmz"
+    assert route_overlap.route_id_of(str(path), [str(first), str(second)]) == "MU-MA928/surveys/783340697_100 mtr.kmz"
+
+
+def test_overlaps_excludes_several_routes(index):
+    lines = [_east(0, 500)]
+    assert [o["route"] for o in index.overlaps(lines, min_length_m=5, exclude=["parallel", "unknown"])] == ["crossing"]
+    assert index.overlaps(lines, min_length_m=5, exclude=("parallel", "crossing")) == []
+
+
+def test_geometry_key_ignores_placemark_order_and_float_noise():
+    a, b = _east(0, 100), _east(0, 50, north_m=30)
+    assert geometry_key([a, b]) == geometry_key([b, a + 1e-9])
+    assert geometry_key([a, b]) != geometry_key([a, b + 1e-5])
+
+
+def _kml(lines):
+    placemarks = "".join(
+        "<Placemark><name>Trench</name><LineString><coordinates>"
+        + " ".join(f"{lon:.8f},{lat:.8f},0" for lon, lat in coords)
+        + "</coordinates></LineString></Placemark>"
+        for coords in lines
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><kml xmlns="http://www.opengis.net/kml/2.2"><Document>{placemarks}</Document></kml>'
+
+
+@pytest.fixture
+def surveyed(tmp_path):
+    """A hot-folder tree with a surveyed route, a route next to it and the route's KML as a re-upload outside it."""
+    root = tmp_path / "Sites"
+    (root / "MU-1001").mkdir(parents=True)
+    (root / "MU-1002").mkdir()
+    (root / "MU-1001" / "783340697_500 mtr.kml").write_text(_kml([_east(0, 500)]))
+    (root / "MU-1002" / "783340698_300 mtr.kml").write_text(_kml([_east(100, 300, north_m=2)]))
+    upload = tmp_path / "upload.kml"
+    upload.write_text((root / "MU-1001" / "783340697_500 mtr.kml").read_text())
+    return root, upload
+
+
+def test_overlaps_for_lines_leaves_out_a_reuploaded_route(surveyed):
+    root, upload = surveyed
+    rows = [{"application_number": "783340698", "dn_number": "DN-2"}]
+    lines = read_lines(str(upload))
+    result = route_overlap.overlaps_for_lines(lines, roots=[str(root)], rows=rows, sha256=file_sha256(str(upload)))
+    assert result["same_routes"] == ["MU-1001/783340697_500 mtr.kml"]
+    assert [o["route"] for o in result["overlaps"]] == ["MU-1002/783340698_300 mtr.kml"]
+    assert result["overlaps"][0]["site"] == "MU-1002"
+    assert result["overlaps"][0]["dn_master"] == rows
+
+
+def test_overlaps_for_lines_recognises_the_same_geometry_in_another_file(surveyed, tmp_path):
+    root, upload = surveyed
+    kmz = tmp_path / "upload.kmz"
+    with zipfile.ZipFile(kmz, "w") as archive:
+        archive.write(upload, "doc.kml")
+    lines = read_lines(str(kmz))
+    result = route_overlap.overlaps_for_lines(lines, roots=[str(root)], rows=[], sha256=file_sha256(str(kmz)))
+    assert result["same_routes"] == ["MU-1001/783340697_500 mtr.kml"]
+    assert len(result["overlaps"]) == 1
+    # A different survey of the same trench is an overlap, not the same route
+    shifted = [line._replace(coords=line.coords + [0.0, 1e-6]) for line in lines]
+    result = route_overlap.overlaps_for_lines(shifted, roots=[str(root)], rows=[])
+    assert result["same_routes"] == []
+    assert [o["route"] for o in result["overlaps"]][0] == "MU-1001/783340697_500 mtr.kml"
@@ -0,0 +1,202 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the backend directory to the Python path so we can import the cell filler
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers import table_cells
+from parsers.table_cells import GRID_DPI, cell_ink, fill_cells, text_layer_cells, text_quality
+
+SCALE = 72 / GRID_DPI
+# A 3 x 3 table in PDF points: 150 wide columns from x=50, 40 high rows from y=100
+COLUMNS = (50, 200, 350, 500)
+ROWS = (100, 140, 180, 220)
+
+
+def _boxes():
+    """Pixel boxes (x, y, w, h) of the table cells on the GRID_DPI render."""
+    return [
+        [
+            (round(x0 / SCALE), round(y0 / SCALE), round((x1 - x0) / SCALE), round((y1 - y0) / SCALE))
+            for x0, x1 in zip(COLUMNS, COLUMNS[1:])
+        ]
+        for y0, y1 in zip(ROWS, ROWS[1:])
+    ]
+
+
+def _table_page(tmp_path, cells, ink=()):
+    """
+    A one-page PDF with the ruled table, text in {(r, c): text} cells and a filled block (ink but no
+    text layer, like a scan) in each (r, c) of ink. Returns (doc, page, grayscale GRID_DPI render).
+    """
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=600, height=400)
+    for x in COLUMNS:
+        page.draw_line((x, ROWS[0]), (x, ROWS[-1]), width=1)
+    for y in ROWS:
+        page.draw_line((COLUMNS[0], y), (COLUMNS[-1], y), width=1)
+    for (r, c), text in cells.items():
+        page.insert_text((COLUMNS[c] + 8, ROWS[r] + 24), text, fontsize=10)
+    for r, c in ink:
+        page.draw_rect(fitz.Rect(COLUMNS[c] + 20, ROWS[r] + 12, COLUMNS[c] + 80, ROWS[r] + 28), color=(0, 0, 0), fill=(0, 0, 0))
+    path = str(tmp_path / "table.pdf")
+    doc.save(path)
+    doc.close()
+    doc = fitz.open(path)
+    page = doc[0]
+    pix = page.get_pixmap(dpi=GRID_DPI, colorspace=fitz.csGRAY)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    return doc, page, img
+
+
+def test_text_quality():
+    assert text_quality("Cement Concrete 1,23,456.00") == 1.0
+    assert text_quality("सिमेंट काँक्रीट") == 1.0
+    assert text_quality("") == 0.0
+    assert text_quality("(cid:12)(cid:34)") == 0.0
+    assert text_quality("\x01\x02A") == 0.25
+    assert text_quality("��12") == 0.5
+
+
+def test_cell_ink_ignores_the_ruling(tmp_path):
+    doc, page, img = _table_page(tmp_path, {}, ink=[(1, 1)])
+    boxes = _boxes()
+    with doc:
+        assert cell_ink(img, boxes[0][0]) == 0.0
+        assert cell_ink(img, boxes[1][1]) > 0.1
+        assert cell_ink(img, (0, 0, 4, 4)) == 0.0
+
+
+def test_text_layer_cells_assigns_words_by_centre(tmp_path):
+    cells = {(0, 0): "Road", (0, 1): "Length", (1, 0): "Cement Concrete", (1, 1): "130", (2, 2): "1,23,456.00"}
+    doc, page, _ = _table_page(tmp_path, cells)
+    rows = _boxes()
+    rows[2][1] = None
+    with doc:
+        texts = text_layer_cells(page, rows, SCALE)
+    assert texts == [["Road", "Length", ""], ["Cement Concrete", "130", ""], ["", "", "1,23,456.00"]]
+
+
+def test_fill_cells_born_digital_page_needs_no_ocr(tmp_path, monkeypatch):
+    def no_ocr(jobs):
+        raise AssertionError("a born-digital table must not be OCR'd")
+    monkeypatch.setattr(table_cells, "_run_ocr", no_ocr)
+    cells = {(0, 0): "Road", (1, 0): "Cement Concrete", (1, 1): "130", (1, 2): "1,23,456.00"}
+    doc, page, img = _table_page(tmp_path, cells)
+    with doc:
+        texts, confidence = fill_cells(page, img, _boxes(), SCALE)
+    assert texts == [["Road", "", ""], ["Cement Concrete", "130", "1,23,456.00"], ["", "", ""]]
+    assert confidence == [[100.0] * 3] * 3
+
+
+def test_fill_cells_ocrs_only_cells_with_ink_and_no_text(tmp_path, monkeypatch):
+    ocr_calls = []
+
+    def fake_ocr(crop, profile=table_cells.GENERIC):
+        ocr_calls.append(crop.shape)
+        return "Paver Block", 95.0
+    monkeypatch.setattr(table_cells, "ocr_crop", fake_ocr)
+    doc, page, img = _table_page(tmp_path, {(0, 0): "Road"}, ink=[(1, 0)])
+    with doc:
+        texts, confidence = fill_cells(page, img, _boxes(), SCALE)
+    assert texts[0][0] == "Road"
+    assert (texts[1][0], confidence[1][0]) == ("Paver Block", 95.0)
+    assert len(ocr_calls) == 1
+    # The crop is re-rendered at CELL_OCR_DPI, not cut from the grid render
+    assert ocr_calls[0][1] == pytest.approx((150 + 2 * table_cells.CELL_PAD_PT) * table_cells.CELL_OCR_DPI / 72, abs=2)
+
+
+def _ocr_by_dpi(results):
+    """Fake ocr_crop answering by crop width: {dpi: (text, confidence)}; records (dpi, profile) per call."""
+    calls = []
+
+    def fake_ocr(crop, profile=table_cells.GENERIC):
+        dpi = min(results, key=lambda d: abs(crop.shape[1] - (150 + 2 * table_cells.CELL_PAD_PT) * d / 72))
+        calls.append((dpi, profile))
+        return results[dpi]
+    return fake_ocr, calls
+
+
+@pytest.mark.parametrize("first, retry, expected", [
+    # Doubtful and not a number: the retry reads it
+    (("1O5", 40.0), ("105", 60.0), ("105", 60.0)),
+    # Not a number even though confident: the retry is kept because it parses
+    (("1,2345", 90.0), ("12345", 50.0), ("12345", 50.0)),
+    # A number but doubtful: kept unless the retry is more confident
+    (("105", 50.0), ("106", 40.0), ("105", 50.0)),
+    (("105", 50.0), ("106", 80.0), ("106", 80.0)),
+])
+def test_fill_cells_retries_doubtful_numeric_cells(tmp_path, monkeypatch, first, retry, expected):
+    fake_ocr, calls = _ocr_by_dpi({table_cells.CELL_OCR_DPI: first, table_cells.RETRY_DPI: retry})
+    monkeypatch.setattr(table_cells, "ocr_crop", fake_ocr)
+    profile = table_cells.TableProfile(columns={1: table_cells.NUMERIC}, header_rows=1)
+    doc, page, img = _table_page(tmp_path, {}, ink=[(1, 1)])
+    with doc:
+        texts, confidence = fill_cells(page, img, _boxes(), SCALE, profile)
+    assert (texts[1][1], confidence[1][1]) == expected
+    assert calls == [(table_cells.CELL_OCR_DPI, table_cells.NUMERIC), (table_cells.RETRY_DPI, table_cells.NUMERIC)]
+
+
+def test_fill_cells_retries_numeric_body_cells_only(tmp_path, monkeypatch):
+    fake_ocr, calls = _ocr_by_dpi({table_cells.CELL_OCR_DPI: ("1,23,456", 30.0), table_cells.RETRY_DPI: ("", 0.0)})
+    monkeypatch.setattr(table_cells, "ocr_crop", fake_ocr)
+    profile = table_cells.TableProfile(columns={1: table_cells.NUMERIC}, header_rows=1)
+    doc, page, img = _table_page(tmp_path, {}, ink=[(1, 0), (0, 1)])
+    with doc:
+        texts, confidence = fill_cells(page, img, _boxes(), SCALE, profile)
+    # Column 0 has no numeric profile and row 0 is a header, so neither doubtful read is retried
+    assert [dpi for dpi, _ in calls] == [table_cells.CELL_OCR_DPI] * 2
+    assert confidence[1][0] == confidence[0][1] == 30.0
+
+
+def test_ocr_crop_reports_the_lowest_word_confidence(monkeypatch):
+    pytesseract = pytest.importorskip("pytesseract")
+    data = {
+        "text": ["", "Cement", "Concrete", "130"], "conf": ["-1", "91.5", "62", "88"],
+        "block_num": [0, 1, 1, 1], "par_num": [0, 1, 1, 1], "line_num": [0, 1, 1, 2],
+    }
+    monkeypatch.setattr(pytesseract, "image_to_data", lambda *args, **kwargs: data)
+    monkeypatch.setattr(table_cells, "available_ocr_lang", lambda lang: lang)
+    assert table_cells.ocr_crop(np.zeros((10, 10), dtype=np.uint8)) == ("Cement Concrete\n130", 62.0)
+
+
+def test_cell_profiles_apply_to_single_body_cells():
+    road = table_cells.text_column(["Paver Block", "Concrete Road"])
+    profile = table_cells.TableProfile(columns={0: road, 1: table_cells.NUMERIC}, header_rows=1)
+    rows = _boxes()
+    spans = [[(1, 1)] * 3, [(1, 1), (2, 1), (1, 1)], [(1, 1), (1, 1), (1, 1)]]
+    assert table_cells.cell_profiles(rows, profile, spans) == [
+        [table_cells.GENERIC] * 3,
+        [road, table_cells.GENERIC, table_cells.GENERIC],
+        [road, table_cells.NUMERIC, table_cells.GENERIC],
+    ]
+    assert table_cells.cell_profiles(rows) == [[table_cells.GENERIC] * 3] * 3
+
+
+def test_profile_config():
+    assert table_cells.profile_config(table_cells.GENERIC) == "--psm 6"
+    assert table_cells.profile_config(table_cells.NUMERIC) == "--psm 7 -c tessedit_char_whitelist=0123456789.,"
+
+
+def test_snap_to_vocabulary():
+    vocabulary = ("Paver Block", "Concrete Road", "Asphalt Road")
+    assert table_cells.snap_to_vocabulary("paver  biock", vocabulary) == "Paver Block"
+    assert table_cells.snap_to_vocabulary("Concrete Roa", vocabulary) == "Concrete Road"
+    assert table_cells.snap_to_vocabulary("Footpath", vocabulary) == "Footpath"
+    assert table_cells.snap_to_vocabulary("Paver Block", ()) == "Paver Block"
+
+
+def test_preprocess_crop_binarizes_numeric_cells():
+    crop = np.array([[30, 90], [170, 230]], dtype=np.uint8)
+    assert set(np.unique(table_cells.preprocess_crop(crop, "binarize"))) == {0, 255}
+    assert table_cells.preprocess_crop(crop, None) is crop
+
+
+def test_mbmc_table_profile():
+    from parsers import mbmc
+    assert mbmc.TABLE_PROFILE.header_rows == 1
+    assert mbmc.TABLE_PROFILE.columns[2].vocabulary == mbmc.ROAD_SURFACES
+    assert all(mbmc.TABLE_PROFILE.columns[c] is table_cells.NUMERIC for c in range(3, 15))
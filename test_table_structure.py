@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+# Add the backend directory to the Python path so we can import the grid detector
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+from parsers.table_structure import detect_table, separators
+
+
+def _grid_image(rows=4, cols=3, skew=0.0):
+    """White page with a ruled rows x cols table; the first two cells of row 1 are merged."""
+    import cv2
+    img = np.full((1100, 850), 255, dtype=np.uint8)
+    x0, y0, w, h = 100, 200, 200, 60
+    for r in range(rows + 1):
+        cv2.line(img, (x0, y0 + r * h), (x0 + cols * w, y0 + r * h), 0, 2)
+    for c in range(cols + 1):
+        cv2.line(img, (x0 + c * w, y0), (x0 + c * w, y0 + rows * h), 0, 2)
+    # Merge (1, 0) and (1, 1): erase the rule between them
+    cv2.line(img, (x0 + w, y0 + h + 3), (x0 + w, y0 + 2 * h - 3), 255, 4)
+    if skew:
+        matrix = cv2.getRotationMatrix2D((img.shape[1] / 2, img.shape[0] / 2), skew, 1.0)
+        img = cv2.warpAffine(img, matrix, (img.shape[1], img.shape[0]), borderValue=255)
+    return img
+
+
+def test_detect_table_grid_with_merged_cell():
+    grid = detect_table(_grid_image(), dpi=100)
+    assert len(grid.rows) == 4 and all(len(r) == 3 for r in grid.rows)
+    assert grid.spans[1][0] == (1, 2)
+    assert grid.rows[1][1] is None and grid.spans[1][1] is None
+    assert grid.skew == 0.0
+    x, y, w, h = grid.rows[0][0]
+    assert abs(x - 100) <= 3 and abs(y - 200) <= 3 and abs(w - 200) <= 4 and abs(h - 60) <= 4
+    # The merged cell covers both columns
+    assert abs(grid.rows[1][0][2] - 400) <= 4
+
+
+def test_detect_table_corrects_skew():
+    grid = detect_table(_grid_image(skew=2.0), dpi=100)
+    assert 1.0 < abs(grid.skew) < 3.0
+    assert len(grid.rows) == 4 and all(len(r) == 3 for r in grid.rows)
+    assert grid.spans[1][0] == (1, 2)
+
+
+def test_detect_table_without_a_table():
+    grid = detect_table(np.full((400, 300), 255, dtype=np.uint8), dpi=100)
+    assert (grid.rows, grid.spans, grid.bbox) == ([], [], None)
+
+
+def test_separators_collapse_thick_rules():
+    profile = np.zeros(100)
+    profile[[10, 11, 12, 50, 90]] = 40
+    assert separators(profile, 20, 2) == [11, 50, 90]
@@ -0,0 +1,62 @@
+import io
+import os
+import sys
+import time
+import zipfile
+
+# Add the backend directory to the Python path so we can import the helpers
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+import temp_janitor
+from utils import content_disposition, iter_zip
+
+
+# --- utils.iter_zip ---
+
+def test_iter_zip_streams_a_valid_archive():
+    def entries():
+        yield "a.json", b'{"a": 1}'
+        yield "skipped.json", None
+        yield "folder/b.txt", b"b" * 10000
+    chunks = list(iter_zip(entries()))
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zipf:
+        assert zipf.namelist() == ["a.json", "folder/b.txt"]
+        assert zipf.read("folder/b.txt") == b"b" * 10000
+
+
+def test_iter_zip_empty():
+    with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip([])))) as zipf:
+        assert zipf.namelist() == []
+
+
+# --- temp_janitor.enforce_quota ---
+
+def _write(path, size, age=0):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if age:
+        then = time.time() - age
+        os.utime(path, (then, then))
+
+
+def test_enforce_quota_removes_expired_then_oldest(tmp_path, monkeypatch):
+    monkeypatch.setattr(temp_janitor, "TEMP_ROOT", str(tmp_path))
+    _write(tmp_path / "expired", 100, age=7200)
+    _write(tmp_path / "old", 300, age=600)
+    _write(tmp_path / "new", 300)
+    removed, remaining = temp_janitor.enforce_quota(max_bytes=400, max_age_seconds=3600)
+    assert (removed, remaining) == (2, 300)
+    assert os.listdir(tmp_path) == ["new"]
+
+
+def test_enforce_quota_keeps_files_under_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(temp_janitor, "TEMP_ROOT", str(tmp_path))
+    _write(tmp_path / "a", 100)
+    assert temp_janitor.enforce_quota(max_bytes=1000, max_age_seconds=3600) == (0, 100)
+
+
+def test_content_disposition_non_ascii_name():
+    value = content_disposition('मागणीपत्र "DN".zip')
+    assert value.startswith('attachment; filename="')
+    assert "filename*=utf-8''%E0%A4%AE" in value
+    assert '"DN"' not in value